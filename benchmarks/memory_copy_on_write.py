@@ -0,0 +1,125 @@
+"""
+Peak memory of one ticker's feature build with and without Copy-on-Write mode.
+
+Run from the repository root:
+    python -m benchmarks.memory_copy_on_write
+    python -m benchmarks.memory_copy_on_write --output memory_cow.json
+
+Every (dataset, mode) pair runs in a fresh process,
+so that the peak RSS of one run doesn't hide the peak of another.
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+import tracemalloc
+from typing import List
+
+import pandas as pd
+
+from benchmarks.synthetic_ohlc import (
+    BARS_PER_DAY_5_MIN,
+    TRADING_DAYS_PER_YEAR,
+    generate_ohlc_5_min,
+    generate_ohlc_daily,
+)
+from derivative_columns.atr import add_tr_delta_col_to_ohlc
+from derivative_columns.hammer import add_col_is_hammer
+from derivative_columns.initial_balance import (
+    add_col_ib_high_low,
+    check_initial_balance_breach,
+)
+from derivative_columns.rsi import add_rsi_column
+from features.f_v1_basic import add_features_v1_basic
+from utils.misc import set_copy_on_write_mode
+
+DATASETS = {
+    "daily_30_years": TRADING_DAYS_PER_YEAR * 30,
+    "5_min_1_year": TRADING_DAYS_PER_YEAR * BARS_PER_DAY_5_MIN,
+}
+
+
+def _build_features(df: pd.DataFrame, intraday: bool) -> pd.DataFrame:
+    """
+    The same chain of calls that TickersData performs for a ticker,
+    plus a few more derived columns.
+    """
+    res = add_features_v1_basic(df=df)
+    res = add_tr_delta_col_to_ohlc(ohlc_df=res)
+    res = add_rsi_column(df=res, col_name="Close")
+    res = add_col_is_hammer(df=res)
+    if intraday:
+        res = add_col_ib_high_low(df=res)
+        res = check_initial_balance_breach(df=res)
+    return res
+
+
+def _peak_rss_mb() -> float:
+    # NOTE ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    divider = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divider
+
+
+def _measure_one(dataset: str, copy_on_write: bool, queue: multiprocessing.Queue):
+    set_copy_on_write_mode(enabled=copy_on_write)
+    n_bars = DATASETS[dataset]
+    intraday = dataset.startswith("5_min")
+    if intraday:
+        df = generate_ohlc_5_min(n_bars=n_bars)
+    else:
+        df = generate_ohlc_daily(n_bars=n_bars)
+    data_size_mb = df.memory_usage(deep=True).sum() / 2**20
+
+    peak_rss_before_mb = _peak_rss_mb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    res = _build_features(df=df, intraday=intraday)
+    elapsed = time.perf_counter() - start
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss_after_mb = _peak_rss_mb()
+
+    queue.put(
+        {
+            "dataset": dataset,
+            "copy_on_write": copy_on_write,
+            "bars": n_bars,
+            "result_columns": len(res.columns),
+            "input_size_mb": round(data_size_mb, 2),
+            "traced_peak_mb": round(traced_peak / 2**20, 2),
+            "peak_rss_mb": round(peak_rss_after_mb, 1),
+            "peak_rss_growth_mb": round(peak_rss_after_mb - peak_rss_before_mb, 1),
+            "seconds": round(elapsed, 3),
+        }
+    )
+
+
+def run_memory_benchmark() -> List[dict]:
+    ctx = multiprocessing.get_context("spawn")
+    results = list()
+    for dataset in DATASETS:
+        for copy_on_write in [False, True]:
+            queue = ctx.Queue()
+            process = ctx.Process(
+                target=_measure_one, args=(dataset, copy_on_write, queue)
+            )
+            process.start()
+            results.append(queue.get())
+            process.join()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", help="save results to this JSON file")
+    args = parser.parse_args()
+
+    all_results = run_memory_benchmark()
+    print(pd.DataFrame(all_results).to_string(index=False))
+    if args.output:
+        with open(args.output, "w", encoding="UTF-8") as f:
+            json.dump(all_results, f, indent=2)
+        print(f"Saved {args.output}", file=sys.stderr)
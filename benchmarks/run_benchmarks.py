@@ -0,0 +1,360 @@
+"""
+Timing benchmarks of the data, feature, analysis and backtest hot paths
+on synthetic OHLC data of 1k, 10k, 100k and 1M bars.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks run --output bench_baseline.json
+    python -m benchmarks.run_benchmarks run --only add_rsi_column --sizes 1000 10000
+    python -m benchmarks.run_benchmarks compare bench_baseline.json bench_new.json
+
+The compare command exits with code 1
+if at least one benchmark got slower than the threshold allows.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from benchmarks.synthetic_ohlc import (
+    MAX_DAILY_BARS_NS,
+    generate_ohlc_5_min,
+    generate_ohlc_daily,
+)
+from customizable import StrategyParams
+from derivative_columns.atr import add_tr_delta_col_to_ohlc
+from derivative_columns.hammer import add_col_is_hammer
+from derivative_columns.initial_balance import (
+    add_col_ib_high_low,
+    calculate_ib_breakout_and_breakdown_metrics,
+    check_initial_balance_breach,
+)
+from derivative_columns.min_max import add_is_min_max_dates_values
+from derivative_columns.rsi import add_rsi_column
+from features.f_v1_basic import add_features_v1_basic
+from strategy import run_all_tickers, run_backtest_for_ticker
+from utils.bootstrap import get_bootstrapped_mean_ci
+from utils.local_data import TickersData
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DAILY = "daily"
+MIN_5 = "5_min"
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+# Same parameters as in run_strategy_main_simple.py
+BENCHMARK_STRATEGY_PARAMS = StrategyParams(
+    max_trade_duration_long=8, profit_target_long_pct=5.5
+)
+RUN_ALL_TICKERS_COUNT = 3
+
+
+@dataclass
+class Benchmark:
+    """
+    setup receives the synthetic OHLC DataFrame
+    and returns the function to time.
+    The setup work itself is not timed.
+    """
+
+    name: str
+    setup: Callable[[pd.DataFrame], Callable[[], object]]
+    timeframes: Tuple[str, ...] = (DAILY, MIN_5)
+
+    # NOTE scipy's bootstrap draws all resamples of a batch at once,
+    # on 1M bars they don't fit the memory
+    max_bars: int = SIZES[-1]
+
+    # NOTE The daily data longer than MAX_DAILY_BARS_NS has the index in seconds,
+    # the stats of the backtesting package need nanoseconds
+    needs_ns_index: bool = False
+
+
+def _prepare_for_backtest(df: pd.DataFrame) -> pd.DataFrame:
+    return add_tr_delta_col_to_ohlc(
+        ohlc_df=add_features_v1_basic(df=df, atr_multiplier_threshold=3)
+    )
+
+
+@contextlib.contextmanager
+def _in_temp_dir() -> Iterator[None]:
+    """
+    run_all_tickers writes the log file and Excel files
+    to the current directory, keep them out of the repository
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        try:
+            yield
+        finally:
+            os.chdir(cwd)
+
+
+def _setup_ib_breach(df: pd.DataFrame) -> Callable[[], object]:
+    # NOTE check_initial_balance_breach overwrites its columns in place,
+    # so repeated calls on the same DataFrame are fine
+    res = add_col_ib_high_low(df=df)
+    return lambda: check_initial_balance_breach(df=res)
+
+
+def _setup_ib_metrics(df: pd.DataFrame) -> Callable[[], object]:
+    res = check_initial_balance_breach(df=add_col_ib_high_low(df=df))
+    return lambda: calculate_ib_breakout_and_breakdown_metrics(df=res)
+
+
+def _setup_bootstrap(df: pd.DataFrame) -> Callable[[], object]:
+    returns = df["Close"].pct_change().to_numpy()
+    return lambda: get_bootstrapped_mean_ci(data=returns)
+
+
+def _setup_run_backtest_for_ticker(df: pd.DataFrame) -> Callable[[], object]:
+    data = _prepare_for_backtest(df=df)
+    return lambda: run_backtest_for_ticker(
+        ticker="SYNTH", data=data, strategy_params=BENCHMARK_STRATEGY_PARAMS
+    )
+
+
+def _setup_run_all_tickers(df: pd.DataFrame) -> Callable[[], object]:
+    # NOTE TickersData with an empty list of tickers doesn't read any files,
+    # the synthetic data is put into its dictionary directly
+    tickers_data = TickersData(tickers=[], add_feature_cols_func=add_features_v1_basic)
+    tickers = list()
+    for seed in range(1, RUN_ALL_TICKERS_COUNT + 1):
+        ticker = f"SYNTH{seed}"
+        ticker_df = df if seed == 1 else _regenerate(df=df, seed=seed)
+        tickers_data.tickers_data_with_features[ticker] = _prepare_for_backtest(
+            df=ticker_df
+        )
+        tickers.append(ticker)
+
+    def run() -> float:
+        with _in_temp_dir():
+            return run_all_tickers(
+                tickers_data=tickers_data,
+                strategy_params=BENCHMARK_STRATEGY_PARAMS,
+                tickers=tickers,
+            )
+
+    return run
+
+
+def _regenerate(df: pd.DataFrame, seed: int) -> pd.DataFrame:
+    """
+    Data of the same size and timeframe as df with another seed
+    """
+    if isinstance(df.index, pd.DatetimeIndex) and df.index.name == "Datetime":
+        return generate_ohlc_5_min(n_bars=len(df), seed=seed)
+    return generate_ohlc_daily(n_bars=len(df), seed=seed)
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark(
+        name="add_is_min_max_dates_values",
+        setup=lambda df: lambda: add_is_min_max_dates_values(df=df),
+        timeframes=(DAILY,),
+    ),
+    Benchmark(
+        name="add_rsi_column",
+        setup=lambda df: lambda: add_rsi_column(df=df, col_name="Close"),
+    ),
+    Benchmark(
+        name="add_tr_delta_col_to_ohlc",
+        setup=lambda df: lambda: add_tr_delta_col_to_ohlc(ohlc_df=df),
+    ),
+    Benchmark(
+        name="add_col_is_hammer",
+        setup=lambda df: lambda: add_col_is_hammer(df=df),
+    ),
+    Benchmark(
+        name="add_col_ib_high_low",
+        setup=lambda df: lambda: add_col_ib_high_low(df=df),
+        timeframes=(MIN_5,),
+    ),
+    Benchmark(
+        name="check_initial_balance_breach",
+        setup=_setup_ib_breach,
+        timeframes=(MIN_5,),
+    ),
+    Benchmark(
+        name="calculate_ib_breakout_and_breakdown_metrics",
+        setup=_setup_ib_metrics,
+        timeframes=(MIN_5,),
+    ),
+    Benchmark(
+        name="get_bootstrapped_mean_ci",
+        setup=_setup_bootstrap,
+        timeframes=(DAILY,),
+        max_bars=100_000,
+    ),
+    Benchmark(
+        name="run_backtest_for_ticker",
+        setup=_setup_run_backtest_for_ticker,
+        needs_ns_index=True,
+    ),
+    Benchmark(
+        name="run_all_tickers",
+        setup=_setup_run_all_tickers,
+        timeframes=(DAILY,),
+        needs_ns_index=True,
+    ),
+]
+
+
+def _get_data(
+    cache: Dict[Tuple[str, int], pd.DataFrame], timeframe: str, n_bars: int
+) -> pd.DataFrame:
+    key = (timeframe, n_bars)
+    if key not in cache:
+        if timeframe == DAILY:
+            cache[key] = generate_ohlc_daily(n_bars=n_bars)
+        else:
+            cache[key] = generate_ohlc_5_min(n_bars=n_bars)
+    return cache[key]
+
+
+def _time_function(func: Callable[[], object], repeat: int) -> List[float]:
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_benchmarks(
+    sizes: Optional[List[int]] = None,
+    only: Optional[List[str]] = None,
+    repeat: int = 3,
+) -> dict:
+    """
+    Run every benchmark for every timeframe and size it supports.
+    Return a dict with the environment description and a list of results.
+    """
+    if repeat < 1:
+        raise ValueError(f"run_benchmarks: {repeat=}, should be at least 1")
+    sizes = sizes or SIZES
+    benchmarks = BENCHMARKS
+    if only:
+        unknown = set(only) - {benchmark.name for benchmark in BENCHMARKS}
+        if unknown:
+            raise ValueError(f"run_benchmarks: unknown benchmarks {sorted(unknown)}")
+        benchmarks = [benchmark for benchmark in BENCHMARKS if benchmark.name in only]
+
+    data_cache: Dict[Tuple[str, int], pd.DataFrame] = dict()
+    results = list()
+    for benchmark in benchmarks:
+        for timeframe in benchmark.timeframes:
+            for n_bars in sizes:
+                if n_bars > benchmark.max_bars:
+                    continue
+                if (
+                    benchmark.needs_ns_index
+                    and timeframe == DAILY
+                    and n_bars > MAX_DAILY_BARS_NS
+                ):
+                    continue
+                print(
+                    f"Running {benchmark.name} {timeframe} {n_bars} bars...",
+                    file=sys.stderr,
+                )
+                df = _get_data(cache=data_cache, timeframe=timeframe, n_bars=n_bars)
+                func = benchmark.setup(df)
+                timings = _time_function(func=func, repeat=repeat)
+                results.append(
+                    {
+                        "benchmark": benchmark.name,
+                        "timeframe": timeframe,
+                        "bars": n_bars,
+                        "repeat": repeat,
+                        "min_seconds": round(min(timings), 6),
+                        "median_seconds": round(statistics.median(timings), 6),
+                    }
+                )
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare_results(
+    baseline: dict,
+    current: dict,
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+) -> pd.DataFrame:
+    """
+    Join the results of two runs on (benchmark, timeframe, bars).
+    The min timing is compared because it is the least noisy one.
+    A benchmark is a regression if it got slower by more than threshold,
+    e.g. 0.2 means 20%.
+    """
+    keys = ["benchmark", "timeframe", "bars"]
+    baseline_df = pd.DataFrame(baseline["results"])[keys + ["min_seconds"]]
+    current_df = pd.DataFrame(current["results"])[keys + ["min_seconds"]]
+    res = baseline_df.merge(
+        current_df, on=keys, how="inner", suffixes=("_baseline", "_current")
+    )
+    res["ratio"] = (res["min_seconds_current"] / res["min_seconds_baseline"]).round(3)
+    res["is_regression"] = res["ratio"] > 1 + threshold
+    return res
+
+
+def _read_json(file_path: str) -> dict:
+    with open(file_path, encoding="UTF-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run benchmarks")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    run_parser.add_argument("--only", nargs="+", help="names of benchmarks to run")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--output", help="save results to this JSON file")
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="compare results with a saved baseline"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD
+    )
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run_res = run_benchmarks(sizes=args.sizes, only=args.only, repeat=args.repeat)
+        print(pd.DataFrame(run_res["results"]).to_string(index=False))
+        if args.output:
+            with open(args.output, "w", encoding="UTF-8") as f:
+                json.dump(run_res, f, indent=2)
+            print(f"Saved {args.output}", file=sys.stderr)
+    else:
+        comparison = compare_results(
+            baseline=_read_json(args.baseline),
+            current=_read_json(args.current),
+            threshold=args.threshold,
+        )
+        print(comparison.to_string(index=False))
+        regressions = comparison[comparison["is_regression"]]
+        if not regressions.empty:
+            print(
+                f"{len(regressions)} regressions above {args.threshold:.0%}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        print("No regressions", file=sys.stderr)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Regular US session 09:30 - 16:00
+BARS_PER_DAY_5_MIN = 78
+TRADING_DAYS_PER_YEAR = 252
+# NOTE The nanosecond timestamps end in 2262,
+# longer daily indexes are in seconds
+MAX_DAILY_BARS_NS = 60_000
+
+
+def _ohlc_from_index(index: pd.DatetimeIndex, seed: int, volatility: float) -> pd.DataFrame:
+    """
+    Generate a random walk OHLC DataFrame with Volume for the given index.
+    The same seed always produces the same data.
+    """
+    rng = np.random.default_rng(seed)
+    n_bars = len(index)
+    log_returns = rng.normal(loc=0.0002, scale=volatility, size=n_bars)
+    close = 100 * np.exp(np.cumsum(log_returns))
+    prev_close = np.concatenate(([100.0], close[:-1]))
+    open_ = prev_close * np.exp(rng.normal(loc=0.0, scale=volatility / 4, size=n_bars))
+    high = np.maximum(open_, close) * np.exp(
+        np.abs(rng.normal(loc=0.0, scale=volatility / 2, size=n_bars))
+    )
+    low = np.minimum(open_, close) * np.exp(
+        -np.abs(rng.normal(loc=0.0, scale=volatility / 2, size=n_bars))
+    )
+    volume = rng.integers(low=100_000, high=5_000_000, size=n_bars)
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=index,
+    )
+
+
+def generate_ohlc_daily(
+    n_bars: int, seed: int = 1, start: str = "1995-01-02"
+) -> pd.DataFrame:
+    """
+    Daily OHLC bars on business days.
+    30 years of daily data is about 7560 bars.
+    """
+    unit = "ns" if n_bars <= MAX_DAILY_BARS_NS else "s"
+    index = pd.date_range(
+        start=start, periods=n_bars, freq="B", name="Date", unit=unit
+    )
+    return _ohlc_from_index(index=index, seed=seed, volatility=0.012)
+
+
+def generate_ohlc_5_min(
+    n_bars: int, seed: int = 1, start: str = "2024-01-02"
+) -> pd.DataFrame:
+    """
+    5-minute OHLC bars of the regular session, BARS_PER_DAY_5_MIN bars per day.
+    One year of 5-minute data is about 19656 bars.
+    """
+    n_days = -(-n_bars // BARS_PER_DAY_5_MIN)
+    days = pd.bdate_range(start=start, periods=n_days)
+    intraday_offsets = pd.timedelta_range(
+        start="09:30:00", periods=BARS_PER_DAY_5_MIN, freq="5min"
+    )
+    index = pd.DatetimeIndex(
+        (days.values[:, None] + intraday_offsets.values[None, :]).ravel()[:n_bars],
+        name="Datetime",
+    )
+    return _ohlc_from_index(index=index, seed=seed, volatility=0.0015)
@@ -41,6 +41,7 @@ DPS_ADD_WINNER_NO = "DPS add to winner in good R/R - NO"
 DPS_MAIN_FLOW_YES = "DPS Main flow - yes"
 DPS_MAIN_FLOW_NO = "DPS Main flow - no"
 DPS_STUB = "DPS get_desired_current_position_size stub"
+DPS_ARRAY = "DPS desired position size array"
 
 tickers_all = [
     "GLD",
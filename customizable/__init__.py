@@ -1,2 +1,6 @@
-from .get_position_size_main import get_desired_current_position_size
+from .get_position_size_main import (
+    get_desired_current_position_size,
+    get_desired_position_size_array,
+    get_signal_mask,
+)
 from .strategy_params import StrategyParams
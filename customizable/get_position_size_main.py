@@ -2,11 +2,15 @@
 # pylint: disable=C0121
 from typing import Optional, Tuple
 
+import numpy as np
+import pandas as pd
 from backtesting.backtesting import Strategy
 
 from constants import DPS_STUB, FEATURE_COL_NAME_ADVANCED
 from utils.strategy_exec.misc import get_current_position_size
 
+from .strategy_params import StrategyParams
+
 
 def get_desired_current_position_size(
     strategy: Strategy,
@@ -86,3 +90,34 @@ def get_desired_current_position_size(
     # otherwise, it remains None, i.e. signal do nothing
 
     return desired_position_size, current_position_size, DPS_STUB
+
+
+def get_signal_mask(data: pd.DataFrame, strategy_params: StrategyParams) -> np.ndarray:
+    """
+    Return a Boolean array, one value per row of data,
+    True on the bars where get_desired_current_position_size
+    may open a position while there are no open trades.
+    It is used only if strategy_params.skip_idle_bars is True.
+    NOTE If you change get_desired_current_position_size,
+    change this function accordingly.
+    If some bar is False here, but get_desired_current_position_size
+    would return not None there, the backtest results will be wrong.
+    """
+    return (data[FEATURE_COL_NAME_ADVANCED] == True).to_numpy()
+
+
+def get_desired_position_size_array(
+    data: pd.DataFrame, strategy_params: StrategyParams
+) -> np.ndarray:
+    """
+    Vectorized alternative to get_desired_current_position_size,
+    used if strategy_params.use_desired_size_array is True.
+    Return the desired position size for every row of data,
+    float in [-1.0; 1.0], NaN - means do nothing at this bar.
+    It can't depend on the open trades and the results of the previous bars,
+    use get_desired_current_position_size if you need them.
+    """
+    # NOTE The same signal as in get_desired_current_position_size above.
+    # With rebalance_same_side False, an open position is kept
+    # until stop-loss, profit target, or special situation closes it.
+    return np.where(data[FEATURE_COL_NAME_ADVANCED] == True, 1.0, np.nan)
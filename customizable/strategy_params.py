@@ -1,14 +1,56 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 @dataclass
 class StrategyParams:
     # NOTE Here you can customize the set of fields,
     # their types and default values.
-    max_trade_duration_long: Optional[int] = 100
-    max_trade_duration_short: Optional[int] = 100
-    profit_target_long_pct: Optional[float] = 29.9
-    profit_target_short_pct: Optional[float] = 29.9
-    stop_loss_default_atr_multiplier: float = 2.5
+
+    # NOTE search_range is (low, high) of the values
+    # that the optimizer tries, both inclusive,
+    # search_step is the distance between neighboring values.
+    # See optimization/search.py.
+    max_trade_duration_long: Optional[int] = field(
+        default=100, metadata={"search_range": (3, 30), "search_step": 1}
+    )
+    max_trade_duration_short: Optional[int] = field(
+        default=100, metadata={"search_range": (3, 30), "search_step": 1}
+    )
+    profit_target_long_pct: Optional[float] = field(
+        default=29.9, metadata={"search_range": (1.0, 20.0), "search_step": 0.5}
+    )
+    profit_target_short_pct: Optional[float] = field(
+        default=29.9, metadata={"search_range": (1.0, 20.0), "search_step": 0.5}
+    )
+    stop_loss_default_atr_multiplier: float = field(
+        default=2.5, metadata={"search_range": (1.0, 5.0), "search_step": 0.25}
+    )
     save_all_trades_in_xlsx: bool = False
+
+    # NOTE If save_all_trades_in_xlsx is True, the values of these columns
+    # at the entry and exit bars are added to every trade in all_trades.xlsx.
+    # See the enrich_trades function.
+    trades_feature_cols: Optional[List[str]] = None
+
+    # NOTE If profile_next_calls is True, the duration of every function call
+    # in the strategy next() is recorded, see utils/bar_profiler.py.
+    # It slows the backtest down, so use it only to find expensive
+    # special situations or position sizing rules.
+    profile_next_calls: bool = False
+
+    # NOTE If skip_idle_bars is True, next() returns immediately
+    # on the bars without open trades, orders, and signal,
+    # see get_signal_mask and get_attention_mask.
+    # The results are the same, if get_signal_mask matches
+    # get_desired_current_position_size.
+    skip_idle_bars: bool = False
+
+    # NOTE If use_desired_size_array is True, the desired position sizes
+    # of all bars are calculated before the backtest
+    # by get_desired_position_size_array,
+    # and get_desired_current_position_size is not called.
+    # If rebalance_same_side is False, the position is not resized
+    # while the desired size stays on the same side, see reconcile_desired_size.
+    use_desired_size_array: bool = False
+    rebalance_same_side: bool = False
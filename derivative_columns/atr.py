@@ -1,6 +1,6 @@
 import pandas as pd
 
-from utils.misc import ensure_df_has_all_required_columns
+from utils.misc import ensure_df_has_all_required_columns, get_df_copy
 
 
 def add_atr_col_to_df(
@@ -17,7 +17,7 @@ def add_atr_col_to_df(
     """
 
     ensure_df_has_all_required_columns(df=df, volume_col_required=False)
-    data = df.copy(deep=True)
+    data = get_df_copy(df)
     high = data["High"]
     low = data["Low"]
     close = data["Close"]
@@ -54,10 +54,12 @@ def add_tr_delta_col_to_ohlc(ohlc_df: pd.DataFrame) -> pd.DataFrame:
     # NOTE 2. tr_delta is a volatility spike indicator.
     # It can be used when building features and forecasts.
 
-    res = ohlc_df.copy()
     rolling_period_tr = 100
     small_atr_period_for_delta = 3
-    res = add_atr_col_to_df(df=res, n=small_atr_period_for_delta)
+
+    # add_atr_col_to_df returns a new DataFrame,
+    # so there is no need to copy ohlc_df here
+    res = add_atr_col_to_df(df=ohlc_df, n=small_atr_period_for_delta)
     res["tr_avg"] = (
         res["tr"]
         .rolling(window=rolling_period_tr, min_periods=rolling_period_tr)
@@ -0,0 +1,52 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.misc import get_df_copy
+
+LOWER_CLOSES_STREAK_COL = "lower_closes_streak"
+HIGHER_CLOSES_STREAK_COL = "higher_closes_streak"
+
+
+def get_streak_lengths(is_true: np.ndarray) -> np.ndarray:
+    """
+    For every element, return the number of consecutive True values
+    ending at it, 0 if the element is False.
+    Example: [T, T, F, T, T, T] -> [1, 2, 0, 1, 2, 3]
+    """
+    is_true = np.asarray(is_true, dtype=bool)
+    positions = np.arange(len(is_true))
+    # NOTE The position of the last False at or before every element,
+    # -1 if there was no False yet
+    last_false = np.maximum.accumulate(np.where(is_true, -1, positions))
+    return positions - last_false
+
+
+def get_closes_streaks(close: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the values of LOWER_CLOSES_STREAK_COL and HIGHER_CLOSES_STREAK_COL
+    for the close prices, see add_consecutive_closes_cols
+    """
+    values = close.to_numpy(dtype=float)
+    prev_values = np.concatenate([[np.nan], values[:-1]])
+    # NOTE Comparisons with NaN are False, so they break the streaks,
+    # like the chains of shift comparisons do
+    return (
+        get_streak_lengths(is_true=values < prev_values),
+        get_streak_lengths(is_true=values > prev_values),
+    )
+
+
+def add_consecutive_closes_cols(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the columns LOWER_CLOSES_STREAK_COL and HIGHER_CLOSES_STREAK_COL,
+    the number of consecutive days, including today,
+    with Close lower (higher) than the previous Close.
+    Closed lower N days in a row is LOWER_CLOSES_STREAK_COL >= N.
+    """
+    res = get_df_copy(df)
+    lower, higher = get_closes_streaks(close=res["Close"])
+    res[LOWER_CLOSES_STREAK_COL] = lower
+    res[HIGHER_CLOSES_STREAK_COL] = higher
+    return res
@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from utils.misc import get_df_copy
+
 
 def check_hammer_candle(
     yesterday_high: float,
@@ -48,7 +50,7 @@ def add_col_is_hammer(df: pd.DataFrame) -> pd.DataFrame:
     """
     Add column is_hammer
     """
-    res = df.copy()
+    res = get_df_copy(df)
     res["yd_high"] = res["High"].shift(1)
     res["yd_low"] = res["Low"].shift(1)
     res["yd_close"] = res["Close"].shift(1)
@@ -1,6 +1,23 @@
+from typing import Union
+
+import numpy as np
 import pandas as pd
 
-from utils.misc import check_df_format
+from utils.kernels import get_kernel
+from utils.misc import check_df_format, get_df_copy
+
+
+def get_day_codes(index: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Return a single integer code of the calendar day for every timestamp,
+    for example 20250414 for 2025-04-14 09:30.
+    Integer codes are much faster to group by than datetime.date objects.
+    """
+    return (
+        index.year.to_numpy(dtype=np.int64) * 10000
+        + index.month.to_numpy(dtype=np.int64) * 100
+        + index.day.to_numpy(dtype=np.int64)
+    )
 
 
 def add_col_ib_high_low(
@@ -41,28 +58,21 @@ def add_col_ib_high_low(
     # 2. Create and populate "Initial balance low" (ib_low) and "Initial balance high" (ib_high)
 
     # Calculate the bar number within each day (0-indexed)
-    bar_number_in_day = df.groupby(df.index.date).cumcount()  # type: ignore
-
-    # Filter for the bars that belong to the Initial Balance period
-    ib_bars = df[bar_number_in_day < num_bars]
+    day_codes = get_day_codes(index=df.index)  # type: ignore
+    bar_number_in_day = df.groupby(day_codes).cumcount().to_numpy()
 
     # Calculate the max High (ib_high) and min Low (ib_low) for the IB period of each day
-    daily_ib = ib_bars.groupby(ib_bars.index.date)[["High", "Low"]].agg(
-        ib_high=("High", "max"), ib_low=("Low", "min")
-    )
-
-    # Merge the daily IB values back into the original DataFrame,
-    # mapping them to all rows of the corresponding day.
-    df["Datetime"] = df.index
-    df = df.reset_index(drop=True)
-    # df["Date"] = df["Datetime"].dt.date
-    df["Date"] = pd.to_datetime(df["Datetime"])
-    df["Date"] = df["Date"].dt.date
-    df = df.merge(daily_ib, left_on="Date", right_index=True, how="left")
-    df = df.drop(columns=["Date"]).set_index("Datetime")
+    # and broadcast them to all rows of the corresponding day.
+    # NOTE Bars outside the IB period are masked with NaN,
+    # so that groupby().transform() ignores them.
+    is_ib_bar = bar_number_in_day < num_bars
+    res = get_df_copy(df)
+    res["ib_high"] = res["High"].where(is_ib_bar).groupby(day_codes).transform("max")
+    res["ib_low"] = res["Low"].where(is_ib_bar).groupby(day_codes).transform("min")
+    res.index = res.index.rename("Datetime")
 
     # 3. Return the dataframe
-    return df
+    return res
 
 
 def check_initial_balance_breach(
@@ -98,42 +108,33 @@ def check_initial_balance_breach(
             f"check_initial_balance_breach: input DF bars interval = {inferred_interval_min} min, should be 5, 15, 30, 45, 60 minutes"
         )
 
-    # 2. Create new Boolean columns
-    df["ib_low_bd"] = False
-    df["ib_high_bt"] = False
-
-    # Calculate number of bars in the initial balance period
+    # 2. Calculate number of bars in the initial balance period
     num_bars = initial_balance_minutes // check_df_res["inferred_interval_minutes"]
-    bar_number_in_day = df.groupby(df.index.date).cumcount()  # type: ignore
+    day_codes = get_day_codes(index=df.index)  # type: ignore
+    bar_number_in_day = df.groupby(day_codes).cumcount()
     post_ib_mask = bar_number_in_day >= num_bars
 
-    # 3. Determine breakdown and breakout using 'Close' price
-
-    breakdown_candidates = (df["Close"] < df["ib_low"]) & post_ib_mask
-
-    first_breakdown_indices = (
-        breakdown_candidates[breakdown_candidates]
-        .groupby(breakdown_candidates[breakdown_candidates].index.date)
-        .idxmin()
-    )
-    df.loc[first_breakdown_indices, "ib_low_bd"] = True
-
-    breakout_candidates = (df["Close"] > df["ib_high"]) & post_ib_mask
-
-    first_breakout_indices = (
-        breakout_candidates[breakout_candidates]
-        .groupby(breakout_candidates[breakout_candidates].index.date)
-        .idxmin()
+    # 3. Create new Boolean columns.
+    # Determine breakdown and breakout using 'Close' price.
+    # The first_breach_per_day kernel scans the bars of every day
+    # until the first breach of each side.
+    ib_low_bd, ib_high_bt = get_kernel("first_breach_per_day")(
+        day_codes,
+        df["Close"].to_numpy(dtype=float),
+        df["ib_low"].to_numpy(dtype=float),
+        df["ib_high"].to_numpy(dtype=float),
+        post_ib_mask.to_numpy(dtype=bool),
     )
-    df.loc[first_breakout_indices, "ib_high_bt"] = True
+    df["ib_low_bd"] = ib_low_bd
+    df["ib_high_bt"] = ib_high_bt
 
     # 4. Return the modified dataframe
     return df
 
 
 def calculate_ib_breakout_and_breakdown_metrics(
-    df: pd.DataFrame,
-) -> tuple[list[dict], list[dict]]:
+    df: pd.DataFrame, as_dataframe: bool = False
+) -> Union[tuple[list[dict], list[dict]], tuple[pd.DataFrame, pd.DataFrame]]:
     """
     Calculates metrics for Initial Balance Low Breakdown (ib_low_bd) and
     Initial Balance High Breakout (ib_high_bt) events.
@@ -142,9 +143,16 @@ def calculate_ib_breakout_and_breakdown_metrics(
     taking a short trade after Initial Balance Low Breakdown has happened,
     as well as a long trade after Initial Balance High Breakout has happened.
 
+    For every event, the trade is entered at the Open of the next bar.
+    The metric is the best move in the trade direction
+    from that price until the end of the event day.
+    Events on the last bar of the day are skipped.
+
     :param df: A Pandas DataFrame with a DatetimeIndex and columns
                'Open', 'High', 'Low', 'ib_low_bd', and 'ib_high_bt'.
-    :return: A tuple containing two lists of dictionaries.
+    :param as_dataframe: If True, return two DataFrames instead of two lists.
+    :return: A tuple containing two lists of dictionaries
+             (or two DataFrames with the same columns).
     """
 
     # 1. Checks that the dataframe has ib_low_bd and ib_high_bt columns.
@@ -157,85 +165,64 @@ def calculate_ib_breakout_and_breakdown_metrics(
     # 2. Checks that the dataframe has a DateTime index.
     if not isinstance(df.index, pd.DatetimeIndex):
         raise TypeError("DataFrame must have a DatetimeIndex.")
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+
+    # 3. Per-day group ids and arrays of the values we need.
+    day_codes = get_day_codes(index=df.index)
+    open_vals = df["Open"].to_numpy(dtype=float)
+
+    # NOTE The next bar belongs to the same day
+    # if and only if there are bars after the event within the day.
+    next_bar_same_day = np.zeros(len(df), dtype=bool)
+    next_bar_same_day[:-1] = day_codes[1:] == day_codes[:-1]
+    next_open = np.full(len(df), np.nan)
+    next_open[:-1] = open_vals[1:]
+
+    # 4. Reverse cumulative min of Low and max of High within each day,
+    # i.e. the lowest Low and the highest High from every bar to the end of its day.
+    # Shifted by one bar, they give the extremes after the event bar.
+    reversed_days = day_codes[::-1]
+    low_to_day_end = (
+        pd.Series(df["Low"].to_numpy(dtype=float)[::-1])
+        .groupby(reversed_days)
+        .cummin()
+        .to_numpy()[::-1]
+    )
+    high_to_day_end = (
+        pd.Series(df["High"].to_numpy(dtype=float)[::-1])
+        .groupby(reversed_days)
+        .cummax()
+        .to_numpy()[::-1]
+    )
+    lowest_low_after = np.full(len(df), np.nan)
+    lowest_low_after[:-1] = low_to_day_end[1:]
+    highest_high_after = np.full(len(df), np.nan)
+    highest_high_after[:-1] = high_to_day_end[1:]
+
+    is_valid_event = next_bar_same_day & (next_open != 0)
+    bd_pos = np.flatnonzero(df["ib_low_bd"].to_numpy(dtype=bool) & is_valid_event)
+    bt_pos = np.flatnonzero(df["ib_high_bt"].to_numpy(dtype=bool) & is_valid_event)
+
+    ib_low_bd_df = pd.DataFrame(
+        {
+            "Date": df.index[bd_pos].date,
+            "Val": (next_open[bd_pos] - lowest_low_after[bd_pos]) / next_open[bd_pos],
+            "next_open": next_open[bd_pos],
+            "lowest_low_after": lowest_low_after[bd_pos],
+        }
+    )
+    ib_high_bt_df = pd.DataFrame(
+        {
+            "Date": df.index[bt_pos].date,
+            "Val": (highest_high_after[bt_pos] - next_open[bt_pos])
+            / next_open[bt_pos],
+        }
+    )
 
-    # 3. Creates empty lists (now containing dictionaries)
-    ib_low_bd_vals = []
-    ib_high_bt_vals = []
-
-    # 4. Iterates the dataframe over days.
-    for _, day_df in df.groupby(df.index.date):
-
-        has_bd = day_df["ib_low_bd"].any()
-        has_bt = day_df["ib_high_bt"].any()
-
-        # Skip if no event
-        if not (has_bd or has_bt):
-            continue
-
-        # --- Procedure for a day that has ib_low_bd True value ---
-        if has_bd:
-            breakdown_times = day_df[day_df["ib_low_bd"]].index
-
-            for bd_time in breakdown_times:
-                current_idx_loc = df.index.get_loc(bd_time)
-
-                # 1. Find the value of the Open column in the next bar
-                next_idx_loc = current_idx_loc + 1
-                if next_idx_loc >= len(df):
-                    continue
-
-                next_open = df.iloc[next_idx_loc]["Open"]
-
-                # 2. Find the minimum value of the Low column after event
-                bars_after_bd = day_df.loc[day_df.index > bd_time]
-
-                if bars_after_bd.empty:
-                    continue
-
-                lowest_low_after_breakdown = bars_after_bd["Low"].min()
-
-                # 3. Calculate the value
-                if next_open != 0:
-                    bd_metric = (next_open - lowest_low_after_breakdown) / next_open
-
-                    # 4. Append dictionary: {'Date': today's day date, 'Val': value}
-                    ib_low_bd_vals.append(
-                        {
-                            "Date": bd_time.date(),
-                            "Val": bd_metric,
-                            "next_open": next_open,
-                            "lowest_low_after": lowest_low_after_breakdown,
-                        }
-                    )
-
-        # --- Procedure for a day that has ib_high_bt True value ---
-        if has_bt:
-            breakout_times = day_df[day_df["ib_high_bt"]].index
-
-            for bt_time in breakout_times:
-                current_idx_loc = df.index.get_loc(bt_time)
-
-                # 1. Find the value of the Open column in the next bar
-                next_idx_loc = current_idx_loc + 1
-                if next_idx_loc >= len(df):
-                    continue
-
-                next_open = df.iloc[next_idx_loc]["Open"]
-
-                # 2. Find the maximum value of the High column after event
-                bars_after_bt = day_df.loc[day_df.index > bt_time]
-
-                if bars_after_bt.empty:
-                    continue
-
-                highest_high_after_breakout = bars_after_bt["High"].max()
-
-                # 3. Calculate the value
-                if next_open != 0:
-                    bt_metric = (highest_high_after_breakout - next_open) / next_open
-
-                    # 4. Append dictionary: {'Date': today's day date, 'Val': value}
-                    ib_high_bt_vals.append({"Date": bt_time.date(), "Val": bt_metric})
-
-    # 5. Returns lists of dictionaries.
-    return ib_low_bd_vals, ib_high_bt_vals
+    # 5. Returns DataFrames or lists of dictionaries.
+    if as_dataframe:
+        return ib_low_bd_df, ib_high_bt_df
+    return ib_low_bd_df.to_dict(orient="records"), ib_high_bt_df.to_dict(
+        orient="records"
+    )
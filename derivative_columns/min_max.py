@@ -1,8 +1,11 @@
 from typing import Tuple
 
+import numpy as np
 import pandas as pd
 
 from constants import ATR_MULTIPLIER, ATR_SMOOTHING_N
+from utils.kernels import get_kernel
+from utils.misc import get_df_copy
 
 from .atr import add_atr_col_to_df
 
@@ -51,7 +54,7 @@ def _get_fill_is_min_max_start_data(df: pd.DataFrame) -> Tuple[pd.Timestamp, str
 def _ensure_required_cols_min_max_in_df(
     df: pd.DataFrame, atr_smoothing_n: int = ATR_SMOOTHING_N
 ) -> pd.DataFrame:
-    internal_df = df.copy()
+    internal_df = get_df_copy(df)
 
     # Ensure ATR column exists
     if f"atr_{atr_smoothing_n}" not in internal_df.columns:
@@ -101,112 +104,70 @@ def _fill_is_min_max(
     """
     if df.empty:
         return df
-    internal_df = df.copy()
+    internal_df = get_df_copy(df)
     start_date, extremum_to_detect = _get_fill_is_min_max_start_data(df=internal_df)
-    current_candidate = {
-        "extremum_to_detect": extremum_to_detect,
-        "date": start_date,
-        "ts_data_val": internal_df[internal_df.index == start_date][col_name].values[0],
-    }
-    for i, row in (
-        internal_df[internal_df.index >= current_candidate["date"]]
-        .sort_index()
-        .iterrows()
-    ):
-        if current_candidate["extremum_to_detect"] == "max":
-            if row[col_name] >= current_candidate["ts_data_val"]:
-                current_candidate["ts_data_val"] = row[col_name]
-                current_candidate["date"] = i
-            elif (current_candidate["ts_data_val"] - row[col_name]) > (
-                row[f"atr_{atr_smoothing_n}"] * atr_multiplier
-            ):
-                internal_df.loc[
-                    internal_df.index == current_candidate["date"], "is_max"
-                ] = True
-                current_candidate["extremum_to_detect"] = "min"
-                current_candidate["date"] = i
-                current_candidate["ts_data_val"] = row[col_name]
-
-        else:  # looking for min, current_candidate['extremum_to_detect'] == 'min'
-            if row[col_name] <= current_candidate["ts_data_val"]:
-                current_candidate["ts_data_val"] = row[col_name]
-                current_candidate["date"] = i
-            elif (row[col_name] - current_candidate["ts_data_val"]) > (
-                row[f"atr_{atr_smoothing_n}"] * atr_multiplier
-            ):
-                internal_df.loc[
-                    internal_df.index == current_candidate["date"], "is_min"
-                ] = True
-                current_candidate["extremum_to_detect"] = "max"
-                current_candidate["date"] = i
-                current_candidate["ts_data_val"] = row[col_name]
+
+    # NOTE The loop over the rows is in the swing_extrema kernel,
+    # the rows are passed in the order of the index
+    sorted_df = internal_df.sort_index(kind="stable")
+    start = int(np.argmax(sorted_df.index >= start_date))
+    is_min, is_max = get_kernel("swing_extrema")(
+        sorted_df[col_name].to_numpy(dtype=float),
+        sorted_df[f"atr_{atr_smoothing_n}"].to_numpy(dtype=float) * atr_multiplier,
+        start,
+        extremum_to_detect == "max",
+    )
+    internal_df.loc[internal_df.index.isin(sorted_df.index[is_max]), "is_max"] = True
+    internal_df.loc[internal_df.index.isin(sorted_df.index[is_min]), "is_min"] = True
     return internal_df
 
 
+def _get_last_and_prev_positions(
+    is_extremum: np.ndarray, before: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For every row, the positions of the last and the previous True values
+    of is_extremum among the first before[row] rows, -1 if there is none
+    """
+    positions = np.flatnonzero(is_extremum)
+    count = np.concatenate([[0], np.cumsum(is_extremum)])[before]
+    padded = np.concatenate([[-1, -1], positions])
+    return padded[count + 1], padded[count]
+
+
 def _fill_min_max_date_val_columns(
     df: pd.DataFrame, col_name: str = "Close"
 ) -> pd.DataFrame:
     """
     In DataFrame, fill columns last_known_max_date, last_known_max_val etc.
+    For every row, only the minimums and maximums
+    with earlier dates are taken into account.
     """
-    internal_df = df.copy()
-    condition_is_min = internal_df["is_min"] == True  # pylint: disable=C0121
-    condition_is_max = internal_df["is_max"] == True  # pylint: disable=C0121
-
-    for i, _ in internal_df.sort_index().iterrows():
-
-        condition_index = internal_df.index < i
-        index_mins = internal_df[condition_index & condition_is_min].index
-        index_maxes = internal_df[condition_index & condition_is_max].index
-
-        try:
-            last_known_max_date = index_maxes[-1]
-        except IndexError:
-            last_known_max_date = None
-
-        try:
-            prev_known_max_date = index_maxes[-2]
-        except IndexError:
-            prev_known_max_date = None
-
-        try:
-            last_known_min_date = index_mins[-1]
-        except IndexError:
-            last_known_min_date = None
-
-        try:
-            prev_known_min_date = index_mins[-2]
-        except IndexError:
-            prev_known_min_date = None
-
-        # fill columns
-        if last_known_max_date is not None:
-            internal_df.loc[internal_df.index == i, "last_known_max_date"] = (
-                last_known_max_date
-            )
-            val = internal_df.loc[last_known_max_date, col_name]
-            internal_df.loc[internal_df.index == i, "last_known_max_val"] = val
-
-        if last_known_min_date is not None:
-            internal_df.loc[internal_df.index == i, "last_known_min_date"] = (
-                last_known_min_date
-            )
-            val = internal_df.loc[last_known_min_date, col_name]
-            internal_df.loc[internal_df.index == i, "last_known_min_val"] = val
-
-        if prev_known_max_date is not None:
-            internal_df.loc[internal_df.index == i, "prev_known_max_date"] = (
-                prev_known_max_date
-            )
-            val = internal_df.loc[prev_known_max_date, col_name]
-            internal_df.loc[internal_df.index == i, "prev_known_max_val"] = val
-
-        if prev_known_min_date is not None:
-            internal_df.loc[internal_df.index == i, "prev_known_min_date"] = (
-                prev_known_min_date
-            )
-            val = internal_df.loc[prev_known_min_date, col_name]
-            internal_df.loc[internal_df.index == i, "prev_known_min_val"] = val
+    internal_df = get_df_copy(df)
+    order = np.argsort(internal_df.index.to_numpy(), kind="stable")
+    sorted_index = internal_df.index[order]
+    sorted_values = internal_df[col_name].to_numpy()[order]
+    # NOTE The number of rows with earlier dates,
+    # the rows with the same date are not before each other
+    before = sorted_index.searchsorted(sorted_index, side="left")
+
+    for suffix in ["min", "max"]:
+        is_extremum = (
+            internal_df[f"is_{suffix}"] == True  # pylint: disable=C0121
+        ).to_numpy()[order]
+        last, prev = _get_last_and_prev_positions(
+            is_extremum=is_extremum, before=before
+        )
+        for prefix, positions in [("last", last), ("prev", prev)]:
+            is_known = positions >= 0
+            rows = order[is_known]
+            known = positions[is_known]
+            internal_df.iloc[
+                rows, internal_df.columns.get_loc(f"{prefix}_known_{suffix}_date")
+            ] = sorted_index[known]
+            internal_df.iloc[
+                rows, internal_df.columns.get_loc(f"{prefix}_known_{suffix}_val")
+            ] = sorted_values[known]
     return internal_df
 
 
@@ -230,9 +191,10 @@ def add_is_min_max_dates_values(
     # NOTE The last_known_max_date, last_known_min_date, prev_known_max_date, prev_known_min_date
     # columns are needed to avoid the look ahead bias when designing features.
 
-    internal_df = df.copy()
+    # _ensure_required_cols_min_max_in_df returns a new DataFrame,
+    # so there is no need to copy df here
     internal_df = _ensure_required_cols_min_max_in_df(
-        df=internal_df, atr_smoothing_n=atr_smoothing_n
+        df=df, atr_smoothing_n=atr_smoothing_n
     )
 
     internal_df = _fill_is_min_max(
@@ -0,0 +1,175 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from utils.misc import ensure_df_has_all_required_columns, get_df_copy
+
+from .rsi import _add_rsi_col_initial_validation
+
+# NOTE add_rsi_column, add_atr_col_to_df and add_moving_average
+# calculate one period per call, with a copy of the DataFrame every time.
+# The functions below calculate many periods at once.
+# Simple moving averages of all periods are the differences
+# of one cumulative sum, exponential ones are linear filters
+# applied to all periods in one call.
+# The results are the same as of the one-period functions
+# up to the floating-point rounding.
+
+
+def _check_periods(periods: Sequence[int], func_name: str) -> List[int]:
+    res = [int(period) for period in periods]
+    if not res:
+        raise ValueError(f"{func_name}: empty periods")
+    if min(res) < 1:
+        raise ValueError(f"{func_name}: {periods=}, all must be >= 1")
+    return res
+
+
+def get_rolling_means(values: np.ndarray, periods: Sequence[int]) -> np.ndarray:
+    """
+    Return the 2-D array, the column j is the simple moving average
+    of values with the window periods[j],
+    the same as pd.Series(values).rolling(periods[j]).mean().
+    A window with at least one NaN gives NaN.
+    """
+    periods = _check_periods(periods=periods, func_name="get_rolling_means")
+    values = np.asarray(values, dtype=float)
+    count = len(values)
+    is_nan = np.isnan(values)
+    # NOTE Centering reduces the rounding errors of the long cumulative sums
+    center = np.nanmean(values) if count and not is_nan.all() else 0.0
+    sums = np.concatenate([[0.0], np.cumsum(np.where(is_nan, 0.0, values - center))])
+    nan_counts = np.concatenate([[0], np.cumsum(is_nan)])
+    res = np.full((count, len(periods)), np.nan)
+    for j, period in enumerate(periods):
+        if period > count:
+            continue
+        window_sums = sums[period:] - sums[:-period]
+        window_nans = nan_counts[period:] - nan_counts[:-period]
+        res[period - 1 :, j] = np.where(
+            window_nans == 0, window_sums / period + center, np.nan
+        )
+    return res
+
+
+def _get_rolling_counts(is_true: np.ndarray, periods: Sequence[int]) -> np.ndarray:
+    counts = np.concatenate([[0], np.cumsum(is_true)])
+    res = np.full((len(is_true), len(periods)), -1)
+    for j, period in enumerate(periods):
+        if period <= len(is_true):
+            res[period - 1 :, j] = counts[period:] - counts[:-period]
+    return res
+
+
+def get_ewm_means(
+    values: np.ndarray, periods: Sequence[int], min_periods: Optional[int] = None
+) -> np.ndarray:
+    """
+    Return the 2-D array, the column j is the exponential moving average
+    of values with the span periods[j], the same as
+    pd.Series(values).ewm(span=periods[j], min_periods=min_periods, adjust=False).mean().
+    If min_periods is None, the min_periods of every column is its period.
+    Only leading NaN values are supported.
+    """
+    periods = _check_periods(periods=periods, func_name="get_ewm_means")
+    values = np.asarray(values, dtype=float)
+    count = len(values)
+    res = np.full((count, len(periods)), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if not len(valid):
+        return res
+    first = valid[0]
+    if np.isnan(values[first:]).any():
+        raise ValueError("get_ewm_means: only leading NaN values are supported")
+    tail = values[first:]
+    for j, period in enumerate(periods):
+        alpha = 2 / (period + 1)
+        # NOTE y[i] = (1 - alpha) * y[i - 1] + alpha * x[i], y[first] = x[first]
+        filtered, _ = lfilter(
+            [alpha], [1, alpha - 1], tail, zi=[(1 - alpha) * tail[0]]
+        )
+        res[first:, j] = filtered
+        column_min_periods = period if min_periods is None else max(min_periods, 1)
+        res[: first + column_min_periods - 1, j] = np.nan
+    return res
+
+
+def add_moving_averages(df: pd.DataFrame, periods: Sequence[int]) -> pd.DataFrame:
+    """
+    Add the columns ma_{period}, the same as add_moving_average for every period
+    """
+    res = get_df_copy(df)
+    means = get_rolling_means(values=res["Close"].to_numpy(), periods=periods)
+    for j, period in enumerate(periods):
+        res[f"ma_{period}"] = means[:, j]
+    return res
+
+
+def add_atr_columns(
+    df: pd.DataFrame, periods: Sequence[int], exponential: bool = False
+) -> pd.DataFrame:
+    """
+    Add the columns tr and atr_{period},
+    the same as add_atr_col_to_df for every period
+    """
+    ensure_df_has_all_required_columns(df=df, volume_col_required=False)
+    res = get_df_copy(df)
+    high = res["High"].to_numpy(dtype=float)
+    low = res["Low"].to_numpy(dtype=float)
+    prev_close = res["Close"].shift().to_numpy(dtype=float)
+    true_range = np.fmax(
+        np.abs(high - low),
+        np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)),
+    )
+    # today we know yesterday's TR only, not today's TR
+    true_range = np.concatenate([[np.nan], true_range[:-1]])
+    res["tr"] = true_range
+    if exponential:
+        means = get_ewm_means(values=true_range, periods=periods)
+    else:
+        means = get_rolling_means(values=true_range, periods=periods)
+    for j, period in enumerate(periods):
+        res[f"atr_{period}"] = means[:, j]
+    return res
+
+
+def add_rsi_columns(
+    df: pd.DataFrame,
+    col_name: str,
+    periods: Sequence[int],
+    ma_type: str = "simple",
+) -> pd.DataFrame:
+    """
+    Add the columns RSI_{period}, the same as add_rsi_column for every period
+    """
+    for period in periods:
+        _add_rsi_col_initial_validation(
+            df=df, col_name=col_name, ma_type=ma_type, period=period
+        )
+    res = get_df_copy(df)
+    # NOTE The first delta is NaN, so the first row of RSI is always NaN
+    delta = np.diff(res[col_name].to_numpy(dtype=float), prepend=np.nan)
+    up = np.clip(delta, 0, None)
+    down = np.abs(np.clip(delta, None, 0))
+    if ma_type == "simple":
+        roll_up = get_rolling_means(values=up, periods=periods)
+        roll_down = get_rolling_means(values=down, periods=periods)
+        # NOTE The differences of the cumulative sums are not exactly 0
+        # for the windows without gains or losses, the counts are exact
+        for roll, values in ((roll_up, up), (roll_down, down)):
+            counts = _get_rolling_counts(is_true=values > 0, periods=periods)
+            roll[(counts == 0) & ~np.isnan(roll)] = 0.0
+    else:
+        roll_up = get_ewm_means(values=up, periods=periods, min_periods=0)
+        roll_down = get_ewm_means(values=down, periods=periods, min_periods=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 * roll_up / (roll_up + roll_down)
+    # Avoid division-by-zero if roll_down is zero, like in add_rsi_column
+    rsi[roll_up == 0] = 0.0
+    rsi[roll_down == 0] = 100.0
+    np.clip(rsi, 0, 100, out=rsi)
+    for j, period in enumerate(periods):
+        res[f"RSI_{period}"] = rsi[:, j]
+    return res
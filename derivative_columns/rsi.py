@@ -1,13 +1,17 @@
-from typing import Callable
+from typing import Callable, Optional
 
 import numpy as np
 import pandas as pd
 
 from constants import RSI_PERIOD
+from utils.misc import get_df_copy
 
 
 def _add_rsi_col_initial_validation(
-    df: pd.DataFrame, col_name: str, ma_type: str = "simple"
+    df: pd.DataFrame,
+    col_name: str,
+    ma_type: str = "simple",
+    period: Optional[int] = None,
 ) -> None:
     """Helper function to preform input validation for the add_rsi_column function"""
     if df.empty:
@@ -16,8 +20,11 @@ def _add_rsi_col_initial_validation(
         raise ValueError(f"add_rsi_column: no {col_name} column in input DataFrame")
     if ma_type not in ["simple", "exponential"]:
         raise ValueError(f"add_rsi_column: {ma_type=}, must be simple or exponential")
-    if RSI_PERIOD < 2:
-        raise ValueError(f"add_rsi_column: {RSI_PERIOD=}, must be >= 2")
+    period_name = "RSI_PERIOD" if period is None else "period"
+    if period is None:
+        period = RSI_PERIOD
+    if period < 2:
+        raise ValueError(f"add_rsi_column: {period_name}={period}, must be >= 2")
 
 
 def _calculate_ma(
@@ -37,7 +44,10 @@ def _calculate_ma(
 
 
 def add_rsi_column(
-    df: pd.DataFrame, col_name: str, ma_type: str = "simple"
+    df: pd.DataFrame,
+    col_name: str,
+    ma_type: str = "simple",
+    period: Optional[int] = None,
 ) -> pd.DataFrame:
     """
     Adds the Relative Strength Index (RSI) column to a DataFrame.
@@ -50,19 +60,25 @@ def add_rsi_column(
         col_name (str): The name of the column in `df` that contains the price data.
         ma_type (str, optional): The type of moving average to use ('simple' or 'exponential').
                                   Defaults to 'simple'.
+        period (int, optional): The RSI period. Defaults to `RSI_PERIOD`.
+                                To add several periods at once, see `add_rsi_columns`.
 
     Returns:
-        pd.DataFrame: A new DataFrame with the RSI column added, named 'RSI_{RSI_PERIOD}'.
+        pd.DataFrame: A new DataFrame with the RSI column added, named 'RSI_{period}'.
 
     Raises:
         ValueError: If the input DataFrame is empty, the specified column does not exist,
-                    the `ma_type` is invalid, or `RSI_PERIOD` is less than 2.
+                    the `ma_type` is invalid, or the period is less than 2.
     """
     # NOTE inspired by https://stackoverflow.com/a/29400434/3139228
 
-    _add_rsi_col_initial_validation(df=df, col_name=col_name, ma_type=ma_type)
+    _add_rsi_col_initial_validation(
+        df=df, col_name=col_name, ma_type=ma_type, period=period
+    )
+    if period is None:
+        period = RSI_PERIOD
 
-    internal_df = df.copy()
+    internal_df = get_df_copy(df)
     # Get the difference in price
     delta = internal_df[col_name].diff()
     # Get rid of the first row, which is NaN
@@ -71,17 +87,17 @@ def add_rsi_column(
     # Make the positive gains (up) and negative gains (down) Series
     up, down = delta.clip(lower=0), delta.clip(upper=0).abs()
 
-    roll_up = _calculate_ma(series=up, period=RSI_PERIOD, ma_type=ma_type)
-    roll_down = _calculate_ma(series=down, period=RSI_PERIOD, ma_type=ma_type)
+    roll_up = _calculate_ma(series=up, period=period, ma_type=ma_type)
+    roll_down = _calculate_ma(series=down, period=period, ma_type=ma_type)
     rs = roll_up / roll_down
     rsi = 100.0 - (100.0 / (1.0 + rs))
     # Avoid division-by-zero if `roll_down` is zero
     # This prevents inf and/or nan values.
     rsi[:] = np.select([roll_down == 0, roll_up == 0, True], [100, 0, rsi])
     # check results again
-    valid_rsi = rsi[RSI_PERIOD - 1 :]
+    valid_rsi = rsi[period - 1 :]
     assert ((0 <= valid_rsi) & (valid_rsi <= 100)).all()
-    # Note: rsi[:RSI_PERIOD - 1] is excluded from above assertion
+    # Note: rsi[:period - 1] is excluded from above assertion
     # because it is NaN for simple MA.
-    internal_df[f"RSI_{RSI_PERIOD}"] = rsi
+    internal_df[f"RSI_{period}"] = rsi
     return internal_df
@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from utils.misc import get_df_copy
+
 
 def check_shooting_star_candle(
     yesterday_high: float,
@@ -47,7 +49,7 @@ def add_col_is_shooting_star(df: pd.DataFrame) -> pd.DataFrame:
     """
     Add column is_shooting_star
     """
-    res = df.copy()
+    res = get_df_copy(df)
     res["yd_high"] = res["High"].shift(1)
     res["yd_low"] = res["Low"].shift(1)
     res["yd_close"] = res["Close"].shift(1)
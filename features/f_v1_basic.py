@@ -2,7 +2,13 @@ import pandas as pd
 
 from constants import FEATURE_COL_NAME_ADVANCED, FEATURE_COL_NAME_BASIC
 from derivative_columns.atr import add_atr_col_to_df
+from derivative_columns.consecutive_closes import (
+    HIGHER_CLOSES_STREAK_COL,
+    LOWER_CLOSES_STREAK_COL,
+    get_closes_streaks,
+)
 from derivative_columns.ma import add_moving_average
+from utils.misc import get_df_copy
 
 MOVING_AVERAGE_N = 200
 REQUIRED_DERIVATIVE_COLUMNS_F_V1_BASIC = {"atr_14", f"ma_{MOVING_AVERAGE_N}"}
@@ -13,9 +19,12 @@ def add_required_cols_for_f_v1_basic(df: pd.DataFrame) -> pd.DataFrame:
     Ensure that every column listed in REQUIRED_DERIVATIVE_COLUMNS_F_V1_BASIC is present in the DF
     """
     df_columns = df.columns
-    internal_df = df.copy()
     if f"ma_{MOVING_AVERAGE_N}" not in df_columns:
-        internal_df = add_moving_average(df=internal_df, n=MOVING_AVERAGE_N)
+        # add_moving_average returns a new DataFrame,
+        # so there is no need to copy df here
+        internal_df = add_moving_average(df=df, n=MOVING_AVERAGE_N)
+    else:
+        internal_df = get_df_copy(df)
     if "atr_14" not in df_columns:
         if "tr" in df_columns:
             internal_df["atr_14"] = internal_df["tr"].rolling(14).mean()
@@ -46,11 +55,12 @@ def add_features_v1_basic(
     # functools.partial is used for that.
     # See the example in the run_strategy_main_optimize.py file.
 
-    res = df.copy()
-
-    for col in REQUIRED_DERIVATIVE_COLUMNS_F_V1_BASIC:
-        if col not in res.columns:
-            res = add_required_cols_for_f_v1_basic(df=res)
+    # NOTE add_required_cols_for_f_v1_basic adds all missing columns at once
+    # and returns a new DataFrame, so call it at most once
+    if REQUIRED_DERIVATIVE_COLUMNS_F_V1_BASIC.issubset(df.columns):
+        res = get_df_copy(df)
+    else:
+        res = add_required_cols_for_f_v1_basic(df=df)
 
     # Customize below
 
@@ -85,47 +95,80 @@ def add_features_v2_basic(df: pd.DataFrame) -> pd.DataFrame:
     today's close price is lower than yesterday's close price
     """
 
-    res = df.copy()
+    res = get_df_copy(df)
     res[FEATURE_COL_NAME_BASIC] = res["Close"] < res["Close"].shift(1)
     return res
 
 
+def _add_closes_streak_feature(
+    df: pd.DataFrame, streak_col_name: str, n: int
+) -> pd.DataFrame:
+    """
+    FEATURE_COL_NAME_BASIC is streak_col_name >= n.
+    If df has no streak_col_name column, the streak is calculated
+    without adding it, so the result has the same columns as before.
+    """
+    # NOTE For many n, add the streak columns once with add_consecutive_closes_cols,
+    # then every feature is a cheap comparison
+    res = get_df_copy(df)
+    if streak_col_name in res.columns:
+        streak = res[streak_col_name].to_numpy()
+    else:
+        lower, higher = get_closes_streaks(close=res["Close"])
+        streak = lower if streak_col_name == LOWER_CLOSES_STREAK_COL else higher
+    res[FEATURE_COL_NAME_BASIC] = streak >= n
+    return res
+
+
+def add_feature_closed_lower_n_days_in_a_row(
+    df: pd.DataFrame, n: int = 2
+) -> pd.DataFrame:
+    """
+    Feature: closed lower n days in a row.
+    To pass it as add_feature_cols_func with another n, use functools.partial.
+    """
+    if n < 1:
+        raise ValueError(
+            f"add_feature_closed_lower_n_days_in_a_row: {n=}, must be >= 1"
+        )
+    return _add_closes_streak_feature(
+        df=df, streak_col_name=LOWER_CLOSES_STREAK_COL, n=n
+    )
+
+
+def add_feature_closed_higher_n_days_in_a_row(
+    df: pd.DataFrame, n: int = 2
+) -> pd.DataFrame:
+    """
+    Feature: closed higher n days in a row.
+    """
+    if n < 1:
+        raise ValueError(
+            f"add_feature_closed_higher_n_days_in_a_row: {n=}, must be >= 1"
+        )
+    return _add_closes_streak_feature(
+        df=df, streak_col_name=HIGHER_CLOSES_STREAK_COL, n=n
+    )
+
+
 def add_feature_closed_lower_twice(df: pd.DataFrame) -> pd.DataFrame:
     """
     Feature: today's close price is lower than yesterday's close price,
     also yesterday's close price is lower
     than the day before yesterday's close price.
     """
-
-    res = df.copy()
-    res[FEATURE_COL_NAME_BASIC] = (res["Close"] < res["Close"].shift(1)) & (
-        res["Close"].shift(1) < res["Close"].shift(2)
-    )
-    return res
+    return add_feature_closed_lower_n_days_in_a_row(df=df, n=2)
 
 
 def add_feature_closed_lower_3_days_in_a_row(df: pd.DataFrame) -> pd.DataFrame:
     """
     Feature: closed lower 3 days in a row.
     """
-    res = df.copy()
-    res[FEATURE_COL_NAME_BASIC] = (
-        (res["Close"] < res["Close"].shift(1))
-        & (res["Close"].shift(1) < res["Close"].shift(2))
-        & (res["Close"].shift(2) < res["Close"].shift(3))
-    )
-    return res
+    return add_feature_closed_lower_n_days_in_a_row(df=df, n=3)
 
 
 def add_feature_closed_lower_4_days_in_a_row(df: pd.DataFrame) -> pd.DataFrame:
     """
     Feature: closed lower 4 days in a row.
     """
-    res = df.copy()
-    res[FEATURE_COL_NAME_BASIC] = (
-        (res["Close"] < res["Close"].shift(1))
-        & (res["Close"].shift(1) < res["Close"].shift(2))
-        & (res["Close"].shift(2) < res["Close"].shift(3))
-        & (res["Close"].shift(3) < res["Close"].shift(4))
-    )
-    return res
+    return add_feature_closed_lower_n_days_in_a_row(df=df, n=4)
@@ -0,0 +1,393 @@
+import copy
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from customizable import StrategyParams
+from strategy.execution_profile import compute_light_stats
+from strategy.portfolio import (
+    InstrumentView,
+    PortfolioConfig,
+    _PortfolioAccount,
+    _step_instrument,
+)
+from utils.strategy_exec import get_trade_book
+from utils.strategy_exec.sl_pt import get_n_atr, get_new_stop_loss
+
+from .search import ParamRange, _params_key
+
+# NOTE The backtests of parameter sets that differ only
+# in the BRANCHING_FIELDS go bar by bar through the same states
+# until some of these parameters changes a decision.
+# E.g., max_trade_duration_long 8 and 12 give the same trades
+# until a trade lasts more than 8 days.
+# The simulator keeps one branch per group of parameter sets
+# that are still in the same state.
+# Before every bar, it checks how every BRANCHING_FIELDS value
+# of the group would act on the current state,
+# and forks the branch if they would act differently.
+# When branches are flat and have the same trades and equity,
+# they are merged again.
+# The state is the one-ticker portfolio engine from strategy/portfolio.py,
+# that gives the same trades as run_backtest_for_ticker
+# and can be copied, unlike the Backtest of the backtesting package.
+
+BRANCHING_FIELDS = (
+    "max_trade_duration_long",
+    "max_trade_duration_short",
+    "profit_target_long_pct",
+    "profit_target_short_pct",
+    "stop_loss_default_atr_multiplier",
+)
+
+# NOTE The same settings as the Backtest in run_backtest_for_ticker
+BRANCHING_CONFIG = PortfolioConfig(cash=10000, commission=0.001, margin=0.02)
+
+
+@dataclass
+class BranchingResult:
+    """
+    stats - light stats of every parameter set in the order of params_list,
+    see compute_light_stats,
+    step_count - the number of strategy steps done by all branches,
+    compare it with len(params_list) * number of bars,
+    max_branch_count - the greatest number of branches at the same time.
+    """
+
+    stats: List[pd.Series]
+    step_count: int
+    max_branch_count: int
+
+
+class _Branch:
+    def __init__(
+        self,
+        account: _PortfolioAccount,
+        instrument: InstrumentView,
+        members: List[int],
+        equity: np.ndarray,
+    ):
+        self.account = account
+        self.instrument = instrument
+        self.members = members
+        self.equity = equity
+        self.is_finished = False
+
+    def fork(self, members: List[int]) -> "_Branch":
+        """
+        Copy the state, sharing the data arrays and the closed trades
+        """
+        instrument = self.instrument
+        memo = {
+            id(instrument.data): instrument.data,
+            id(instrument.atr): instrument.atr,
+            id(instrument.parameters): instrument.parameters,
+            id(instrument.desired_sizes): instrument.desired_sizes,
+            id(instrument.attention_mask): instrument.attention_mask,
+        }
+        for trade in instrument.closed_trades:
+            memo[id(trade)] = trade
+        account, instrument = copy.deepcopy((self.account, instrument), memo)
+        return _Branch(
+            account=account,
+            instrument=instrument,
+            members=members,
+            equity=self.equity.copy(),
+        )
+
+    def get_merge_key(self) -> Tuple:
+        closed_trades = self.instrument.closed_trades
+        return (
+            self.account.cash,
+            len(closed_trades),
+            tuple(
+                (t.entry_bar, t.exit_bar, t.size, t.entry_price, t.exit_price, t.tag)
+                for t in closed_trades
+            ),
+        )
+
+
+def _get_decision_key(instrument: InstrumentView, params: StrategyParams) -> Tuple:
+    """
+    What the BRANCHING_FIELDS values of params would do today
+    in the state of the instrument.
+    The parameter sets with the same key make the same decisions.
+    """
+    book = get_trade_book(strategy=instrument)
+    if not book.trades:
+        return tuple()
+
+    # update_stop_losses
+    n_atr = get_n_atr(
+        strategy=instrument,
+        book=book,
+        stop_loss_default_atr_multiplier=params.stop_loss_default_atr_multiplier,
+    )
+    sl_key = tuple(
+        get_new_stop_loss(strategy=instrument, trade=trade, n_atr=n_atr)
+        for trade in book.trades
+    )
+
+    # check_set_profit_targets_long_trades and check_set_profit_targets_short_trades
+    tp_long_key = None
+    if book.long_trades_without_tp:
+        pct = params.profit_target_long_pct
+        tp_long_key = (pct is None, pct if book.min_tp_long is None else None)
+    tp_short_key = None
+    if book.short_trades_without_tp:
+        pct = params.profit_target_short_pct
+        tp_short_key = (pct is None, pct if book.max_tp_short is None else None)
+
+    # process_max_duration, the trade durations don't depend on the steps above
+    duration = (instrument.data.index[-1] - book.earliest_entry_time).days
+    max_duration = (
+        params.max_trade_duration_long
+        if book.trades[-1].is_long
+        else params.max_trade_duration_short
+    )
+    duration_key = max_duration is not None and duration > max_duration
+    return sl_key, tp_long_key, tp_short_key, duration_key
+
+
+def _split_branch(
+    branch: _Branch, params_list: List[StrategyParams]
+) -> List[_Branch]:
+    groups: Dict[Tuple, List[int]] = dict()
+    for member in branch.members:
+        key = _get_decision_key(instrument=branch.instrument, params=params_list[member])
+        groups.setdefault(key, list()).append(member)
+    if len(groups) == 1:
+        return [branch]
+    members_list = list(groups.values())
+    res = [branch.fork(members=members) for members in members_list[1:]]
+    branch.members = members_list[0]
+    return [branch] + res
+
+
+def _merge_branches(branches: List[_Branch], bar: int) -> List[_Branch]:
+    """
+    Merge the flat branches with the same closed trades and equity
+    """
+    res: List[_Branch] = list()
+    flat: Dict[Tuple, List[_Branch]] = dict()
+    for branch in branches:
+        instrument = branch.instrument
+        if (
+            branch.is_finished
+            or instrument.trades
+            or instrument.market_orders
+            or instrument.close_orders
+        ):
+            res.append(branch)
+            continue
+        key = (branch.account.cash, len(instrument.closed_trades))
+        flat.setdefault(key, list()).append(branch)
+    for candidates in flat.values():
+        kept: List[Tuple[Tuple, _Branch]] = list()
+        for branch in candidates:
+            merge_key = branch.get_merge_key() if len(candidates) > 1 else None
+            for other_key, other in kept:
+                if other_key == merge_key and np.array_equal(
+                    other.equity[: bar + 1], branch.equity[: bar + 1]
+                ):
+                    other.members = sorted(other.members + branch.members)
+                    break
+            else:
+                kept.append((merge_key, branch))
+        res.extend(branch for _, branch in kept)
+    return res
+
+
+def _check_params_list(params_list: List[StrategyParams]) -> None:
+    if not params_list:
+        raise ValueError("simulate_param_sets: empty params_list")
+    first = {
+        name: value
+        for name, value in asdict(params_list[0]).items()
+        if name not in BRANCHING_FIELDS
+    }
+    for params in params_list[1:]:
+        other = {
+            name: value
+            for name, value in asdict(params).items()
+            if name not in BRANCHING_FIELDS
+        }
+        if other != first:
+            raise ValueError(
+                f"simulate_param_sets: all parameter sets must have the same fields except {BRANCHING_FIELDS}"
+            )
+
+
+def simulate_param_sets(
+    data: pd.DataFrame,
+    params_list: List[StrategyParams],
+    ticker: str = "",
+) -> BranchingResult:
+    """
+    Backtest all parameter sets on the data of one ticker,
+    return the same stats as run_backtest_for_ticker
+    in the OPTIMIZE profile with keep_equity_curve=True.
+    The parameter sets may differ only in the BRANCHING_FIELDS.
+
+    NOTE get_signal_mask and get_desired_position_size_array
+    are called with the first parameter set,
+    they must not depend on the BRANCHING_FIELDS.
+    The trades of the merged branches keep the stop-losses
+    and take profits of one of them, they don't affect the stats.
+    """
+    _check_params_list(params_list=params_list)
+    account = _PortfolioAccount(count=1, config=BRANCHING_CONFIG)
+    instrument = InstrumentView(
+        account=account,
+        account_index=0,
+        ticker=ticker,
+        data=data,
+        strategy_params=params_list[0],
+        weight=1.0,
+    )
+    # NOTE The masks would be calculated with the first parameter set only,
+    # and a precondition may depend on the BRANCHING_FIELDS,
+    # so without masks all special situation handlers are called
+    instrument.special_situation_masks = None
+    branches = [
+        _Branch(
+            account=account,
+            instrument=instrument,
+            members=list(range(len(params_list))),
+            equity=np.full(len(data), np.nan),
+        )
+    ]
+    prices = {
+        col: data[col].to_numpy(dtype=float) for col in ["Open", "High", "Low", "Close"]
+    }
+    zero_index = np.array([0])
+    step_count = 0
+    max_branch_count = 1
+    for t in range(len(data)):
+        # NOTE all branches share the data, so its length is set once
+        instrument.data._len = t + 1
+        for branch in branches:
+            if branch.is_finished:
+                continue
+            account = branch.account
+            account.last_close[0] = prices["Close"][t]
+            if (
+                account.has_orders[0]
+                or account.get_stop_hits(
+                    indices=zero_index,
+                    high=prices["High"][t : t + 1],
+                    low=prices["Low"][t : t + 1],
+                )[0]
+            ):
+                account.process_orders(
+                    instrument=branch.instrument,
+                    open_=prices["Open"][t],
+                    high=prices["High"][t],
+                    low=prices["Low"][t],
+                )
+                account.sync(instrument=branch.instrument)
+            branch.equity[t] = account.equity
+            if branch.equity[t] <= 0:
+                for trade in list(branch.instrument.trades):
+                    account.close_trade(
+                        instrument=branch.instrument,
+                        trade=trade,
+                        price=prices["Close"][t],
+                        bar=t,
+                    )
+                branch.equity[t:] = 0
+                branch.is_finished = True
+
+        # NOTE Like in Backtest.run, the strategy starts at the second bar
+        if t < 1:
+            continue
+        new_branches: List[_Branch] = list()
+        for branch in branches:
+            if branch.is_finished:
+                new_branches.append(branch)
+                continue
+            for part in _split_branch(branch=branch, params_list=params_list):
+                part.instrument.parameters = params_list[part.members[0]]
+                _step_instrument(instrument=part.instrument)
+                part.account.sync(instrument=part.instrument)
+                step_count = step_count + 1
+                new_branches.append(part)
+        max_branch_count = max(max_branch_count, len(new_branches))
+        branches = (
+            _merge_branches(branches=new_branches, bar=t)
+            if len(new_branches) > 1
+            else new_branches
+        )
+
+    stats: List[Optional[pd.Series]] = [None] * len(params_list)
+    for branch in branches:
+        branch_stats = compute_light_stats(
+            trades=branch.instrument.closed_trades,
+            equity=branch.equity,
+            ohlc_data=data,
+            strategy_instance=None,
+            keep_equity_curve=True,
+        )
+        for member in branch.members:
+            stats[member] = branch_stats
+    return BranchingResult(
+        stats=stats, step_count=step_count, max_branch_count=max_branch_count
+    )
+
+
+def run_branching_grid_search(
+    tickers_data: Dict[str, pd.DataFrame],
+    param_ranges: List[ParamRange],
+    fixed_params: Optional[dict] = None,
+) -> pd.DataFrame:
+    """
+    Evaluate all combinations of param_ranges, which must be BRANCHING_FIELDS,
+    by simulate_param_sets.
+    Return the DataFrame in the format of run_search with GridSearch,
+    score is the mean SQN_modified of the tickers, see get_sqn_modified_mean.
+    """
+    names = [param_range.name for param_range in param_ranges]
+    not_branching = [name for name in names if name not in BRANCHING_FIELDS]
+    if not_branching:
+        raise ValueError(
+            f"run_branching_grid_search: {not_branching} not in BRANCHING_FIELDS"
+        )
+    field_names = {f.name for f in fields(StrategyParams)}
+    grid = pd.MultiIndex.from_product(
+        [param_range.get_values().tolist() for param_range in param_ranges],
+        names=names,
+    )
+    params_dicts = [
+        {name: value for name, value in zip(names, values)} for values in grid
+    ]
+    params_list = [
+        StrategyParams(
+            **{
+                name: value
+                for name, value in {**(fixed_params or dict()), **params}.items()
+                if name in field_names
+            }
+        )
+        for params in params_dicts
+    ]
+    values: Dict[Tuple, List[float]] = {
+        _params_key(params): list() for params in params_dicts
+    }
+    for ticker, data in tickers_data.items():
+        if len(data) < 2:
+            continue
+        result = simulate_param_sets(data=data, params_list=params_list, ticker=ticker)
+        for params, stat in zip(params_dicts, result.stats):
+            if stat["# Trades"] > 0:
+                values[_params_key(params)].append(
+                    stat["SQN"] / np.sqrt(stat["# Trades"])
+                )
+    rows = list()
+    for params in params_dicts:
+        values_arr = np.asarray(values[_params_key(params)], dtype=float)
+        values_arr = values_arr[~np.isnan(values_arr)]
+        score = values_arr.mean() if values_arr.size else np.nan
+        rows.append({"trial": len(rows) + 1, **params, "score": score})
+    return pd.DataFrame(rows)
@@ -0,0 +1,312 @@
+import itertools
+import math
+import sys
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, fields
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from customizable import StrategyParams
+from utils.results_writer import ResultsWriter
+
+# NOTE Every search strategy works in ask-tell mode:
+# ask() returns the next parameter set to evaluate,
+# tell() reports its score, the greater the better.
+# Grid search tries all the combinations,
+# random search samples them uniformly,
+# TPE search (Tree-structured Parzen Estimator) models the scores
+# of the parameter sets evaluated so far
+# and proposes the parameter sets that are likely to score well.
+# See run_search for the evaluation loop.
+
+
+@dataclass
+class ParamRange:
+    """
+    Values from low to high, both inclusive, with the given step
+    """
+
+    name: str
+    low: float
+    high: float
+    step: float
+
+    def __post_init__(self):
+        if self.high < self.low or self.step <= 0:
+            raise ValueError(
+                f"ParamRange: bad range for {self.name}, {self.low=}, {self.high=}, {self.step=}"
+            )
+
+    @property
+    def is_int(self) -> bool:
+        return all(float(x).is_integer() for x in [self.low, self.high, self.step])
+
+    def get_values(self) -> np.ndarray:
+        count = int(math.floor((self.high - self.low) / self.step + 1e-9)) + 1
+        return self.snap(self.low + self.step * np.arange(count))
+
+    def snap(self, values: np.ndarray) -> np.ndarray:
+        """
+        Round the values to the nearest allowed values
+        """
+        steps = np.round((np.clip(values, self.low, self.high) - self.low) / self.step)
+        res = np.minimum(self.low + steps * self.step, self.high)
+        if self.is_int:
+            return res.astype(int)
+        # NOTE avoid values like 2.5000000000000004
+        return np.round(res, 10)
+
+
+def get_param_ranges_from_strategy_params(
+    names: Optional[List[str]] = None,
+) -> List[ParamRange]:
+    """
+    Read search_range and search_step from the metadata
+    of the StrategyParams fields.
+    If names is provided, return the ranges of these fields in this order.
+    """
+    ranges = dict()
+    for f in fields(StrategyParams):
+        if "search_range" not in f.metadata:
+            continue
+        low, high = f.metadata["search_range"]
+        step = f.metadata.get("search_step", 1)
+        ranges[f.name] = ParamRange(name=f.name, low=low, high=high, step=step)
+    if names is None:
+        return list(ranges.values())
+    missing = [name for name in names if name not in ranges]
+    if missing:
+        raise ValueError(
+            f"get_param_ranges_from_strategy_params: no search_range in StrategyParams for {missing}"
+        )
+    return [ranges[name] for name in names]
+
+
+def _params_key(params: dict) -> Tuple:
+    return tuple(sorted(params.items()))
+
+
+class SearchStrategy(ABC):
+    def __init__(self, param_ranges: List[ParamRange], seed: int = 1):
+        if not param_ranges:
+            raise ValueError(f"{self.__class__.__name__}: empty param_ranges")
+        self.param_ranges = param_ranges
+        self.rng = np.random.default_rng(seed)
+        self.history: List[Tuple[dict, float]] = list()
+
+    @abstractmethod
+    def ask(self) -> Optional[dict]:
+        """
+        Return the next parameter set, None if there is nothing left to try
+        """
+
+    def tell(self, params: dict, score: float) -> None:
+        self.history.append((params, score))
+
+    def _to_params(self, values: np.ndarray) -> dict:
+        return {
+            param_range.name: param_range.snap(np.array([value]))[0].item()
+            for param_range, value in zip(self.param_ranges, values)
+        }
+
+    def _sample_uniform(self) -> dict:
+        return self._to_params(
+            np.array(
+                [
+                    self.rng.uniform(param_range.low, param_range.high)
+                    for param_range in self.param_ranges
+                ]
+            )
+        )
+
+
+class GridSearch(SearchStrategy):
+    def __init__(self, param_ranges: List[ParamRange], seed: int = 1):
+        super().__init__(param_ranges=param_ranges, seed=seed)
+        self._grid = itertools.product(
+            *[param_range.get_values().tolist() for param_range in param_ranges]
+        )
+
+    def ask(self) -> Optional[dict]:
+        values = next(self._grid, None)
+        if values is None:
+            return None
+        return {
+            param_range.name: value
+            for param_range, value in zip(self.param_ranges, values)
+        }
+
+
+class RandomSearch(SearchStrategy):
+    def ask(self) -> Optional[dict]:
+        return self._sample_uniform()
+
+
+class TPESearch(SearchStrategy):
+    """
+    Tree-structured Parzen Estimator.
+    1. The first n_startup parameter sets are sampled uniformly.
+    2. Then the evaluated sets are split into the good ones
+    (the best gamma share by score) and the rest.
+    3. For every parameter, the density of its good values l(x)
+    and of the other values g(x) are estimated
+    by mixtures of normal distributions truncated to the range.
+    4. n_candidates parameter sets are sampled from l(x),
+    and the one with the greatest l(x) / g(x) is returned.
+    The parameters are modeled independently.
+    """
+
+    def __init__(
+        self,
+        param_ranges: List[ParamRange],
+        seed: int = 1,
+        n_startup: int = 10,
+        gamma: float = 0.25,
+        n_candidates: int = 64,
+    ):
+        super().__init__(param_ranges=param_ranges, seed=seed)
+        if not 0 < gamma < 1:
+            raise ValueError(f"TPESearch: {gamma=}, should be between 0 and 1")
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+
+    def _get_bandwidths(self, points: np.ndarray, param_range: ParamRange) -> np.ndarray:
+        """
+        Every point gets the distance to its farthest neighbor as bandwidth,
+        clipped to a reasonable share of the range.
+        """
+        width = max(param_range.high - param_range.low, param_range.step)
+        sorted_points = np.sort(points)
+        padded = np.concatenate(([param_range.low], sorted_points, [param_range.high]))
+        neighbor_distance = np.maximum(
+            padded[1:-1] - padded[:-2], padded[2:] - padded[1:-1]
+        )
+        bandwidths = np.clip(
+            neighbor_distance, max(param_range.step, width / 100), width
+        )
+        # restore the order of points
+        res = np.empty_like(bandwidths)
+        res[np.argsort(points)] = bandwidths
+        return res
+
+    def _log_density(
+        self, x: np.ndarray, points: np.ndarray, param_range: ParamRange
+    ) -> np.ndarray:
+        """
+        Log density of the mixture of truncated normal distributions
+        centered at the points, plus a uniform prior component
+        """
+        bandwidths = self._get_bandwidths(points=points, param_range=param_range)
+        low, high = param_range.low, param_range.high
+        width = max(high - low, param_range.step)
+        normalizers = norm.cdf((high - points) / bandwidths) - norm.cdf(
+            (low - points) / bandwidths
+        )
+        densities = norm.pdf(
+            (x[:, None] - points[None, :]) / bandwidths[None, :]
+        ) / (bandwidths * np.maximum(normalizers, 1e-12))[None, :]
+        mixture = (densities.sum(axis=1) + 1 / width) / (points.size + 1)
+        return np.log(mixture)
+
+    def _sample_from_mixture(
+        self, points: np.ndarray, param_range: ParamRange, size: int
+    ) -> np.ndarray:
+        bandwidths = self._get_bandwidths(points=points, param_range=param_range)
+        components = self.rng.integers(low=0, high=points.size + 1, size=size)
+        res = self.rng.uniform(param_range.low, param_range.high, size=size)
+        from_points = components < points.size
+        res[from_points] = self.rng.normal(
+            loc=points[components[from_points]], scale=bandwidths[components[from_points]]
+        )
+        return np.clip(res, param_range.low, param_range.high)
+
+    def ask(self) -> Optional[dict]:
+        if len(self.history) < self.n_startup:
+            return self._sample_uniform()
+
+        scores = np.array([score for _, score in self.history], dtype=float)
+        # NOTE NaN scores (e.g., no trades) are treated as the worst ones
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+        order = np.argsort(-scores, kind="stable")
+        good_count = max(1, int(math.ceil(self.gamma * len(scores))))
+        good, bad = order[:good_count], order[good_count:]
+
+        log_ratio = np.zeros(self.n_candidates)
+        candidate_values = list()
+        for param_range in self.param_ranges:
+            all_values = np.array(
+                [params[param_range.name] for params, _ in self.history], dtype=float
+            )
+            good_values, bad_values = all_values[good], all_values[bad]
+            candidates = param_range.snap(
+                self._sample_from_mixture(
+                    points=good_values, param_range=param_range, size=self.n_candidates
+                )
+            ).astype(float)
+            log_ratio = log_ratio + self._log_density(
+                x=candidates, points=good_values, param_range=param_range
+            )
+            if bad_values.size:
+                log_ratio = log_ratio - self._log_density(
+                    x=candidates, points=bad_values, param_range=param_range
+                )
+            candidate_values.append(candidates)
+
+        tried = {_params_key(params) for params, _ in self.history}
+        for i in np.argsort(-log_ratio, kind="stable"):
+            params = self._to_params(np.array([values[i] for values in candidate_values]))
+            if _params_key(params) not in tried:
+                return params
+        return self._sample_uniform()
+
+
+def run_search(
+    search_strategy: SearchStrategy,
+    evaluate_func: Callable[[dict], float],
+    n_trials: int,
+    excel_file_name: Optional[str] = None,
+    results_writer: Optional[ResultsWriter] = None,
+) -> pd.DataFrame:
+    """
+    Ask search_strategy for parameter sets and evaluate them
+    until n_trials distinct sets are evaluated
+    or the search strategy has nothing left to try.
+    A parameter set proposed again is not evaluated again,
+    its known score is reported to the search strategy.
+
+    Return a DataFrame with the parameters and the score of every trial
+    in the order of evaluation.
+    If excel_file_name is provided, the results are saved to it after every trial.
+    If results_writer is provided, every trial is appended to it,
+    that is much faster than rewriting the Excel file.
+    """
+    scores: Dict[Tuple, float] = dict()
+    rows = list()
+    max_asks = n_trials * 20
+    asks = 0
+    while len(rows) < n_trials and asks < max_asks:
+        asks = asks + 1
+        params = search_strategy.ask()
+        if params is None:
+            break
+        key = _params_key(params)
+        if key in scores:
+            search_strategy.tell(params=params, score=scores[key])
+            continue
+        print(
+            f"run_search: trial {len(rows) + 1} of {n_trials}, {params}...",
+            file=sys.stderr,
+        )
+        score = evaluate_func(params)
+        scores[key] = score
+        search_strategy.tell(params=params, score=score)
+        rows.append({"trial": len(rows) + 1, **params, "score": score})
+        if excel_file_name:
+            pd.DataFrame(rows).to_excel(excel_file_name, index=False)
+        if results_writer is not None:
+            results_writer.append(df=pd.DataFrame(rows[-1:]))
+    return pd.DataFrame(rows)
@@ -0,0 +1,189 @@
+import math
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# NOTE Successive halving spends the backtests on promising parameter sets.
+# Every parameter set (candidate) is first evaluated on a few tickers.
+# The candidates with the worst partial mean score are dropped,
+# the rest are evaluated on more tickers, and so on,
+# until the survivors are evaluated on all tickers.
+# The score of a candidate for a ticker is usually SQN_modified,
+# see run_strategy_main_optimize.py.
+
+
+@dataclass
+class SuccessiveHalvingConfig:
+    """
+    ticker_schedule - the number of tickers evaluated at every rung,
+    in ascending order. After the last rung,
+    the survivors are evaluated on all the tickers.
+
+    keep_fraction - the share of candidates that survive every rung.
+
+    min_candidates - never keep fewer candidates than this.
+
+    confidence_z - if set, a candidate from the bottom part is dropped
+    only if its mean score plus confidence_z standard errors
+    is below the worst mean score of the kept candidates,
+    i.e. if it is worse with some confidence.
+    If None, the bottom part is dropped unconditionally.
+
+    min_score - if set, candidates whose mean score is below it
+    are dropped at any rung, e.g. 0 for SQN_modified,
+    unless fewer than min_candidates would remain.
+    """
+
+    ticker_schedule: List[int] = field(default_factory=lambda: [3, 6])
+    keep_fraction: float = 0.5
+    min_candidates: int = 1
+    confidence_z: Optional[float] = None
+    min_score: Optional[float] = None
+
+
+def _validate_config(config: SuccessiveHalvingConfig, tickers_count: int) -> None:
+    if not 0 < config.keep_fraction < 1:
+        raise ValueError(
+            f"run_successive_halving: {config.keep_fraction=}, should be between 0 and 1"
+        )
+    if config.min_candidates < 1:
+        raise ValueError(
+            f"run_successive_halving: {config.min_candidates=}, should be at least 1"
+        )
+    schedule = config.ticker_schedule
+    if any(count < 1 for count in schedule) or schedule != sorted(set(schedule)):
+        raise ValueError(
+            f"run_successive_halving: {schedule=}, should be strictly ascending positive numbers"
+        )
+    if schedule and schedule[-1] > tickers_count:
+        raise ValueError(
+            f"run_successive_halving: {schedule=} exceeds the number of tickers {tickers_count}"
+        )
+
+
+def _get_mean_and_std_error(scores: List[float]) -> tuple:
+    values = np.asarray(scores, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return -np.inf, 0.0
+    if values.size == 1:
+        return values[0], np.inf
+    return values.mean(), values.std(ddof=1) / math.sqrt(values.size)
+
+
+def _select_survivors(
+    candidate_ids: List[int],
+    scores: Dict[int, List[float]],
+    config: SuccessiveHalvingConfig,
+) -> List[int]:
+    """
+    Keep the best keep_fraction of candidates by their mean score.
+    The candidates of the bottom part survive too
+    if they aren't worse with the confidence set by confidence_z.
+    """
+    stats = {
+        candidate_id: _get_mean_and_std_error(scores[candidate_id])
+        for candidate_id in candidate_ids
+    }
+    ranked = sorted(candidate_ids, key=lambda x: stats[x][0], reverse=True)
+    if config.min_score is not None:
+        eligible = [x for x in ranked if stats[x][0] >= config.min_score]
+    else:
+        eligible = ranked
+    # NOTE min_candidates takes precedence over min_score:
+    # if too few candidates reach min_score, the best of the others survive too
+    keep_count = max(
+        config.min_candidates, math.ceil(len(eligible) * config.keep_fraction)
+    )
+    survivors = ranked[:keep_count]
+    if config.confidence_z is not None and survivors:
+        cutoff = stats[survivors[-1]][0]
+        for candidate_id in eligible[keep_count:]:
+            mean, std_error = stats[candidate_id]
+            if mean + config.confidence_z * std_error >= cutoff:
+                survivors.append(candidate_id)
+    return survivors
+
+
+def run_successive_halving(
+    candidates: List[dict],
+    tickers: List[str],
+    evaluate_func: Callable[[dict, str], float],
+    config: Optional[SuccessiveHalvingConfig] = None,
+    excel_file_name: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    1. Evaluate every candidate on the first tickers of the schedule.
+    2. Drop the candidates that are worse than the others.
+    3. Evaluate the survivors on more tickers, repeat 2 and 3.
+    4. Evaluate the final survivors on all the tickers.
+
+    candidates - parameter sets, every one is a dict
+    that is passed to evaluate_func with a ticker.
+    evaluate_func returns the score of the candidate for the ticker,
+    the greater the better, NaN if there are no trades.
+    The scores of the previous rungs are reused,
+    so every (candidate, ticker) pair is evaluated only once.
+
+    Return a DataFrame with one row per candidate:
+    its parameters, the number of evaluated tickers,
+    the mean score, and the rung at which it was dropped
+    (None for the candidates evaluated on all the tickers),
+    sorted by the number of tickers and the mean score.
+    If excel_file_name is provided, the results are saved to it after every rung.
+    """
+    if config is None:
+        config = SuccessiveHalvingConfig()
+    _validate_config(config=config, tickers_count=len(tickers))
+
+    scores: Dict[int, List[float]] = {i: list() for i in range(len(candidates))}
+    dropped_at_rung: Dict[int, Optional[int]] = {i: None for i in scores}
+    alive = list(scores)
+    rungs = config.ticker_schedule + [len(tickers)]
+    if len(rungs) > 1 and rungs[-2] == rungs[-1]:
+        rungs = rungs[:-1]
+
+    def get_results() -> pd.DataFrame:
+        rows = list()
+        for candidate_id, candidate in enumerate(candidates):
+            mean, _ = _get_mean_and_std_error(scores[candidate_id])
+            rows.append(
+                {
+                    **candidate,
+                    "tickers_evaluated": len(scores[candidate_id]),
+                    "score_mean": mean if np.isfinite(mean) else np.nan,
+                    "dropped_at_rung": dropped_at_rung[candidate_id],
+                }
+            )
+        return pd.DataFrame(rows).sort_values(
+            ["tickers_evaluated", "score_mean"], ascending=False
+        )
+
+    for rung, tickers_count in enumerate(rungs):
+        print(
+            f"run_successive_halving: rung {rung}, {len(alive)} candidates, {tickers_count} tickers...",
+            file=sys.stderr,
+        )
+        for candidate_id in alive:
+            for ticker in tickers[len(scores[candidate_id]) : tickers_count]:
+                scores[candidate_id].append(
+                    evaluate_func(candidates[candidate_id], ticker)
+                )
+
+        # after the last rung, nobody is dropped
+        if rung < len(rungs) - 1:
+            survivors = _select_survivors(
+                candidate_ids=alive, scores=scores, config=config
+            )
+            for candidate_id in set(alive) - set(survivors):
+                dropped_at_rung[candidate_id] = rung
+            alive = [candidate_id for candidate_id in alive if candidate_id in survivors]
+
+        if excel_file_name:
+            get_results().to_excel(excel_file_name, index=False)
+        if not alive:
+            break
+    return get_results()
@@ -0,0 +1,221 @@
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from enum import Enum
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from customizable import StrategyParams
+from strategy import ExecutionProfile, run_backtest_for_ticker
+from utils.filter_df import slice_df_by_dates
+
+from .search import SearchStrategy, run_search
+
+# NOTE Walk-forward optimization:
+# the history is split into train and test windows.
+# The strategy parameters are optimized on every train window
+# and evaluated on the test window that follows it,
+# so every test score is out of sample.
+# The tickers DataFrames with derived columns and features
+# are built once for the whole history and then sliced for every window.
+# The slices are views, nothing is recalculated or copied.
+# The features must not look ahead, otherwise the test scores are too good.
+# Only the StrategyParams fields can be optimized here,
+# parameters of the feature functions would require
+# rebuilding the features for every parameter set.
+
+
+class WindowMode(Enum):
+    """
+    ROLLING - train windows of the same length move forward.
+    ANCHORED - all train windows start at the beginning of the history.
+    """
+
+    ROLLING = "rolling"
+    ANCHORED = "anchored"
+
+
+@dataclass
+class WalkForwardWindow:
+    """
+    Start dates are inclusive, end dates are exclusive
+    """
+
+    train_start: pd.Timestamp
+    train_end: pd.Timestamp
+    test_start: pd.Timestamp
+    test_end: pd.Timestamp
+
+
+def generate_walk_forward_windows(
+    index: pd.DatetimeIndex,
+    train_period: pd.DateOffset,
+    test_period: pd.DateOffset,
+    mode: WindowMode = WindowMode.ROLLING,
+) -> List[WalkForwardWindow]:
+    """
+    The first train window starts at the first date of the index.
+    Every test window starts where its train window ends,
+    the next window is shifted by test_period,
+    so the test windows follow each other without gaps.
+    The last test window may end after the last date of the index.
+    """
+    if len(index) == 0:
+        raise ValueError("generate_walk_forward_windows: empty index")
+    last = index[-1]
+    res = list()
+    train_start = index[0]
+    train_end = train_start + train_period
+    while train_end <= last:
+        res.append(
+            WalkForwardWindow(
+                train_start=train_start,
+                train_end=train_end,
+                test_start=train_end,
+                test_end=train_end + test_period,
+            )
+        )
+        train_end = train_end + test_period
+        if mode == WindowMode.ROLLING:
+            train_start = train_start + test_period
+    return res
+
+
+def get_sqn_modified_mean(
+    tickers_data: Dict[str, pd.DataFrame],
+    strategy_params: StrategyParams,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+) -> float:
+    """
+    Run the backtests of all tickers on the rows from start to end,
+    return the mean of SQN_modified, see run_all_tickers.
+    Tickers without trades in the period are skipped.
+    """
+    values = list()
+    for ticker, df in tickers_data.items():
+        data = slice_df_by_dates(df=df, start=start, end=end)
+        if len(data) < 2:
+            continue
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            stat, _, _ = run_backtest_for_ticker(
+                ticker=ticker,
+                data=data,
+                strategy_params=strategy_params,
+                execution_profile=ExecutionProfile.OPTIMIZE,
+            )
+        if stat["# Trades"] > 0:
+            values.append(stat["SQN"] / np.sqrt(stat["# Trades"]))
+    values_arr = np.asarray(values, dtype=float)
+    values_arr = values_arr[~np.isnan(values_arr)]
+    return values_arr.mean() if values_arr.size else np.nan
+
+
+@dataclass
+class WalkForwardConfig:
+    """
+    make_search_strategy creates a new search strategy for every train window,
+    e.g. functools.partial(TPESearch, param_ranges=param_ranges).
+    It must be picklable if the windows run in parallel,
+    so use functools.partial instead of lambda.
+    fixed_params are the StrategyParams fields that are not optimized.
+    """
+
+    make_search_strategy: Callable[[], SearchStrategy]
+    n_trials: int
+    fixed_params: Optional[dict] = None
+
+
+# NOTE The tickers data is passed to the worker processes once,
+# when they start, instead of once per window
+_worker_tickers_data: Dict[str, pd.DataFrame] = dict()
+
+
+def _init_worker(tickers_data: Dict[str, pd.DataFrame]) -> None:
+    global _worker_tickers_data  # pylint: disable=W0603
+    _worker_tickers_data = tickers_data
+
+
+def _run_window(window: WalkForwardWindow, config: WalkForwardConfig) -> dict:
+    """
+    Optimize the parameters on the train window,
+    evaluate the best ones on the test window.
+    """
+    tickers_data = _worker_tickers_data
+    fixed_params = config.fixed_params or dict()
+
+    def evaluate(params: dict) -> float:
+        return get_sqn_modified_mean(
+            tickers_data=tickers_data,
+            strategy_params=StrategyParams(**fixed_params, **params),
+            start=window.train_start,
+            end=window.train_end,
+        )
+
+    trials = run_search(
+        search_strategy=config.make_search_strategy(),
+        evaluate_func=evaluate,
+        n_trials=config.n_trials,
+    )
+    res = asdict(window)
+    if trials.empty or trials["score"].isna().all():
+        return {**res, "train_score": np.nan, "test_score": np.nan}
+    # NOTE Take the values column by column to keep the int parameters int,
+    # a row of the DataFrame would convert them to float
+    best_pos = int(np.nanargmax(trials["score"].to_numpy(dtype=float)))
+    best_params = {
+        col: trials[col].to_numpy()[best_pos].item()
+        for col in trials.columns
+        if col not in ["trial", "score"]
+    }
+    test_score = get_sqn_modified_mean(
+        tickers_data=tickers_data,
+        strategy_params=StrategyParams(**fixed_params, **best_params),
+        start=window.test_start,
+        end=window.test_end,
+    )
+    return {
+        **res,
+        **best_params,
+        "train_score": trials["score"].to_numpy()[best_pos].item(),
+        "test_score": test_score,
+    }
+
+
+def run_walk_forward(
+    tickers_data: Dict[str, pd.DataFrame],
+    windows: List[WalkForwardWindow],
+    config: WalkForwardConfig,
+    max_workers: int = 1,
+) -> pd.DataFrame:
+    """
+    For every window, optimize the parameters on its train part
+    and evaluate them on its test part.
+    If max_workers > 1, the windows run in parallel processes.
+    Return a DataFrame with one row per window:
+    its dates, the best parameters, the train score, and the test score.
+    """
+    if not windows:
+        raise ValueError("run_walk_forward: no windows")
+    if max_workers <= 1:
+        _init_worker(tickers_data=tickers_data)
+        rows = list()
+        for i, window in enumerate(windows):
+            print(
+                f"run_walk_forward: window {i + 1} of {len(windows)}...",
+                file=sys.stderr,
+            )
+            rows.append(_run_window(window=window, config=config))
+        return pd.DataFrame(rows)
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(tickers_data,),
+    ) as executor:
+        rows = list(executor.map(_run_window, windows, [config] * len(windows)))
+    return pd.DataFrame(rows)
@@ -0,0 +1,62 @@
+import sys
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from constants import LOG_FILE
+from features.f_v1_basic import add_feature_closed_lower_4_days_in_a_row
+from utils.event_study import get_event_paths_for_tickers, get_event_study_summary
+from utils.local_data import TickersData
+from utils.misc import set_copy_on_write_mode
+
+# NOTE This script shows the average path of returns
+# before and after the days when the feature is True,
+# compared with the days when it is False,
+# instead of running run_fwd_return_analysis_binary.py for every horizon.
+
+# If you change the feature you are testing,
+# you also need to change add_feature_cols_func.
+# If you change the feature, you need to delete
+# the single_with_features_***.xlsx file from the cache folder,
+# otherwise the change will not work.
+
+tickers_to_process = ["SPY"]
+BARS_BEFORE = 5
+BARS_AFTER = 20
+RES_FILE_NAME = "res/res_SPY_closed_lower_4x_event_study.xlsx"
+
+if __name__ == "__main__":
+
+    load_dotenv()
+
+    set_copy_on_write_mode(enabled=True)
+
+    # clear LOG_FILE every time
+    open(LOG_FILE, "w", encoding="UTF-8").close()
+
+    tickers_data_instance = TickersData(
+        tickers=tickers_to_process,
+        add_feature_cols_func=add_feature_closed_lower_4_days_in_a_row,
+    )
+
+    res = list()
+    for feature_value in [True, False]:
+        paths = get_event_paths_for_tickers(
+            tickers_data=tickers_data_instance,
+            bars_after=BARS_AFTER,
+            bars_before=BARS_BEFORE,
+            feature_value=feature_value,
+        )
+        print(
+            f"Feature {feature_value}: {len(paths)} events, bootstrapping...",
+            file=sys.stderr,
+        )
+        summary = get_event_study_summary(paths=paths)
+        summary.insert(0, "feature", feature_value)
+        res.append(summary)
+
+    pd.concat(res).to_excel(RES_FILE_NAME)
+    print(
+        f"Event study complete! Now you may explore the results file {RES_FILE_NAME}",
+        file=sys.stderr,
+    )
@@ -0,0 +1,96 @@
+import functools
+import sys
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from constants import LOG_FILE
+from derivative_columns.consecutive_closes import add_consecutive_closes_cols
+from derivative_columns.rsi import add_rsi_column
+from features.f_rsi import add_feature_high_rsi, add_feature_rsi_within_bounds
+from features.f_v1_basic import (
+    add_feature_closed_higher_n_days_in_a_row,
+    add_feature_closed_lower_n_days_in_a_row,
+    add_features_v2_basic,
+)
+from utils.feature_screening import get_screening_matrices, screen_features
+from utils.filter_df import FilterParams, RemainingPart, filter_df_by_date
+from utils.local_data import TickersData
+from utils.misc import set_copy_on_write_mode
+
+# NOTE Unlike run_fwd_return_analysis_binary.py,
+# this script tests many features and all horizons in one run.
+# Every feature is an add_feature_cols_func, see FEATURE_FUNCS.
+# add_derivative_cols_for_screening adds the derived columns
+# the features need once per ticker, so the features don't recalculate them.
+
+# NOTE If you change add_derivative_cols_for_screening, you need to delete
+# the single_with_features_***.xlsx files from the cache folder,
+# otherwise the change will not work.
+
+tickers_to_process = ["SPY"]
+FWD_RETURN_DAYS = range(2, 17)
+RES_FILE_NAME = "res/res_SPY_feature_screening.xlsx"
+
+FEATURE_FUNCS = {
+    "closed_lower_any": add_features_v2_basic,
+    "high_rsi": add_feature_high_rsi,
+    "rsi_within_bounds": add_feature_rsi_within_bounds,
+}
+for n in range(2, 7):
+    FEATURE_FUNCS[f"closed_lower_{n}x"] = functools.partial(
+        add_feature_closed_lower_n_days_in_a_row, n=n
+    )
+    FEATURE_FUNCS[f"closed_higher_{n}x"] = functools.partial(
+        add_feature_closed_higher_n_days_in_a_row, n=n
+    )
+
+# NOTE if do_filtering is False, date_threshold and remaining_part don't matter
+# because there will be no DataFrame filtering
+df_filtering_params = FilterParams(
+    do_filtering=False,
+    date_threshold="2023-01-01",
+    remaining_part=RemainingPart.AFTER,
+)
+
+
+def add_derivative_cols_for_screening(df: pd.DataFrame) -> pd.DataFrame:
+    res = add_consecutive_closes_cols(df=df)
+    return add_rsi_column(df=res, col_name="Close")
+
+
+if __name__ == "__main__":
+
+    load_dotenv()
+
+    set_copy_on_write_mode(enabled=True)
+
+    # clear LOG_FILE every time
+    open(LOG_FILE, "w", encoding="UTF-8").close()
+
+    tickers_data_instance = TickersData(
+        tickers=tickers_to_process,
+        add_feature_cols_func=add_derivative_cols_for_screening,
+    )
+    features, fwd_returns = get_screening_matrices(
+        tickers_data=tickers_data_instance,
+        feature_funcs=FEATURE_FUNCS,
+        horizons=FWD_RETURN_DAYS,
+    )
+
+    # NOTE With this function, you can analyze only data for the latest periods.
+    # Or, conversely, analyze older data, excluding recent periods
+    # from consideration.
+    features = filter_df_by_date(df=features, filter_params=df_filtering_params)
+    fwd_returns = filter_df_by_date(df=fwd_returns, filter_params=df_filtering_params)
+
+    print(
+        f"Screening {features.shape[1]} features, {fwd_returns.shape[1]} horizons...",
+        file=sys.stderr,
+    )
+    res = screen_features(features=features, fwd_returns=fwd_returns)
+    res.to_excel(RES_FILE_NAME, index=False)
+    print(
+        f"Screening complete! Now you may explore the results file {RES_FILE_NAME}",
+        file=sys.stderr,
+    )
@@ -1,11 +1,12 @@
 # pylint: disable=E2515
 import sys
-from typing import List
+from typing import List, Optional
 
 import pandas as pd
 from dotenv import load_dotenv
 
-from constants import LOG_FILE, tickers_all
+from constants import FEATURE_COL_NAME_BASIC, LOG_FILE, tickers_all
+from derivative_columns.consecutive_closes import LOWER_CLOSES_STREAK_COL
 from features.f_rsi import add_feature_rsi_within_bounds
 from features.f_v1_basic import (
     add_feature_closed_lower_4_days_in_a_row,
@@ -19,6 +20,7 @@ from utils.fwd_return_analysis import (
     res_df_final_manipulations,
 )
 from utils.local_data import TickersData
+from utils.misc import set_copy_on_write_mode
 
 INSERT_EMPTY_ROW = True
 
@@ -42,6 +44,16 @@ FWD_RETURN_DAYS_MIN = 2
 FWD_RETURN_DAYS_MAX = 16
 RES_FILE_NAME = "res/res_SPY_closed_lower_4x_all.xlsx"
 
+# NOTE If the DataFrame has the LOWER_CLOSES_STREAK_COL column,
+# the feature "closed lower N days in a row" for every N below
+# is a comparison, without recalculating the data for each N.
+# List several values to compare them in one results file.
+# The column is added by add_consecutive_closes_cols,
+# so add_feature_cols_func must call it, and you need to delete
+# the single_with_features_***.xlsx file from the cache folder.
+# None - use FEATURE_COL_NAME_BASIC of add_feature_cols_func as is.
+CLOSED_LOWER_DAYS: Optional[List[int]] = None
+
 # NOTE if do_filtering is False, date_threshold and remaining_part don't matter
 # because there will be no DataFrame filtering
 df_filtering_params = FilterParams(
@@ -54,6 +66,8 @@ if __name__ == "__main__":
 
     load_dotenv()
 
+    set_copy_on_write_mode(enabled=True)
+
     # clear LOG_FILE every time
     open(LOG_FILE, "w", encoding="UTF-8").close()
 
@@ -90,11 +104,31 @@ if __name__ == "__main__":
             df=combined_df_all, filter_params=df_filtering_params
         )
 
-        res = add_rows_with_feature_true_and_false_to_res(
-            res_to_return=res,
-            combined_df_all=combined_df_all,
-            fwd_ret_days=fwd_return_days,
-        )
+        if CLOSED_LOWER_DAYS is None:
+            res = add_rows_with_feature_true_and_false_to_res(
+                res_to_return=res,
+                combined_df_all=combined_df_all,
+                fwd_ret_days=fwd_return_days,
+            )
+        else:
+            if LOWER_CLOSES_STREAK_COL not in combined_df_all.columns:
+                raise ValueError(
+                    f"No {LOWER_CLOSES_STREAK_COL} column for {CLOSED_LOWER_DAYS=}, "
+                    "add it with add_consecutive_closes_cols in add_feature_cols_func "
+                    "and delete the single_with_features_***.xlsx cache files"
+                )
+            for closed_lower_days in CLOSED_LOWER_DAYS:
+                combined_df_all[FEATURE_COL_NAME_BASIC] = (
+                    combined_df_all[LOWER_CLOSES_STREAK_COL] >= closed_lower_days
+                )
+                res = add_rows_with_feature_true_and_false_to_res(
+                    res_to_return=res,
+                    combined_df_all=combined_df_all,
+                    fwd_ret_days=fwd_return_days,
+                )
+                res[-1]["closed_lower_days"] = res[-2][
+                    "closed_lower_days"
+                ] = closed_lower_days
 
         # NOTE INSERT_EMPTY_ROW is needed for more convenient
         # viewing of results in the Excel file.
@@ -13,6 +13,7 @@ from utils.bootstrap import analyze_values_by_group
 from utils.filter_df import FilterParams, RemainingPart, filter_df_by_date
 from utils.fwd_return_analysis import get_combined_df_with_fwd_ret_for_groups
 from utils.local_data import TickersData
+from utils.misc import set_copy_on_write_mode
 
 
 def analyze_data_by_group_save_res(
@@ -66,6 +67,8 @@ if __name__ == "__main__":
 
     load_dotenv()
 
+    set_copy_on_write_mode(enabled=True)
+
     # clear LOG_FILE every time
     open(LOG_FILE, "w", encoding="UTF-8").close()
 
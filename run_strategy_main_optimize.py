@@ -1,7 +1,7 @@
 import itertools
 import logging
 from functools import partial
-from typing import List
+from typing import List, Optional
 
 import pandas as pd
 from dotenv import load_dotenv
@@ -9,8 +9,23 @@ from dotenv import load_dotenv
 from constants import LOG_FILE, tickers_all
 from customizable import StrategyParams
 from features.f_v1_basic import add_features_v1_basic
-from strategy import run_all_tickers
+from optimization.search import (
+    ParamRange,
+    RandomSearch,
+    TPESearch,
+    get_param_ranges_from_strategy_params,
+    run_search,
+)
+from optimization.successive_halving import (
+    SuccessiveHalvingConfig,
+    run_successive_halving,
+)
+from strategy import ExecutionProfile, run_all_tickers
+from utils.backtest_memo import BacktestMemo
+from utils.instrumentation import enable_instrumentation, report_instrumentation
 from utils.local_data import TickersData
+from utils.misc import set_copy_on_write_mode
+from utils.results_writer import ResultsWriter
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -20,12 +35,30 @@ logging.basicConfig(
     filemode="a",
 )
 
+# See the same settings in run_strategy_main_simple.py
+INSTRUMENTATION_ON = False
+USE_BACKTEST_MEMO = False
+
+# NOTE If True, parameter combinations are first evaluated on a few tickers,
+# and only the promising ones are evaluated on all tickers,
+# see optimization/successive_halving.py.
+# If False, every combination is evaluated on all tickers.
+USE_SUCCESSIVE_HALVING = False
+
+# NOTE Set to "random" or "tpe" to evaluate only SEARCH_N_TRIALS
+# parameter sets chosen by random or model-based search
+# instead of the full grid, see optimization/search.py.
+# The value ranges are taken from the StrategyParams fields metadata.
+SEARCH_METHOD: Optional[str] = None
+SEARCH_N_TRIALS = 30
+
 
 def run_all_tickers_with_parameters(
     max_trade_duration_long: int,
     profit_target_long_pct: float,
     atr_multiplier_threshold: int,
     save_all_trades_in_xlsx: bool,
+    tickers: List[str] = tickers_all,
 ) -> float:
 
     # NOTE
@@ -59,14 +92,24 @@ def run_all_tickers_with_parameters(
     )
     tickers_data = TickersData(
         add_feature_cols_func=p_add_features_v1,
-        tickers=tickers_all,
+        tickers=tickers,
         recreate_columns_every_time=True,
         # NOTE If recreate_columns_every_time=False,
         # atr_multiplier_threshold optimization won't work
     )
 
     sqn_modified_mean = run_all_tickers(
-        tickers=tickers_all, strategy_params=strategy_params, tickers_data=tickers_data
+        tickers=tickers,
+        strategy_params=strategy_params,
+        tickers_data=tickers_data,
+        memo=BacktestMemo() if USE_BACKTEST_MEMO else None,
+        # NOTE No plots, and only the stats needed for SQN_modified,
+        # unless all trades are saved for review
+        execution_profile=(
+            ExecutionProfile.BATCH
+            if save_all_trades_in_xlsx
+            else ExecutionProfile.OPTIMIZE
+        ),
     )
 
     # NOTE Why SQN_modified_mean is used
@@ -78,8 +121,16 @@ def run_all_tickers_with_parameters(
 if __name__ == "__main__":
     load_dotenv()
 
+    set_copy_on_write_mode(enabled=True)
+    if INSTRUMENTATION_ON:
+        enable_instrumentation()
+
     EXCEL_FILE_NAME = "optimization_results.xlsx"
-    all_results: List[dict] = list()
+    # NOTE Every result is appended to the CSV file,
+    # it is rendered to EXCEL_FILE_NAME once, at the end.
+    # Rewriting the Excel file after every combination
+    # takes longer and longer as the results grow.
+    RESULTS_FILE_NAME = "optimization_results.csv"
 
     # Here you list the parameters you want to optimize, as well as their value ranges.
     # These same parameters must be used
@@ -104,27 +155,73 @@ if __name__ == "__main__":
         atr_multiplier_threshold_vals,
     )
 
-    counter = 0  # pylint: disable=C0103
-    for item in combinations:
-        counter = counter + 1  # pylint: disable=C0103
-        print(f"Running combination {counter} of {total_count}...")
-        max_trade_duration_long_val = item[0]
-        profit_target_long_pct_val = item[1]
-        atr_multiplier_threshold_val = item[2]
-        SQN_modified_mean_val = run_all_tickers_with_parameters(
-            max_trade_duration_long=max_trade_duration_long_val,
-            profit_target_long_pct=profit_target_long_pct_val,
-            atr_multiplier_threshold=atr_multiplier_threshold_val,
-            save_all_trades_in_xlsx=False,
+    if USE_SUCCESSIVE_HALVING:
+        halving_res = run_successive_halving(
+            candidates=[
+                {
+                    "max_trade_duration_long": item[0],
+                    "profit_target_long_pct": item[1],
+                    "atr_multiplier_threshold": item[2],
+                }
+                for item in combinations
+            ],
+            tickers=tickers_all,
+            evaluate_func=lambda candidate, ticker: run_all_tickers_with_parameters(
+                **candidate, save_all_trades_in_xlsx=False, tickers=[ticker]
+            ),
+            config=SuccessiveHalvingConfig(ticker_schedule=[3, 6], keep_fraction=0.5),
+            excel_file_name=EXCEL_FILE_NAME,
+        )
+        print(halving_res.head(10).to_string(index=False))
+    elif SEARCH_METHOD is not None:
+        results_writer = ResultsWriter(
+            file_path=RESULTS_FILE_NAME, write_index=False, render_excel=True
+        )
+        param_ranges = get_param_ranges_from_strategy_params(
+            names=["max_trade_duration_long", "profit_target_long_pct"]
+        ) + [ParamRange(name="atr_multiplier_threshold", low=2, high=10, step=1)]
+        search_strategy = (
+            TPESearch(param_ranges=param_ranges)
+            if SEARCH_METHOD == "tpe"
+            else RandomSearch(param_ranges=param_ranges)
+        )
+        with results_writer:
+            search_res = run_search(
+                search_strategy=search_strategy,
+                evaluate_func=lambda params: run_all_tickers_with_parameters(
+                    **params, save_all_trades_in_xlsx=False
+                ),
+                n_trials=SEARCH_N_TRIALS,
+                results_writer=results_writer,
+            )
+        print(search_res.sort_values("score", ascending=False).head(10).to_string())
+    else:
+        results_writer = ResultsWriter(
+            file_path=RESULTS_FILE_NAME, write_index=False, render_excel=True
         )
-        result = {
-            "max_duration_long": max_trade_duration_long_val,
-            "profit_tgt_lg_pct": profit_target_long_pct_val,
-            "atr_multiplier": atr_multiplier_threshold_val,
-            "SQN_m_mean": SQN_modified_mean_val,
-        }
-        all_results.append(result)
-        # save to Excel file every time in case the script execution is interrupted.
-        # The next time you run it, you won't have to process the same parameter sets again.
-        pd.DataFrame.from_records(all_results).to_excel(EXCEL_FILE_NAME, index=False)
+        counter = 0  # pylint: disable=C0103
+        for item in combinations:
+            counter = counter + 1  # pylint: disable=C0103
+            print(f"Running combination {counter} of {total_count}...")
+            max_trade_duration_long_val = item[0]
+            profit_target_long_pct_val = item[1]
+            atr_multiplier_threshold_val = item[2]
+            SQN_modified_mean_val = run_all_tickers_with_parameters(
+                max_trade_duration_long=max_trade_duration_long_val,
+                profit_target_long_pct=profit_target_long_pct_val,
+                atr_multiplier_threshold=atr_multiplier_threshold_val,
+                save_all_trades_in_xlsx=False,
+            )
+            result = {
+                "max_duration_long": max_trade_duration_long_val,
+                "profit_tgt_lg_pct": profit_target_long_pct_val,
+                "atr_multiplier": atr_multiplier_threshold_val,
+                "SQN_m_mean": SQN_modified_mean_val,
+            }
+            # save to the CSV file every time in case the script execution is interrupted.
+            # The next time you run it, you won't have to process the same parameter sets again.
+            results_writer.append(df=pd.DataFrame.from_records([result]))
+        results_writer.close()
     print(f"Ready! See the file {EXCEL_FILE_NAME}")
+    if INSTRUMENTATION_ON:
+        report_instrumentation(file_name_prefix="instrumentation_optimize")
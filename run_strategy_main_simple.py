@@ -8,7 +8,11 @@ from constants import LOG_FILE, tickers_all
 from customizable import StrategyParams
 from features.f_v1_basic import add_features_v1_basic
 from strategy import run_all_tickers
+from utils.backtest_memo import BacktestMemo
+from utils.bar_profiler import BAR_PROFILER
+from utils.instrumentation import enable_instrumentation, report_instrumentation
 from utils.local_data import TickersData
+from utils.misc import set_copy_on_write_mode
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -18,10 +22,28 @@ logging.basicConfig(
     filemode="a",
 )
 
+# NOTE Set to True to see where the run time and memory go:
+# Excel I/O, feature building, Backtest.run, plotting, writing output.xlsx.
+# The summary is printed at the end and saved to instrumentation_*.csv/json.
+INSTRUMENTATION_ON = False
+
+# NOTE If True, the results of backtests are saved in cache/backtest_memo.
+# A backtest with the same data, StrategyParams, and strategy code
+# is not run again, its result is read from there.
+# See utils/backtest_memo.py for the commands to inspect and prune the store.
+USE_BACKTEST_MEMO = False
+
 
 if __name__ == "__main__":
     load_dotenv()
 
+    # NOTE In Copy-on-Write mode, the functions that add derived columns
+    # and features don't copy the full DataFrame every time.
+    # See benchmarks/memory_copy_on_write.py for the numbers.
+    set_copy_on_write_mode(enabled=True)
+    if INSTRUMENTATION_ON:
+        enable_instrumentation()
+
     # clear LOG_FILE every time
     open(LOG_FILE, "w", encoding="UTF-8").close()
 
@@ -37,6 +59,7 @@ if __name__ == "__main__":
         profit_target_long_pct=5.5,
         profit_target_short_pct=17.999,
         save_all_trades_in_xlsx=False,
+        profile_next_calls=False,
     )
 
     # NOTE 1.
@@ -65,6 +88,11 @@ if __name__ == "__main__":
         tickers_data=tickers_data,
         tickers=tickers_all,
         strategy_params=strategy_params,
+        memo=BacktestMemo() if USE_BACKTEST_MEMO else None,
     )
     logging.debug(f"{SQN_modified_mean=}")  # pylint: disable=W1203
     print(f"{SQN_modified_mean=}, see also output.xslx", file=sys.stderr)
+    if INSTRUMENTATION_ON:
+        report_instrumentation()
+    if strategy_params.profile_next_calls:
+        BAR_PROFILER.report()
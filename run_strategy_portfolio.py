@@ -0,0 +1,61 @@
+import logging
+import sys
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from constants import LOG_FILE, tickers_all
+from customizable import StrategyParams
+from features.f_v1_basic import add_features_v1_basic
+from strategy import PortfolioConfig, run_portfolio_backtest
+from utils.local_data import TickersData
+from utils.misc import set_copy_on_write_mode
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(message)s",
+    filename=LOG_FILE,
+    encoding="utf-8",
+    filemode="a",
+)
+
+EXCEL_FILE_NAME = "portfolio_output.xlsx"
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    set_copy_on_write_mode(enabled=True)
+
+    # clear LOG_FILE every time
+    open(LOG_FILE, "w", encoding="UTF-8").close()
+
+    # The same parameters as in run_strategy_main_simple.py
+    strategy_params = StrategyParams(
+        max_trade_duration_long=8,
+        max_trade_duration_short=100,
+        profit_target_long_pct=5.5,
+        profit_target_short_pct=17.999,
+    )
+
+    tickers_data = TickersData(
+        add_feature_cols_func=add_features_v1_basic,
+        tickers=tickers_all,
+    )
+
+    # NOTE Unlike run_all_tickers, all tickers share one account.
+    # Every ticker gets an equal share of the portfolio equity
+    # for its position sizing, pass weights to change that.
+    res = run_portfolio_backtest(
+        tickers_data=tickers_data.tickers_data_with_features,
+        strategy_params=strategy_params,
+        config=PortfolioConfig(cash=100000),
+    )
+
+    stats = res.stats.drop(["_strategy", "_equity_curve", "_trades"])
+    with pd.ExcelWriter(EXCEL_FILE_NAME) as writer:
+        stats.astype(str).to_excel(writer, sheet_name="stats")
+        res.ticker_summary.to_excel(writer, sheet_name="tickers")
+        res.equity_curve.to_excel(writer, sheet_name="equity")
+        res.trades.to_excel(writer, sheet_name="trades", index=False)
+    print(stats.to_string(), file=sys.stderr)
+    print(f"Ready! See the file {EXCEL_FILE_NAME}", file=sys.stderr)
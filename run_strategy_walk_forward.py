@@ -0,0 +1,79 @@
+import functools
+import logging
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from constants import LOG_FILE, tickers_all
+from features.f_v1_basic import add_features_v1_basic
+from optimization.search import TPESearch, get_param_ranges_from_strategy_params
+from optimization.walk_forward import (
+    WalkForwardConfig,
+    WindowMode,
+    generate_walk_forward_windows,
+    run_walk_forward,
+)
+from utils.local_data import TickersData
+from utils.misc import set_copy_on_write_mode
+
+# NOTE WARNING instead of DEBUG, because the windows run in parallel processes,
+# and their debug messages in one log file would be huge and interleaved
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(message)s",
+    filename=LOG_FILE,
+    encoding="utf-8",
+    filemode="a",
+)
+
+EXCEL_FILE_NAME = "walk_forward_results.xlsx"
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    set_copy_on_write_mode(enabled=True)
+
+    # clear LOG_FILE every time
+    open(LOG_FILE, "w", encoding="UTF-8").close()
+
+    # NOTE The features are created once for the whole history.
+    # Every window uses slices of these DataFrames.
+    tickers_data = TickersData(
+        add_feature_cols_func=add_features_v1_basic,
+        tickers=tickers_all,
+    )
+
+    # NOTE The windows are generated from the first ticker dates.
+    # The tickers with shorter history are simply skipped
+    # in the windows before their first date.
+    windows = generate_walk_forward_windows(
+        index=tickers_data.get_data(ticker=tickers_all[0]).index,
+        train_period=pd.DateOffset(years=5),
+        test_period=pd.DateOffset(years=1),
+        mode=WindowMode.ROLLING,
+    )
+
+    config = WalkForwardConfig(
+        make_search_strategy=functools.partial(
+            TPESearch,
+            param_ranges=get_param_ranges_from_strategy_params(
+                names=["max_trade_duration_long", "profit_target_long_pct"]
+            ),
+        ),
+        n_trials=20,
+        fixed_params={
+            "max_trade_duration_short": 100,
+            "profit_target_short_pct": 17.999,
+        },
+    )
+
+    res = run_walk_forward(
+        tickers_data=tickers_data.tickers_data_with_features,
+        windows=windows,
+        config=config,
+        max_workers=4,
+    )
+    res.to_excel(EXCEL_FILE_NAME, index=False)
+    print(res.to_string(index=False))
+    print(f"Out-of-sample SQN_modified mean: {res['test_score'].mean():.3f}")
+    print(f"Ready! See the file {EXCEL_FILE_NAME}")
@@ -1,2 +1,4 @@
 from .all_tickers import run_all_tickers
-from .run_backtest_for_ticker import run_backtest_for_ticker
+from .execution_profile import ExecutionProfile
+from .portfolio import PortfolioConfig, run_portfolio_backtest
+from .run_backtest_for_ticker import plot_backtest_for_ticker, run_backtest_for_ticker
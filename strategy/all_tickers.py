@@ -8,19 +8,26 @@ import pandas as pd
 
 from constants import LOG_FILE, tickers_all
 from customizable import StrategyParams
+from utils.backtest_memo import BacktestMemo, get_memo_key
+from utils.instrumentation import span
 from utils.local_data import TickersData
+from utils.results_writer import ResultsFormat, ResultsWriter, write_results
 from utils.strategy_exec import process_last_day_res
 
+from .execution_profile import ExecutionProfile
 from .run_backtest_for_ticker import run_backtest_for_ticker
+from .trades_enrichment import enrich_trades
 
 
 def _add_feature_name_to_trades(
     trades: pd.DataFrame, ticker_data: pd.DataFrame, feature_col_name: str
 ) -> pd.DataFrame:
     res = trades.copy()
-    res["Feature"] = np.nan
-    for index, row in trades.iterrows():
-        res.at[index, "Feature"] = ticker_data.iloc[row["EntryBar"]][feature_col_name]
+    res["Feature"] = (
+        ticker_data[feature_col_name]
+        .to_numpy()
+        .take(trades["EntryBar"].to_numpy(dtype=np.intp))
+    )
     return res
 
 
@@ -29,19 +36,44 @@ def get_stat_and_trades(
     strategy_params: StrategyParams,
     ticker: str,
     feature_col_name: Optional[str] = None,
+    memo: Optional[BacktestMemo] = None,
+    execution_profile: Optional[ExecutionProfile] = None,
 ) -> Tuple[pd.Series, pd.DataFrame, dict]:
     """
     For ticker, run backtest,
     return stats, trades, and last_day_result.
     If feature_col_name is provided,
     feature value at the start date is added to every trade in trades DataFrame.
+    If memo is provided, the result of the same backtest
+    run earlier is taken from it instead of running the backtest again.
+    execution_profile is passed to run_backtest_for_ticker.
     """
 
-    stat, trades, last_day_result = run_backtest_for_ticker(
-        ticker=ticker,
-        data=ohlc_with_feature,
-        strategy_params=strategy_params,
-    )
+    # NOTE Profiling needs real runs of the backtest
+    if memo is not None and not strategy_params.profile_next_calls:
+        memo_key = get_memo_key(
+            ticker=ticker,
+            data=ohlc_with_feature,
+            strategy_params=strategy_params,
+            light_stats=execution_profile == ExecutionProfile.OPTIMIZE,
+        )
+        memo_res = memo.load(key=memo_key)
+        if memo_res is None:
+            memo_res = run_backtest_for_ticker(
+                ticker=ticker,
+                data=ohlc_with_feature,
+                strategy_params=strategy_params,
+                execution_profile=execution_profile,
+            )
+            memo.save(key=memo_key, result=memo_res)
+        stat, trades, last_day_result = memo_res
+    else:
+        stat, trades, last_day_result = run_backtest_for_ticker(
+            ticker=ticker,
+            data=ohlc_with_feature,
+            strategy_params=strategy_params,
+            execution_profile=execution_profile,
+        )
 
     # NOTE If feature_col_name is None,
     # return stat and trades without added feature,
@@ -64,13 +96,24 @@ def run_all_tickers(
     tickers_data: TickersData,
     strategy_params: StrategyParams,
     tickers: List[str],
+    memo: Optional[BacktestMemo] = None,
+    results_format: ResultsFormat = ResultsFormat.EXCEL,
+    render_excel: bool = False,
+    execution_profile: Optional[ExecutionProfile] = None,
 ) -> float:
     """
-    1. For every ticker, run get_stat_and_trades.
+    1. For every ticker, run get_stat_and_trades, use memo if provided.
     2. Run process_last_day_res - send notification if trading signal.
     3. Unite all results.
-    4. Save them to xlsx file.
+    4. Save them to output and all_trades files in results_format.
     5. Return mean value of SQN_modified.
+
+    If results_format is not EXCEL, the output file has one row per ticker,
+    the trades are appended to the all_trades file ticker by ticker,
+    and Excel copies of both files are saved only if render_excel is True.
+
+    In the OPTIMIZE execution_profile, the output file has only a few stats,
+    see compute_light_stats.
     """
 
     # clear LOG_FILE every time
@@ -78,7 +121,11 @@ def run_all_tickers(
 
     performance_res = pd.DataFrame()
     if strategy_params.save_all_trades_in_xlsx:
-        all_trades = pd.DataFrame()
+        trades_writer = ResultsWriter(
+            file_path=f"all_trades.{results_format.value}",
+            write_index=False,
+            render_excel=render_excel,
+        )
     counter = 0
     total_len = len(tickers)
     for ticker in tickers:
@@ -101,6 +148,8 @@ def run_all_tickers(
             ticker=ticker,
             feature_col_name=None,
             strategy_params=strategy_params,
+            memo=memo,
+            execution_profile=execution_profile,
         )
         process_last_day_res(last_day_res=last_day_result)
         stat = stat.drop(["_strategy", "_equity_curve", "_trades"])
@@ -115,11 +164,26 @@ def run_all_tickers(
         performance_res[ticker] = stat
 
         if strategy_params.save_all_trades_in_xlsx:
+            with span(stage="enrich_trades", ticker=ticker):
+                trades_df = enrich_trades(
+                    trades=trades_df,
+                    ticker_data=ticker_data,
+                    feature_cols=strategy_params.trades_feature_cols,
+                )
             trades_df["Ticker"] = ticker
-            all_trades = pd.concat([all_trades, trades_df])
+            with span(stage="write_output", ticker=ticker):
+                trades_writer.append(df=trades_df)
 
     if len(tickers) > 1:
-        performance_res.to_excel("output.xlsx")
+        with span(stage="write_output"):
+            if results_format == ResultsFormat.EXCEL or render_excel:
+                performance_res.to_excel("output.xlsx")
+            if results_format != ResultsFormat.EXCEL:
+                write_results(
+                    df=performance_res.T.infer_objects(),
+                    file_path=f"output.{results_format.value}",
+                )
     if strategy_params.save_all_trades_in_xlsx:
-        all_trades.to_excel("all_trades.xlsx", index=False)
+        with span(stage="write_output"):
+            trades_writer.close()
     return performance_res.loc["SQN_modified", :].mean()
@@ -0,0 +1,177 @@
+import contextlib
+import functools
+import os
+from enum import Enum
+from typing import Iterator, List, Optional
+
+import backtesting.backtesting
+import numpy as np
+import pandas as pd
+from backtesting import Strategy
+
+from customizable import (
+    StrategyParams,
+    get_desired_position_size_array,
+    get_signal_mask,
+)
+
+# NOTE Backtest.run() always calls compute_stats of the backtesting package.
+# It calculates about 30 metrics, the drawdowns, and the equity curve DataFrame.
+# The optimizers need only SQN and # Trades of every run,
+# so in the OPTIMIZE profile compute_stats is replaced with compute_light_stats
+# for the duration of the run, see light_stats_mode.
+
+
+class ExecutionProfile(Enum):
+    """
+    INTERACTIVE - full stats, the plot of every backtest is saved to html.
+    BATCH - full stats, no plots.
+    OPTIMIZE - only the stats the optimization criterion needs, no plots,
+    no equity curve unless it is requested.
+    """
+
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+    OPTIMIZE = "optimize"
+
+
+def get_default_execution_profile() -> ExecutionProfile:
+    """
+    INTERACTIVE if the environment variable environment is dev, BATCH otherwise
+    """
+    if os.environ.get("environment", default="prod") == "dev":
+        return ExecutionProfile.INTERACTIVE
+    return ExecutionProfile.BATCH
+
+
+def get_trades_df(trades: List) -> pd.DataFrame:
+    """
+    The same columns as in the _trades DataFrame made by compute_stats,
+    without the indicator values at entry and exit
+    """
+    res = pd.DataFrame(
+        {
+            "Size": [t.size for t in trades],
+            "EntryBar": [t.entry_bar for t in trades],
+            "ExitBar": [t.exit_bar for t in trades],
+            "EntryPrice": [t.entry_price for t in trades],
+            "ExitPrice": [t.exit_price for t in trades],
+            "SL": [t.sl for t in trades],
+            "TP": [t.tp for t in trades],
+            "PnL": [t.pl for t in trades],
+            "Commission": [t._commissions for t in trades],
+            "ReturnPct": [t.pl_pct for t in trades],
+            "EntryTime": [t.entry_time for t in trades],
+            "ExitTime": [t.exit_time for t in trades],
+        }
+    )
+    res["Duration"] = res["ExitTime"] - res["EntryTime"]
+    res["Tag"] = [t.tag for t in trades]
+    return res
+
+
+def compute_light_stats(
+    trades: List,
+    equity: np.ndarray,
+    ohlc_data: pd.DataFrame,
+    strategy_instance: Optional[Strategy],
+    risk_free_rate: float = 0,  # pylint: disable=W0613
+    keep_equity_curve: bool = False,
+) -> pd.Series:
+    """
+    Replacement of compute_stats of the backtesting package,
+    the same signature plus keep_equity_curve.
+    Return the Series with the same keys as the full stats
+    needed by run_all_tickers and the optimizers.
+    SQN is calculated by the same formula.
+    _equity_curve is None unless keep_equity_curve is True.
+    """
+    trades_df = get_trades_df(trades=trades)
+    pl = trades_df["PnL"]
+    n_trades = len(trades_df)
+    index = ohlc_data.index
+    res = {
+        "Start": index[0],
+        "End": index[-1],
+        "Duration": index[-1] - index[0],
+        "Equity Final [$]": equity[-1],
+        "Return [%]": (equity[-1] - equity[0]) / equity[0] * 100,
+        "# Trades": n_trades,
+        "Win Rate [%]": np.nan if not n_trades else (pl > 0).mean() * 100,
+        "SQN": np.sqrt(n_trades) * pl.mean() / (pl.std() or np.nan),
+        "_strategy": strategy_instance,
+        "_equity_curve": (
+            pd.DataFrame({"Equity": equity}, index=index) if keep_equity_curve else None
+        ),
+        "_trades": trades_df,
+    }
+    return pd.Series(res, dtype=object)
+
+
+@contextlib.contextmanager
+def light_stats_mode(keep_equity_curve: bool = False) -> Iterator[None]:
+    """
+    Inside the context, Backtest.run() returns compute_light_stats
+    instead of the full stats
+    """
+    original = backtesting.backtesting.compute_stats
+    backtesting.backtesting.compute_stats = functools.partial(
+        compute_light_stats, keep_equity_curve=keep_equity_curve
+    )
+    try:
+        yield
+    finally:
+        backtesting.backtesting.compute_stats = original
+
+
+def get_desired_size_array(
+    data: pd.DataFrame, strategy_params: StrategyParams
+) -> Optional[np.ndarray]:
+    """
+    None if strategy_params.use_desired_size_array is False.
+    Otherwise, the checked result of get_desired_position_size_array.
+    """
+    if not strategy_params.use_desired_size_array:
+        return None
+    res = np.asarray(
+        get_desired_position_size_array(data=data, strategy_params=strategy_params),
+        dtype=float,
+    )
+    if res.shape != (len(data),):
+        raise ValueError(
+            f"get_desired_size_array: get_desired_position_size_array returned {res.shape=}, expected ({len(data)},)"
+        )
+    if (np.abs(res[~np.isnan(res)]) > 1).any():
+        raise ValueError(
+            "get_desired_size_array: desired position sizes must be in [-1.0; 1.0] or NaN"
+        )
+    return res
+
+
+def get_attention_mask(
+    data: pd.DataFrame,
+    strategy_params: StrategyParams,
+    desired_sizes: Optional[np.ndarray] = None,
+) -> Optional[np.ndarray]:
+    """
+    None if strategy_params.skip_idle_bars is False.
+    Otherwise, the Boolean array of the bars that need next()
+    even without open trades and orders: the signal bars
+    and the last bar, which fills last_day_result.
+    The signal bars are the non-zero desired_sizes if they are provided,
+    otherwise get_signal_mask is used.
+    """
+    if not strategy_params.skip_idle_bars:
+        return None
+    if desired_sizes is not None:
+        res = ~np.isnan(desired_sizes) & (desired_sizes != 0)
+    else:
+        res = np.array(
+            get_signal_mask(data=data, strategy_params=strategy_params), dtype=bool
+        )
+    if res.shape != (len(data),):
+        raise ValueError(
+            f"get_attention_mask: get_signal_mask returned {res.shape=}, expected ({len(data)},)"
+        )
+    res[-1] = True
+    return res
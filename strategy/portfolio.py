@@ -0,0 +1,704 @@
+import copy
+import logging
+from dataclasses import dataclass
+from math import copysign
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from backtesting._stats import compute_stats
+
+from customizable import StrategyParams, get_desired_current_position_size
+from utils.strategy_exec import (
+    adjust_position,
+    check_set_profit_targets_long_trades,
+    check_set_profit_targets_short_trades,
+    get_special_situation_masks,
+    log_initial_data_for_today,
+    process_special_situations,
+    reconcile_desired_size,
+    update_stop_losses,
+)
+
+from .execution_profile import (
+    get_attention_mask,
+    get_desired_size_array,
+    get_trades_df,
+)
+
+# NOTE run_all_tickers backtests every ticker separately, with its own cash.
+# run_portfolio_backtest steps all tickers together on one calendar
+# with one cash and margin account.
+# Every ticker is seen by the strategy functions through InstrumentView,
+# which has the attributes of backtesting Strategy that they use,
+# so get_desired_current_position_size, the special situation handlers,
+# and the stop-loss and profit target functions are the same as in
+# run_backtest_for_ticker.
+# The broker follows the rules of the backtesting package
+# with trade_on_close=False and hedging=False:
+# the orders placed today are filled at the next open of the same ticker,
+# stop-losses and take profits are checked against the bar High and Low.
+# The account keeps the positions, stop-loss and take profit levels
+# of all tickers in arrays, so marking to market and finding
+# the tickers whose orders or stops need processing today
+# are numpy operations instead of loops over all trades.
+
+
+@dataclass
+class PortfolioConfig:
+    """
+    Every ticker sizes its positions as if its equity were
+    its weight times the portfolio equity.
+    If weights is None, all tickers get equal weights.
+    margin is the same as in Backtest, 0.02 means leverage 50.
+    """
+
+    cash: float = 100000
+    commission: float = 0.001
+    margin: float = 0.02
+    weights: Optional[Dict[str, float]] = None
+
+
+@dataclass
+class PortfolioResult:
+    """
+    stats - portfolio stats in the format of Backtest.run() stats plus SQN_modified,
+    trades - closed trades of all tickers with the Ticker column,
+    EntryBar and ExitBar are the row numbers in the ticker DataFrame,
+    ticker_summary - one row per ticker.
+    """
+
+    stats: pd.Series
+    trades: pd.DataFrame
+    equity_curve: pd.Series
+    ticker_summary: pd.DataFrame
+
+
+class _BarData:
+    """
+    Columns of the ticker DataFrame up to the current bar,
+    like strategy.data in the backtesting package
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._full_index = df.index
+        self._arrays = {col: df[col].to_numpy() for col in df.columns}
+        self._len = 0
+        self._index = self._full_index[:0]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        try:
+            return self.__dict__["_arrays"][name][: self._len]
+        except KeyError as e:
+            raise AttributeError(name) from e
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._arrays[name][: self._len]
+
+    @property
+    def index(self) -> pd.Index:
+        # NOTE The strategy functions read the index several times per bar,
+        # slice it once
+        if len(self._index) != self._len:
+            self._index = self._full_index[: self._len]
+        return self._index
+
+
+class PortfolioTrade:
+    """
+    Trade with the attributes of backtesting Trade
+    that the strategy functions use.
+    EntryBar and ExitBar are the row numbers in the ticker DataFrame.
+    """
+
+    def __init__(
+        self,
+        instrument: "InstrumentView",
+        size: int,
+        entry_price: float,
+        entry_bar: int,
+    ):
+        self._instrument = instrument
+        self.size = size
+        self.entry_price = entry_price
+        self.entry_bar = entry_bar
+        self.exit_price: Optional[float] = None
+        self.exit_bar: Optional[int] = None
+        self.sl: Optional[float] = None
+        self.tp: Optional[float] = None
+        # NOTE add_trade_tag sets the name-mangled attribute,
+        # the same way as in backtesting Trade
+        self.__tag: Optional[int] = None
+        self._commissions = 0.0
+
+    def __repr__(self):
+        return f"<PortfolioTrade {self._instrument.ticker} size={self.size} price={self.entry_price}-{self.exit_price or ''}>"
+
+    @property
+    def tag(self) -> Optional[int]:
+        return self.__tag
+
+    @property
+    def is_long(self) -> bool:
+        return self.size > 0
+
+    @property
+    def is_short(self) -> bool:
+        return not self.is_long
+
+    @property
+    def entry_time(self) -> pd.Timestamp:
+        return self._instrument.data._full_index[self.entry_bar]
+
+    @property
+    def exit_time(self) -> Optional[pd.Timestamp]:
+        if self.exit_bar is None:
+            return None
+        return self._instrument.data._full_index[self.exit_bar]
+
+    @property
+    def pl(self) -> float:
+        price = self.exit_price or self._instrument.last_price
+        return self.size * (price - self.entry_price) - self._commissions
+
+    @property
+    def pl_pct(self) -> float:
+        price = self.exit_price or self._instrument.last_price
+        gross_pl_pct = copysign(1, self.size) * (price / self.entry_price - 1)
+        return gross_pl_pct - self._commissions / (abs(self.size) * self.entry_price)
+
+    @property
+    def value(self) -> float:
+        price = self.exit_price or self._instrument.last_price
+        return abs(self.size) * price
+
+    def close(self, portion: float = 1.0) -> None:
+        """
+        Close portion of the trade at the next open
+        """
+        size = copysign(max(1, int(round(abs(self.size) * portion))), -self.size)
+        self._instrument.close_orders.insert(0, (self, size))
+
+
+class _InstrumentPosition:
+    def __init__(self, instrument: "InstrumentView"):
+        self._instrument = instrument
+
+    def __bool__(self) -> bool:
+        return self.size != 0
+
+    @property
+    def size(self) -> int:
+        return sum(int(trade.size) for trade in self._instrument.trades)
+
+    @property
+    def pl(self) -> float:
+        trades = self._instrument.trades
+        return self._instrument.last_price * self.size - sum(
+            trade.size * trade.entry_price for trade in trades
+        )
+
+    @property
+    def pl_pct(self) -> float:
+        total_invested = sum(
+            abs(trade.size) * trade.entry_price for trade in self._instrument.trades
+        )
+        return (self.pl / total_invested) * 100 if total_invested else 0
+
+    @property
+    def is_long(self) -> bool:
+        return self.size > 0
+
+    @property
+    def is_short(self) -> bool:
+        return self.size < 0
+
+    def close(self, portion: float = 1.0) -> None:
+        for trade in self._instrument.trades:
+            trade.close(portion)
+
+
+class InstrumentView:
+    """
+    One ticker of the portfolio, seen by the strategy functions
+    as a backtesting Strategy
+    """
+
+    def __init__(
+        self,
+        account: "_PortfolioAccount",
+        account_index: int,
+        ticker: str,
+        data: pd.DataFrame,
+        strategy_params: StrategyParams,
+        weight: float,
+    ):
+        self.account_index = account_index
+        self.ticker = ticker
+        self.parameters = strategy_params
+        self.weight = weight
+        self.data = _BarData(df=data)
+        self._data = self.data
+        # NOTE The same ATR as in run_backtest_for_ticker
+        self.atr = pd.Series(data["tr"]).rolling(50).mean().bfill().values
+        self.special_situation_masks = get_special_situation_masks(
+            data=data, strategy_params=strategy_params
+        )
+        self.desired_sizes = get_desired_size_array(
+            data=data, strategy_params=strategy_params
+        )
+        self.attention_mask = get_attention_mask(
+            data=data,
+            strategy_params=strategy_params,
+            desired_sizes=self.desired_sizes,
+        )
+        # NOTE process_partial_close reads strategy._broker.last_price
+        self._broker = self
+        self.position = _InstrumentPosition(instrument=self)
+        self.trades: List[PortfolioTrade] = list()
+        self.closed_trades: List[PortfolioTrade] = list()
+        self.close_orders: List[Tuple[PortfolioTrade, float]] = list()
+        self.market_orders: List[float] = list()
+        self._account = account
+
+    @property
+    def last_price(self) -> float:
+        return self.data._arrays["Close"][self.data._len - 1]
+
+    @property
+    def equity(self) -> float:
+        return self._account.equity * self.weight
+
+    def buy(self, size: float) -> None:
+        self.market_orders.append(float(size))
+
+    def sell(self, size: float) -> None:
+        self.market_orders.append(-float(size))
+
+
+class _PortfolioAccount:
+    """
+    Cash and the per-ticker arrays of position sizes,
+    their cost, current prices, and the nearest stop-loss and take profit levels
+    """
+
+    def __init__(self, count: int, config: PortfolioConfig):
+        self.cash = float(config.cash)
+        self.commission = config.commission
+        self.leverage = 1 / config.margin
+        self.position_size = np.zeros(count)
+        self.position_cost = np.zeros(count)
+        self.last_close = np.zeros(count)
+        self.sl_trigger = np.full(count, np.nan)
+        self.tp_trigger = np.full(count, np.nan)
+        self.has_orders = np.zeros(count, dtype=bool)
+        self.canceled_orders = 0
+
+    @property
+    def equity(self) -> float:
+        return self.cash + (
+            self.position_size @ self.last_close - self.position_cost.sum()
+        )
+
+    @property
+    def margin_available(self) -> float:
+        margin_used = np.abs(self.position_size) @ self.last_close / self.leverage
+        return max(0.0, self.equity - margin_used)
+
+    def get_commission(self, size: float, price: float) -> float:
+        return abs(size) * price * self.commission
+
+    def sync(self, instrument: InstrumentView) -> None:
+        """
+        Update the arrays of the ticker after its trades or orders changed
+        """
+        i = instrument.account_index
+        trades = instrument.trades
+        self.position_size[i] = sum(trade.size for trade in trades)
+        self.position_cost[i] = sum(trade.size * trade.entry_price for trade in trades)
+        sl_values = [trade.sl for trade in trades if trade.sl is not None]
+        tp_values = [trade.tp for trade in trades if trade.tp is not None]
+        # NOTE hedging=False, all trades of the ticker have the same side
+        is_long = self.position_size[i] > 0
+        self.sl_trigger[i] = (
+            np.nan if not sl_values else (max(sl_values) if is_long else min(sl_values))
+        )
+        self.tp_trigger[i] = (
+            np.nan if not tp_values else (min(tp_values) if is_long else max(tp_values))
+        )
+        self.has_orders[i] = bool(instrument.close_orders or instrument.market_orders)
+
+    def get_stop_hits(
+        self, indices: np.ndarray, high: np.ndarray, low: np.ndarray
+    ) -> np.ndarray:
+        """
+        Boolean mask of the tickers whose stop-loss or take profit
+        may be hit within the bar with these high and low
+        """
+        size = self.position_size[indices]
+        sl = self.sl_trigger[indices]
+        tp = self.tp_trigger[indices]
+        with np.errstate(invalid="ignore"):
+            long_hit = (size > 0) & ((low <= sl) | (high >= tp))
+            short_hit = (size < 0) & ((high >= sl) | (low <= tp))
+        return long_hit | short_hit
+
+    def open_trade(
+        self, instrument: InstrumentView, size: int, price: float, bar: int
+    ) -> None:
+        instrument.trades.append(
+            PortfolioTrade(instrument=instrument, size=size, entry_price=price, entry_bar=bar)
+        )
+        self.cash = self.cash - self.get_commission(size=size, price=price)
+
+    def close_trade(
+        self, instrument: InstrumentView, trade: PortfolioTrade, price: float, bar: int
+    ) -> None:
+        instrument.trades.remove(trade)
+        trade.exit_price = price
+        trade.exit_bar = bar
+        instrument.closed_trades.append(trade)
+        commission = self.get_commission(size=trade.size, price=price)
+        self.cash = self.cash + trade.pl - commission
+        trade._commissions = commission + self.get_commission(
+            size=trade.size, price=trade.entry_price
+        )
+
+    def reduce_trade(
+        self,
+        instrument: InstrumentView,
+        trade: PortfolioTrade,
+        price: float,
+        size: float,
+        bar: int,
+    ) -> None:
+        size_left = trade.size + size
+        if not size_left:
+            self.close_trade(instrument=instrument, trade=trade, price=price, bar=bar)
+            return
+        # NOTE Like in the backtesting package, the closed part
+        # is a copy of the trade without stop-loss and take profit
+        trade.size = size_left
+        closed_part = copy.copy(trade)
+        closed_part.size = -size
+        closed_part.sl = None
+        closed_part.tp = None
+        instrument.trades.append(closed_part)
+        self.close_trade(instrument=instrument, trade=closed_part, price=price, bar=bar)
+
+    def process_orders(
+        self, instrument: InstrumentView, open_: float, high: float, low: float
+    ) -> None:
+        """
+        1. Close orders from Trade.close and Position.close at the open.
+        2. Stop-losses, then take profits, at their level or at the open
+        if the price gapped through it.
+        3. New market orders at the open, if there is enough margin.
+        """
+        bar = len(instrument.data) - 1
+
+        # 1
+        for trade, size in instrument.close_orders:
+            if trade in instrument.trades:
+                size = copysign(min(abs(trade.size), abs(size)), size)
+                self.reduce_trade(
+                    instrument=instrument, trade=trade, price=open_, size=size, bar=bar
+                )
+        instrument.close_orders = list()
+
+        # 2
+        for trade in reversed(list(instrument.trades)):
+            if trade.sl is None:
+                continue
+            if trade.is_long and low <= trade.sl:
+                price = min(open_, trade.sl)
+            elif trade.is_short and high >= trade.sl:
+                price = max(open_, trade.sl)
+            else:
+                continue
+            self.close_trade(instrument=instrument, trade=trade, price=price, bar=bar)
+        for trade in list(instrument.trades):
+            if trade.tp is None:
+                continue
+            if trade.is_long and high >= trade.tp:
+                price = max(open_, trade.tp)
+            elif trade.is_short and low <= trade.tp:
+                price = min(open_, trade.tp)
+            else:
+                continue
+            self.close_trade(instrument=instrument, trade=trade, price=price, bar=bar)
+
+        # 3
+        for order_size in instrument.market_orders:
+            need_size = int(order_size)
+            # hedging=False - fill the order by FIFO closing the opposite trades
+            for trade in list(instrument.trades):
+                if trade.is_long == (order_size > 0):
+                    continue
+                if abs(need_size) >= abs(trade.size):
+                    self.close_trade(
+                        instrument=instrument, trade=trade, price=open_, bar=bar
+                    )
+                    need_size = need_size + trade.size
+                else:
+                    self.reduce_trade(
+                        instrument=instrument,
+                        trade=trade,
+                        price=open_,
+                        size=need_size,
+                        bar=bar,
+                    )
+                    need_size = 0
+                if not need_size:
+                    break
+            self.sync(instrument=instrument)
+            price_plus_commission = open_ + self.get_commission(
+                size=order_size, price=open_
+            ) / abs(order_size)
+            if abs(need_size) * price_plus_commission > self.margin_available * self.leverage:
+                logging.debug(
+                    f"{instrument.ticker}: order {order_size} canceled due to insufficient margin"
+                )
+                self.canceled_orders = self.canceled_orders + 1
+                continue
+            if need_size:
+                self.open_trade(
+                    instrument=instrument, size=need_size, price=open_, bar=bar
+                )
+        instrument.market_orders = list()
+
+
+def _step_instrument(instrument: InstrumentView) -> None:
+    """
+    The same steps as in the next() of the strategy
+    in run_backtest_for_ticker, without the last day results
+    """
+    if (
+        instrument.attention_mask is not None
+        and not instrument.attention_mask[len(instrument.data) - 1]
+        and not instrument.trades
+        and not instrument.market_orders
+        and not instrument.close_orders
+    ):
+        return
+    update_stop_losses(strategy=instrument)
+    if instrument.parameters.profit_target_long_pct is not None:
+        check_set_profit_targets_long_trades(strategy=instrument)
+    if instrument.parameters.profit_target_short_pct is not None:
+        check_set_profit_targets_short_trades(strategy=instrument)
+    log_initial_data_for_today(strategy=instrument, ticker=instrument.ticker)
+    if instrument.trades:
+        ss_today, _ = process_special_situations(
+            strategy=instrument, masks=instrument.special_situation_masks
+        )
+        if ss_today:
+            return
+    if instrument.desired_sizes is not None:
+        desired_size, current_position_size, _ = reconcile_desired_size(
+            strategy=instrument,
+            desired_sizes=instrument.desired_sizes,
+            rebalance_same_side=instrument.parameters.rebalance_same_side,
+        )
+    else:
+        desired_size, current_position_size, _ = get_desired_current_position_size(
+            strategy=instrument
+        )
+    adjust_position(
+        strategy=instrument,
+        current_position_size=current_position_size,
+        desired_size=desired_size,
+    )
+
+
+def _get_weights(tickers: List[str], config: PortfolioConfig) -> Dict[str, float]:
+    if config.weights is None:
+        return {ticker: 1 / len(tickers) for ticker in tickers}
+    missing = [ticker for ticker in tickers if ticker not in config.weights]
+    if missing:
+        raise ValueError(f"run_portfolio_backtest: no weights for {missing}")
+    return {ticker: config.weights[ticker] for ticker in tickers}
+
+
+def _align(
+    tickers_data: Dict[str, pd.DataFrame], calendar: pd.DatetimeIndex
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Return the matrix of the row numbers of every ticker
+    at every calendar date, -1 if the ticker has no bar at the date,
+    and the OHLC matrices aligned to the calendar, NaN where no bar
+    """
+    rows = np.full((len(calendar), len(tickers_data)), -1, dtype=np.int64)
+    prices = {
+        col: np.full((len(calendar), len(tickers_data)), np.nan)
+        for col in ["Open", "High", "Low", "Close"]
+    }
+    for i, df in enumerate(tickers_data.values()):
+        positions = calendar.get_indexer(df.index)
+        rows[positions, i] = np.arange(len(df))
+        for col, matrix in prices.items():
+            matrix[positions, i] = df[col].to_numpy(dtype=float)
+    return rows, prices
+
+
+def _get_calendar_trades(
+    trades: pd.DataFrame, calendar: pd.DatetimeIndex
+) -> pd.DataFrame:
+    """
+    Trades with EntryBar and ExitBar as positions in the calendar,
+    sorted by exit, for compute_stats
+    """
+    res = trades.copy()
+    res["EntryBar"] = calendar.get_indexer(res["EntryTime"])
+    res["ExitBar"] = calendar.get_indexer(res["ExitTime"])
+    return res.sort_values(["ExitBar", "EntryBar"], kind="stable").reset_index(
+        drop=True
+    )
+
+
+def _get_ticker_summary(
+    trades: pd.DataFrame, tickers: List[str], weights: Dict[str, float]
+) -> pd.DataFrame:
+    rows = list()
+    for ticker in tickers:
+        pl = trades.loc[trades["Ticker"] == ticker, "PnL"]
+        rows.append(
+            {
+                "Ticker": ticker,
+                "weight": weights[ticker],
+                "# Trades": len(pl),
+                "PnL": pl.sum(),
+                "Win Rate [%]": (pl > 0).mean() * 100 if len(pl) else np.nan,
+                "SQN_modified": pl.mean() / pl.std() if len(pl) > 1 else np.nan,
+            }
+        )
+    return pd.DataFrame(rows).set_index("Ticker")
+
+
+def run_portfolio_backtest(
+    tickers_data: Dict[str, pd.DataFrame],
+    strategy_params: StrategyParams,
+    config: Optional[PortfolioConfig] = None,
+) -> PortfolioResult:
+    """
+    Backtest all tickers together with one account.
+    tickers_data are the DataFrames with features,
+    e.g. TickersData.tickers_data_with_features.
+
+    1. Align all tickers on the union of their dates.
+    2. For every date, for the tickers that have a bar at the date:
+    fill their orders and stops, mark the portfolio to market at the close,
+    then run the strategy steps of every ticker.
+    3. Calculate the portfolio stats from the equity curve and all trades.
+    Buy & Hold Return is the return of the equal-weight portfolio of the tickers.
+    """
+    if not tickers_data:
+        raise ValueError("run_portfolio_backtest: empty tickers_data")
+    if config is None:
+        config = PortfolioConfig()
+    tickers = list(tickers_data.keys())
+    weights = _get_weights(tickers=tickers, config=config)
+
+    # 1
+    calendar = pd.DatetimeIndex(
+        sorted(set().union(*[df.index for df in tickers_data.values()]))
+    )
+    rows, prices = _align(tickers_data=tickers_data, calendar=calendar)
+    account = _PortfolioAccount(count=len(tickers), config=config)
+    instruments = [
+        InstrumentView(
+            account=account,
+            account_index=i,
+            ticker=ticker,
+            data=df,
+            strategy_params=strategy_params,
+            weight=weights[ticker],
+        )
+        for i, (ticker, df) in enumerate(tickers_data.items())
+    ]
+
+    # 2
+    equity = np.full(len(calendar), np.nan)
+    for t in range(len(calendar)):
+        active = np.flatnonzero(rows[t] >= 0)
+        for i in active:
+            instruments[i].data._len = rows[t, i] + 1
+        account.last_close[active] = prices["Close"][t, active]
+
+        # NOTE Only the tickers with orders or hit stops go through the broker
+        to_process = active[
+            account.has_orders[active]
+            | account.get_stop_hits(
+                indices=active,
+                high=prices["High"][t, active],
+                low=prices["Low"][t, active],
+            )
+        ]
+        for i in to_process:
+            account.process_orders(
+                instrument=instruments[i],
+                open_=prices["Open"][t, i],
+                high=prices["High"][t, i],
+                low=prices["Low"][t, i],
+            )
+            account.sync(instrument=instruments[i])
+
+        equity[t] = account.equity
+        if equity[t] <= 0:
+            logging.warning(f"run_portfolio_backtest: out of money at {calendar[t]}")
+            for instrument in instruments:
+                for trade in list(instrument.trades):
+                    account.close_trade(
+                        instrument=instrument,
+                        trade=trade,
+                        price=instrument.last_price,
+                        bar=len(instrument.data) - 1,
+                    )
+            equity[t:] = 0
+            break
+
+        # NOTE Like in Backtest.run, the strategy starts at the second bar
+        for i in active[rows[t, active] >= 1]:
+            _step_instrument(instrument=instruments[i])
+            account.sync(instrument=instruments[i])
+
+    # 3
+    # NOTE pandas warns about concatenating empty DataFrames,
+    # so the tickers without trades are skipped
+    trades_list = list()
+    for instrument in instruments:
+        if not instrument.closed_trades:
+            continue
+        ticker_trades = get_trades_df(trades=instrument.closed_trades)
+        ticker_trades["Ticker"] = instrument.ticker
+        trades_list.append(ticker_trades)
+    if trades_list:
+        trades = pd.concat(trades_list, ignore_index=True)
+    else:
+        trades = get_trades_df(trades=list())
+        trades["Ticker"] = pd.Series(dtype=object)
+
+    normalized_close = pd.DataFrame(prices["Close"], index=calendar).ffill().bfill()
+    benchmark = pd.DataFrame(
+        {"Close": (normalized_close / normalized_close.iloc[0]).mean(axis=1)}
+    )
+    stats = compute_stats(
+        trades=_get_calendar_trades(trades=trades, calendar=calendar),
+        equity=equity,
+        ohlc_data=benchmark,
+        strategy_instance=None,
+    )
+    stats["SQN_modified"] = (
+        stats["SQN"] / np.sqrt(stats["# Trades"]) if stats["# Trades"] else np.nan
+    )
+    stats["# Canceled orders"] = account.canceled_orders
+    return PortfolioResult(
+        stats=stats,
+        trades=trades,
+        equity_curve=pd.Series(equity, index=calendar, name="Equity"),
+        ticker_summary=_get_ticker_summary(
+            trades=trades, tickers=tickers, weights=weights
+        ),
+    )
@@ -1,31 +1,113 @@
+import contextlib
+import dataclasses
 import logging
-import os
-from typing import Tuple
+from typing import Callable, List, NamedTuple, Optional, Tuple
 
 import pandas as pd
 from backtesting import Backtest, Strategy
 
 from customizable import StrategyParams, get_desired_current_position_size
+from utils.bar_profiler import BAR_PROFILER, NEXT_TOTAL
+from utils.instrumentation import span
 from utils.strategy_exec import (
+    SPECIAL_SITUATION_HANDLERS,
+    SpecialSituation,
     adjust_position,
     all_current_trades_info,
     check_set_profit_targets_long_trades,
     check_set_profit_targets_short_trades,
     create_last_day_results,
+    get_special_situation_masks,
     log_initial_data_for_today,
     process_special_situations,
+    reconcile_desired_size,
     update_stop_losses,
 )
 
+from .execution_profile import (
+    ExecutionProfile,
+    get_attention_mask,
+    get_default_execution_profile,
+    get_desired_size_array,
+    light_stats_mode,
+)
+
+
+class NextSteps(NamedTuple):
+    """
+    Functions that the strategy calls in next()
+    """
+
+    update_stop_losses: Callable
+    check_set_profit_targets_long_trades: Callable
+    check_set_profit_targets_short_trades: Callable
+    all_current_trades_info: Callable
+    log_initial_data_for_today: Callable
+    special_situation_handlers: List[SpecialSituation]
+    get_desired_current_position_size: Callable
+    reconcile_desired_size: Callable
+    adjust_position: Callable
+
+
+def _get_next_steps(profile: bool) -> NextSteps:
+    """
+    If profile is False, return the original functions.
+    Otherwise, wrap every function and every special situation handler
+    so that BAR_PROFILER records the duration of its calls.
+    """
+    steps = NextSteps(
+        update_stop_losses=update_stop_losses,
+        check_set_profit_targets_long_trades=check_set_profit_targets_long_trades,
+        check_set_profit_targets_short_trades=check_set_profit_targets_short_trades,
+        all_current_trades_info=all_current_trades_info,
+        log_initial_data_for_today=log_initial_data_for_today,
+        special_situation_handlers=SPECIAL_SITUATION_HANDLERS,
+        get_desired_current_position_size=get_desired_current_position_size,
+        reconcile_desired_size=reconcile_desired_size,
+        adjust_position=adjust_position,
+    )
+    if not profile:
+        return steps
+    wrapped = {
+        name: BAR_PROFILER.wrap(name=name, func=func)
+        for name, func in steps._asdict().items()
+        if name != "special_situation_handlers"
+    }
+    wrapped["special_situation_handlers"] = [
+        dataclasses.replace(
+            special_situation,
+            handler=BAR_PROFILER.wrap(
+                name=f"ss_{special_situation.handler.__name__}",
+                func=special_situation.handler,
+            ),
+        )
+        for special_situation in steps.special_situation_handlers
+    ]
+    return NextSteps(**wrapped)
+
 
 def run_backtest_for_ticker(
     ticker: str,
     data: pd.DataFrame,
     strategy_params: StrategyParams,
+    execution_profile: Optional[ExecutionProfile] = None,
+    keep_equity_curve: bool = False,
 ) -> Tuple[pd.Series, pd.DataFrame, dict]:
-    local_env = os.environ.get("environment", default="prod")
+    """
+    Run the backtest, return stats, trades, and last_day_result.
+    If execution_profile is None, it is INTERACTIVE
+    when the environment variable environment is dev, BATCH otherwise.
+    In the OPTIMIZE profile, stats contain only a few metrics,
+    and _equity_curve is None unless keep_equity_curve is True,
+    see compute_light_stats.
+    Only the INTERACTIVE profile saves the plot,
+    use plot_backtest_for_ticker to get it later for the ticker you need.
+    """
+    if execution_profile is None:
+        execution_profile = get_default_execution_profile()
     last_day_result = dict()
     last_day_result["last_day_index"] = data.index[-1]
+    steps = _get_next_steps(profile=strategy_params.profile_next_calls)
 
     class CustomTradingStrategy1(Strategy):
         def init(self):
@@ -39,6 +121,31 @@ def run_backtest_for_ticker(
             # NOTE ATR is used in update_stop_losses
             self.atr = pd.Series(self.data.tr).rolling(50).mean().bfill().values
 
+            # NOTE The special situation handlers are called
+            # only on the bars where their preconditions are True
+            self.special_situation_masks = get_special_situation_masks(
+                data=data,
+                strategy_params=strategy_params,
+                handlers=steps.special_situation_handlers,
+            )
+
+            # NOTE None unless strategy_params.use_desired_size_array is True
+            self.desired_sizes = get_desired_size_array(
+                data=data, strategy_params=strategy_params
+            )
+
+            # NOTE None unless strategy_params.skip_idle_bars is True
+            self.attention_mask = get_attention_mask(
+                data=data,
+                strategy_params=strategy_params,
+                desired_sizes=self.desired_sizes,
+            )
+
+            # NOTE The instance attribute shadows the method,
+            # so the backtesting package calls the wrapped next()
+            if self.parameters.profile_next_calls:
+                self.next = BAR_PROFILER.wrap(name=NEXT_TOTAL, func=self.next)
+
         def next(self):
             """
             1. For every open trade, update stop-loss and process profit target.
@@ -52,22 +159,34 @@ def run_backtest_for_ticker(
             No need to execute step 3 at this day, only step 4.
 
             3. Call get_desired_current_position_size() and adjust_position().
+            If use_desired_size_array is True, take the desired size
+            from the precomputed array instead, see reconcile_desired_size().
 
             4. If it's the last day of data series, fill the last_day_result dict.
+
+            If skip_idle_bars is True, the bars without open trades,
+            orders, and signal are skipped, nothing happens there anyway.
             """
+            if (
+                self.attention_mask is not None
+                and not self.attention_mask[len(self.data) - 1]
+                and not self._broker.trades
+                and not self._broker.orders
+            ):
+                return
 
             # 1
             logging.debug("\n")
-            update_stop_losses(strategy=self)
+            steps.update_stop_losses(strategy=self)
             if self.parameters.profit_target_long_pct is not None:
-                check_set_profit_targets_long_trades(strategy=self)
+                steps.check_set_profit_targets_long_trades(strategy=self)
             if self.parameters.profit_target_short_pct is not None:
-                check_set_profit_targets_short_trades(strategy=self)
+                steps.check_set_profit_targets_short_trades(strategy=self)
 
             # preparations for 4
             current_position_num_stocks = self.position.size
-            all_current_trades = all_current_trades_info(strategy=self)
-            log_initial_data_for_today(strategy=self, ticker=ticker)
+            all_current_trades = steps.all_current_trades_info(strategy=self)
+            steps.log_initial_data_for_today(strategy=self, ticker=ticker)
 
             # 2 -
             # NOTE ss - special situation
@@ -75,7 +194,9 @@ def run_backtest_for_ticker(
             today_special_situation_msg = None
             if self.trades:
                 ss_today, today_special_situation_msg = process_special_situations(
-                    strategy=self
+                    strategy=self,
+                    handlers=steps.special_situation_handlers,
+                    masks=self.special_situation_masks,
                 )
             if ss_today:
                 # extraordinary step 4, because now we’ll finish
@@ -91,15 +212,26 @@ def run_backtest_for_ticker(
                 return
 
             # 3
-            (
-                desired_size,
-                current_position_size,
-                desired_size_msg,
-            ) = get_desired_current_position_size(
-                strategy=self,
-            )
+            if self.desired_sizes is not None:
+                (
+                    desired_size,
+                    current_position_size,
+                    desired_size_msg,
+                ) = steps.reconcile_desired_size(
+                    strategy=self,
+                    desired_sizes=self.desired_sizes,
+                    rebalance_same_side=self.parameters.rebalance_same_side,
+                )
+            else:
+                (
+                    desired_size,
+                    current_position_size,
+                    desired_size_msg,
+                ) = steps.get_desired_current_position_size(
+                    strategy=self,
+                )
             logging.debug(f"{desired_size=}")
-            today_action = adjust_position(
+            today_action = steps.adjust_position(
                 strategy=self,
                 current_position_size=current_position_size,
                 desired_size=desired_size,
@@ -135,11 +267,18 @@ def run_backtest_for_ticker(
         hedging=False,
         margin=0.02,
     )
-    stats = bt.run()
-    if local_env == "dev":
+    stats_mode = (
+        light_stats_mode(keep_equity_curve=keep_equity_curve)
+        if execution_profile == ExecutionProfile.OPTIMIZE
+        else contextlib.nullcontext()
+    )
+    with span(stage="backtest_run", ticker=ticker), stats_mode:
+        stats = bt.run()
+    if execution_profile == ExecutionProfile.INTERACTIVE:
         logging.debug(stats)
         logging.debug(stats._trades.columns)
-        bt.plot(filename=f"res_plot_{ticker}.html", plot_volume=False)
+        with span(stage="plot", ticker=ticker):
+            bt.plot(filename=f"res_plot_{ticker}.html", plot_volume=False)
 
     # NOTE here you can add custom stuff to stats
 
@@ -153,4 +292,22 @@ def run_backtest_for_ticker(
 
     logging.debug(f"{last_day_result=}")
     logging.debug("\n")
-    return stats, stats._trades, last_day_result
+    return stats, stats["_trades"], last_day_result
+
+
+def plot_backtest_for_ticker(
+    ticker: str,
+    data: pd.DataFrame,
+    strategy_params: StrategyParams,
+) -> str:
+    """
+    Run the backtest in the INTERACTIVE profile
+    to save its plot, return the html file name
+    """
+    run_backtest_for_ticker(
+        ticker=ticker,
+        data=data,
+        strategy_params=strategy_params,
+        execution_profile=ExecutionProfile.INTERACTIVE,
+    )
+    return f"res_plot_{ticker}.html"
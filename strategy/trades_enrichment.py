@@ -0,0 +1,150 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.strategy_exec.trade_tags import (
+    TradeTag,
+    get_trade_tag_masks,
+    trade_tag_to_text,
+)
+
+# Boolean column name -> flag that the system sets in trade tags
+TAG_FLAG_COLUMNS: Dict[str, TradeTag] = {
+    "tag_partially_closed": TradeTag.PARTIALLY_CLOSED,
+    "tag_closed_volatility_spike": TradeTag.CLOSED_VOLATILITY_SPIKE,
+    "tag_closed_side_change": TradeTag.CLOSED_SIDE_CHANGE,
+    "tag_closed_hammer": TradeTag.CLOSED_HAMMER,
+    "tag_closed_shooting_star": TradeTag.CLOSED_SHOOTING_STAR,
+    "tag_closed_max_duration": TradeTag.CLOSED_MAX_DURATION,
+    "tag_sl_triggered": TradeTag.SL_TRIGGERED,
+    "tag_tp_triggered": TradeTag.TP_TRIGGERED,
+    "tag_sl_tightened": TradeTag.SL_TIGHTENED,
+}
+
+
+def add_feature_values_to_trades(
+    trades: pd.DataFrame,
+    ticker_data: pd.DataFrame,
+    feature_cols: List[str],
+    at_exit: bool = True,
+) -> pd.DataFrame:
+    """
+    For every column in feature_cols, add its value at the entry bar
+    ({col}_entry) and, if at_exit is True, at the exit bar ({col}_exit)
+    of every trade. One positional take per column, no loops over trades.
+    """
+    res = trades.copy()
+    entry_bars = trades["EntryBar"].to_numpy(dtype=np.intp)
+    exit_bars = trades["ExitBar"].to_numpy(dtype=np.intp)
+    for col in feature_cols:
+        if col not in ticker_data.columns:
+            raise ValueError(
+                f"add_feature_values_to_trades: no {col} column in ticker_data"
+            )
+        values = ticker_data[col].to_numpy()
+        res[f"{col}_entry"] = values.take(entry_bars)
+        if at_exit:
+            res[f"{col}_exit"] = values.take(exit_bars)
+    return res
+
+
+def _reduce_over_bar_ranges(
+    values: np.ndarray, start_bars: np.ndarray, end_bars: np.ndarray, ufunc: np.ufunc
+) -> np.ndarray:
+    """
+    For every pair (start_bar, end_bar), reduce values[start_bar : end_bar + 1]
+    with ufunc (np.minimum or np.maximum) in one reduceat call.
+    The ranges may overlap.
+    """
+    if start_bars.size == 0:
+        return np.array([], dtype=float)
+
+    # NOTE reduceat reduces values[indices[i] : indices[i + 1]],
+    # so interleave the starts and ends and keep every second result.
+    # The padding element makes end_bar + 1 a valid index for the last bar.
+    padded = np.append(values.astype(float), np.nan)
+    indices = np.empty(start_bars.size * 2, dtype=np.intp)
+    indices[0::2] = start_bars
+    indices[1::2] = end_bars + 1
+    return ufunc.reduceat(padded, indices)[0::2]
+
+
+def add_excursions_to_trades(
+    trades: pd.DataFrame, ticker_data: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Add Maximum Adverse Excursion (MAE_pct) and Maximum Favorable Excursion (MFE_pct)
+    of every trade in percent of its entry price.
+    They are calculated from the Low and High of the bars
+    from the entry bar to the exit bar inclusive.
+    MAE_pct <= 0 and MFE_pct >= 0 for long and short trades alike.
+    """
+    res = trades.copy()
+    entry_bars = trades["EntryBar"].to_numpy(dtype=np.intp)
+    exit_bars = trades["ExitBar"].to_numpy(dtype=np.intp)
+    lowest_low = _reduce_over_bar_ranges(
+        values=ticker_data["Low"].to_numpy(),
+        start_bars=entry_bars,
+        end_bars=exit_bars,
+        ufunc=np.minimum,
+    )
+    highest_high = _reduce_over_bar_ranges(
+        values=ticker_data["High"].to_numpy(),
+        start_bars=entry_bars,
+        end_bars=exit_bars,
+        ufunc=np.maximum,
+    )
+    entry_price = trades["EntryPrice"].to_numpy(dtype=float)
+    is_long = trades["Size"].to_numpy() > 0
+    res["MAE_pct"] = np.where(
+        is_long,
+        (lowest_low / entry_price - 1) * 100,
+        (1 - highest_high / entry_price) * 100,
+    )
+    res["MFE_pct"] = np.where(
+        is_long,
+        (highest_high / entry_price - 1) * 100,
+        (1 - lowest_low / entry_price) * 100,
+    )
+    return res
+
+
+def add_tag_columns_to_trades(trades: pd.DataFrame) -> pd.DataFrame:
+    """
+    Expand the trade tag bitmasks into Boolean columns listed in TAG_FLAG_COLUMNS
+    and replace the Tag column with its readable text
+    """
+    res = trades.copy()
+    tag_masks = get_trade_tag_masks(tags=res["Tag"])
+    for col_name, flag in TAG_FLAG_COLUMNS.items():
+        res[col_name] = (tag_masks & int(flag)) != 0
+    res["Tag"] = [trade_tag_to_text(tag_mask) for tag_mask in tag_masks]
+    return res
+
+
+def enrich_trades(
+    trades: pd.DataFrame,
+    ticker_data: pd.DataFrame,
+    feature_cols: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Prepare trades of one ticker for analysis:
+    1. Add feature values at the entry and exit bars.
+    2. Add MAE and MFE.
+    3. Add the holding period in days.
+    4. Expand tags into Boolean columns.
+    """
+    res = trades
+    if feature_cols:
+        res = add_feature_values_to_trades(
+            trades=res, ticker_data=ticker_data, feature_cols=feature_cols
+        )
+    res = add_excursions_to_trades(trades=res, ticker_data=ticker_data)
+    # NOTE The time columns of an empty trades DataFrame
+    # have object or float dtype, not datetime
+    res["HoldingDays"] = (
+        pd.to_datetime(res["ExitTime"]) - pd.to_datetime(res["EntryTime"])
+    ).dt.days
+    res = add_tag_columns_to_trades(trades=res)
+    return res
@@ -35,6 +35,18 @@ def spy_df_5_min() -> pd.DataFrame:
     return pd.read_csv(file, parse_dates=[0], index_col=0)
 
 
+@pytest.fixture
+def spy_df_5_min_dst() -> pd.DataFrame:
+    """
+    5-minute bars of six days around the DST change on 2025-03-09,
+    the UTC offset changes from -05:00 to -04:00
+    """
+    file = Path(__file__).parent / "fixtures_data/5m_SPY_dst_for_testing.csv"
+    df = pd.read_csv(file, index_col=0)
+    df.index = pd.to_datetime(df.index, utc=True).tz_convert("America/New_York")
+    return df
+
+
 @pytest.fixture
 def spy_df_15_min() -> pd.DataFrame:
     file = Path(__file__).parent / "fixtures_data/15m_SPY_for_testing.csv"
@@ -26,3 +26,36 @@ def test_calculate_ib_breakout_and_breakdown_metrics_ok(
     pd.testing.assert_frame_equal(ib_high_bt_df, df_ib_high_bt_metrics_res)
 
     print(ib_high_bt_df["Val"].describe())
+
+
+def test_calculate_ib_breakout_and_breakdown_metrics_as_dataframe(
+    df_5_min_with_ib_breakdown_breakout: pd.DataFrame,
+    df_ib_high_bt_metrics_res: pd.DataFrame,
+    df_ib_low_bd_metrics_res: pd.DataFrame,
+) -> None:
+    """
+    With as_dataframe=True, the function returns DataFrames
+    with the same content as the lists of dictionaries.
+    """
+    ib_low_bd_df, ib_high_bt_df = calculate_ib_breakout_and_breakdown_metrics(
+        df=df_5_min_with_ib_breakdown_breakout, as_dataframe=True
+    )
+    assert isinstance(ib_low_bd_df, pd.DataFrame)
+    assert isinstance(ib_high_bt_df, pd.DataFrame)
+    ib_low_bd_df["Date"] = pd.to_datetime(ib_low_bd_df["Date"])
+    ib_high_bt_df["Date"] = pd.to_datetime(ib_high_bt_df["Date"])
+    pd.testing.assert_frame_equal(ib_low_bd_df, df_ib_low_bd_metrics_res)
+    pd.testing.assert_frame_equal(ib_high_bt_df, df_ib_high_bt_metrics_res)
+
+
+def test_calculate_ib_breakout_and_breakdown_metrics_no_events(
+    df_5_min_with_ib_breakdown_breakout: pd.DataFrame,
+) -> None:
+    df = df_5_min_with_ib_breakdown_breakout.copy()
+    df["ib_low_bd"] = False
+    df["ib_high_bt"] = False
+    ib_low_bd_vals, ib_high_bt_vals = calculate_ib_breakout_and_breakdown_metrics(
+        df=df
+    )
+    assert ib_low_bd_vals == []
+    assert ib_high_bt_vals == []
@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from derivative_columns.initial_balance import (
+    add_col_ib_high_low,
+    check_initial_balance_breach,
+    get_day_codes,
+)
+from utils.intraday_chunks import (
+    add_ib_columns_to_intraday_file,
+    iter_whole_day_chunks,
+)
+
+
+@pytest.mark.unit
+def test_iter_whole_day_chunks_no_day_is_split(
+    spy_df_5_min: pd.DataFrame, tmp_path: Path
+) -> None:
+    """
+    Small rows_per_read forces days to be split between reads,
+    but every yielded chunk must contain whole days only.
+    """
+    src = tmp_path / "raw_5m.csv"
+    spy_df_5_min.to_csv(src)
+    chunks = list(
+        iter_whole_day_chunks(file_path=str(src), days_per_chunk=3, rows_per_read=100)
+    )
+
+    all_days = set(get_day_codes(index=spy_df_5_min.index))
+    seen_days: set = set()
+    for chunk in chunks[:-1]:
+        chunk_days = set(get_day_codes(index=chunk.index))
+        assert len(chunk_days) == 3
+        assert not chunk_days & seen_days
+        seen_days |= chunk_days
+    seen_days |= set(get_day_codes(index=chunks[-1].index))
+    assert seen_days == all_days
+    assert sum(len(chunk) for chunk in chunks) == len(spy_df_5_min)
+
+
+@pytest.mark.unit
+def test_add_ib_columns_to_intraday_file_same_as_in_memory(
+    spy_df_5_min: pd.DataFrame, tmp_path: Path
+) -> None:
+    pytest.importorskip("pyarrow")
+    src = tmp_path / "raw_5m.csv"
+    dst = tmp_path / "with_ib.parquet"
+    spy_df_5_min.to_csv(src)
+
+    rows = add_ib_columns_to_intraday_file(
+        src_csv_path=str(src),
+        dst_parquet_path=str(dst),
+        days_per_chunk=2,
+        rows_per_read=150,
+    )
+
+    expected = check_initial_balance_breach(df=add_col_ib_high_low(df=spy_df_5_min))
+    res = pd.read_parquet(dst)
+    assert rows == len(expected)
+
+    # NOTE Parquet round trip keeps the UTC offset but may change
+    # its representation, e.g. UTC-04:00 becomes pytz.FixedOffset(-240)
+    res.index = res.index.tz_convert("UTC")
+    expected.index = expected.index.tz_convert("UTC")
+    pd.testing.assert_frame_equal(res, expected, check_freq=False)
+
+
+@pytest.mark.unit
+def test_add_ib_columns_to_intraday_file_dst_change(
+    spy_df_5_min_dst: pd.DataFrame, tmp_path: Path
+) -> None:
+    """
+    The file spans a DST change, so its timestamps have different UTC offsets.
+    """
+    pytest.importorskip("pyarrow")
+    src = tmp_path / "raw_5m.csv"
+    dst = tmp_path / "with_ib.parquet"
+    spy_df_5_min_dst.to_csv(src)
+
+    chunks = list(
+        iter_whole_day_chunks(file_path=str(src), days_per_chunk=2, rows_per_read=100)
+    )
+    assert [len(set(get_day_codes(index=chunk.index))) for chunk in chunks] == [
+        2,
+        2,
+        2,
+    ]
+
+    add_ib_columns_to_intraday_file(
+        src_csv_path=str(src), dst_parquet_path=str(dst), days_per_chunk=2
+    )
+    expected = check_initial_balance_breach(
+        df=add_col_ib_high_low(df=spy_df_5_min_dst)
+    )
+    res = pd.read_parquet(dst)
+    assert res["ib_high"].notna().sum() > 0
+    pd.testing.assert_frame_equal(res, expected, check_freq=False)
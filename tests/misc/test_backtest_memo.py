@@ -0,0 +1,146 @@
+import ast
+import os
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+import pytest
+
+from customizable import StrategyParams
+from derivative_columns.atr import add_tr_delta_col_to_ohlc
+from features.f_v1_basic import add_features_v1_basic
+from strategy.all_tickers import get_stat_and_trades
+from utils.backtest_memo import (
+    REPO_ROOT,
+    STRATEGY_CODE_PATHS,
+    BacktestMemo,
+    get_memo_key,
+)
+
+
+@pytest.fixture
+def spy_with_features(spy_df_daily: pd.DataFrame) -> pd.DataFrame:
+    return add_tr_delta_col_to_ohlc(
+        ohlc_df=add_features_v1_basic(
+            df=spy_df_daily.loc["2021-01-01":], atr_multiplier_threshold=3
+        )
+    )
+
+
+@pytest.mark.unit
+def test_memo_key(spy_with_features: pd.DataFrame) -> None:
+    params = StrategyParams(max_trade_duration_long=8)
+    key = get_memo_key(ticker="SPY", data=spy_with_features, strategy_params=params)
+    assert key == get_memo_key(
+        ticker="SPY",
+        data=spy_with_features.copy(),
+        strategy_params=StrategyParams(max_trade_duration_long=8, profile_next_calls=True),
+    )
+    assert key != get_memo_key(
+        ticker="SPY",
+        data=spy_with_features,
+        strategy_params=StrategyParams(max_trade_duration_long=9),
+    )
+    changed = spy_with_features.copy()
+    changed.iloc[-1, changed.columns.get_loc("Close")] += 0.01
+    assert key != get_memo_key(ticker="SPY", data=changed, strategy_params=params)
+
+
+@pytest.mark.unit
+def test_get_stat_and_trades_with_memo(
+    spy_with_features: pd.DataFrame, tmp_path: Path, mocker
+) -> None:
+    memo = BacktestMemo(memo_dir=str(tmp_path))
+    params = StrategyParams(max_trade_duration_long=8, profit_target_long_pct=5.5)
+    stat, trades, last_day_result = get_stat_and_trades(
+        ohlc_with_feature=spy_with_features,
+        strategy_params=params,
+        ticker="SPY",
+        memo=memo,
+    )
+    assert memo.get_stats()["entries"] == 1
+
+    spy_backtest = mocker.patch("strategy.all_tickers.run_backtest_for_ticker")
+    stat_memo, trades_memo, last_day_result_memo = get_stat_and_trades(
+        ohlc_with_feature=spy_with_features,
+        strategy_params=params,
+        ticker="SPY",
+        memo=memo,
+    )
+    spy_backtest.assert_not_called()
+    assert memo.hits == 1
+    assert stat_memo["_strategy"] is None
+    assert stat_memo["SQN"] == stat["SQN"]
+    pd.testing.assert_frame_equal(trades_memo, trades)
+    assert last_day_result_memo == last_day_result
+
+
+@pytest.mark.unit
+def test_memo_prune_least_recently_used(tmp_path: Path) -> None:
+    memo = BacktestMemo(memo_dir=str(tmp_path), max_size_mb=1)
+    stats = pd.Series({"_strategy": "x", "SQN": 1.0})
+    trades = pd.DataFrame({"PnL": range(10_000)})
+    for i, key in enumerate(["a", "b", "c"]):
+        memo.save(key=key, result=(stats, trades, dict()))
+        os.utime(tmp_path / f"{key}.pkl", (1000 + i, 1000 + i))
+
+    # reading "a" makes it the most recently used
+    assert memo.load(key="a") is not None
+    assert memo.prune(max_size_mb=0.2) == 1
+    assert memo.load(key="b") is None
+    assert memo.load(key="a") is not None
+    assert memo.clear() == 2
+    assert memo.list_entries().empty
+
+
+def _get_imported_repo_files(file: Path) -> List[Path]:
+    """
+    Files of the repo modules that file imports
+    """
+    res = list()
+    for node in ast.walk(ast.parse(file.read_text(encoding="UTF-8"))):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                package = file.relative_to(REPO_ROOT).parent.parts
+                package = package[: len(package) - node.level + 1]
+                base = ".".join(list(package) + ([base] if base else []))
+            modules = [base] + [f"{base}.{alias.name}" for alias in node.names]
+        else:
+            continue
+        for module in modules:
+            path = REPO_ROOT.joinpath(*module.split("."))
+            for candidate in [path.with_suffix(".py"), path / "__init__.py"]:
+                if candidate.is_file():
+                    res.append(candidate)
+    return res
+
+
+@pytest.mark.unit
+def test_strategy_code_paths_cover_imports() -> None:
+    """
+    Every repo module the strategy code imports must be hashed,
+    otherwise its changes would not invalidate the memo.
+    """
+    # NOTE Diagnostics only, they don't change the results
+    not_hashed = {
+        REPO_ROOT / "utils" / "bar_profiler.py",
+        REPO_ROOT / "utils" / "instrumentation.py",
+    }
+    hashed = set()
+    for path in STRATEGY_CODE_PATHS:
+        hashed.update(sorted(path.rglob("*.py")) if path.is_dir() else [path])
+    to_check = list(hashed)
+    checked = set()
+    while to_check:
+        file = to_check.pop()
+        if file in checked:
+            continue
+        checked.add(file)
+        for imported in _get_imported_repo_files(file=file):
+            if imported in not_hashed:
+                continue
+            assert imported in hashed, f"{imported} is imported by {file}"
+            to_check.append(imported)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from utils.bar_profiler import NEXT_TOTAL, BarProfiler
+
+
+@pytest.mark.unit
+def test_bar_profiler_summary_and_histograms() -> None:
+    profiler = BarProfiler()
+    add_one = profiler.wrap(name="add_one", func=lambda value: value + 1)
+
+    def next_bar(value: int) -> int:
+        return add_one(value)
+
+    next_bar = profiler.wrap(name=NEXT_TOTAL, func=next_bar)
+    for i in range(100):
+        assert next_bar(i) == i + 1
+
+    summary = profiler.get_summary().set_index("function")
+    assert summary.loc[NEXT_TOTAL, "calls"] == 100
+    assert summary.loc["add_one", "calls"] == 100
+    assert summary.loc[NEXT_TOTAL, "share_of_next_pct"] == 100
+    assert summary.loc["add_one", "share_of_next_pct"] < 100
+
+    histograms = profiler.get_histograms()
+    counts, bin_edges = histograms["add_one"]
+    assert counts.sum() == 100
+    assert np.array_equal(bin_edges, histograms[NEXT_TOTAL][1])
+
+    profiler.reset()
+    assert profiler.get_summary().empty
+    add_one(1)
+    assert profiler.get_summary().loc[0, "calls"] == 1
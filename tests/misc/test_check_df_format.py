@@ -38,3 +38,28 @@ def test_check_df_format_empty(empty_df: pd.DataFrame) -> None:
     res = check_df_format(df=empty_df)
     assert res["is_datetime_index"] is False
     assert res["inferred_interval_minutes"] == 999
+
+
+def test_check_df_format_gap_after_first_bar(spy_df_5_min: pd.DataFrame) -> None:
+    """
+    A missing second bar must not change the inferred interval,
+    because the function doesn't rely on the first two rows only.
+    """
+    df = spy_df_5_min.drop(spy_df_5_min.index[1])
+    res = check_df_format(df=df)
+    assert res["is_datetime_index"] is True
+    assert res["inferred_interval_minutes"] == 5
+
+
+@pytest.mark.parametrize("unit", ["s", "ms", "us", "ns"])
+def test_check_df_format_index_resolution(
+    spy_df_5_min: pd.DataFrame, unit: str
+) -> None:
+    """
+    pandas 2 indexes may have a resolution other than nanoseconds.
+    """
+    df = spy_df_5_min.copy()
+    df.index = df.index.as_unit(unit)
+    res = check_df_format(df=df)
+    assert res["is_datetime_index"] is True
+    assert res["inferred_interval_minutes"] == 5
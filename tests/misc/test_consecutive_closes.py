@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from constants import FEATURE_COL_NAME_BASIC
+from derivative_columns.consecutive_closes import (
+    HIGHER_CLOSES_STREAK_COL,
+    LOWER_CLOSES_STREAK_COL,
+    add_consecutive_closes_cols,
+    get_streak_lengths,
+)
+from features.f_v1_basic import (
+    add_feature_closed_higher_n_days_in_a_row,
+    add_feature_closed_lower_4_days_in_a_row,
+    add_feature_closed_lower_n_days_in_a_row,
+)
+
+
+@pytest.mark.unit
+def test_get_streak_lengths() -> None:
+    is_true = np.array([True, True, False, True, True, True, False, False])
+    np.testing.assert_array_equal(
+        get_streak_lengths(is_true=is_true), [1, 2, 0, 1, 2, 3, 0, 0]
+    )
+    assert len(get_streak_lengths(is_true=np.array([], dtype=bool))) == 0
+
+
+@pytest.mark.unit
+def test_add_consecutive_closes_cols() -> None:
+    df = pd.DataFrame({"Close": [10.0, 9.0, 8.0, 8.0, 9.0, 10.0, np.nan, 9.0]})
+    res = add_consecutive_closes_cols(df=df)
+    assert res[LOWER_CLOSES_STREAK_COL].tolist() == [0, 1, 2, 0, 0, 0, 0, 0]
+    assert res[HIGHER_CLOSES_STREAK_COL].tolist() == [0, 0, 0, 0, 1, 2, 0, 0]
+    assert LOWER_CLOSES_STREAK_COL not in df.columns
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4, 6])
+@pytest.mark.unit
+def test_closed_n_days_in_a_row_same_as_shift_chain(
+    spy_df_daily: pd.DataFrame, n: int
+) -> None:
+    close = spy_df_daily["Close"]
+    expected_lower = pd.Series(True, index=close.index)
+    expected_higher = pd.Series(True, index=close.index)
+    for i in range(n):
+        expected_lower &= close.shift(i) < close.shift(i + 1)
+        expected_higher &= close.shift(i) > close.shift(i + 1)
+    res_lower = add_feature_closed_lower_n_days_in_a_row(df=spy_df_daily, n=n)
+    res_higher = add_feature_closed_higher_n_days_in_a_row(df=res_lower, n=n)
+    pd.testing.assert_series_equal(
+        res_lower[FEATURE_COL_NAME_BASIC], expected_lower, check_names=False
+    )
+    pd.testing.assert_series_equal(
+        res_higher[FEATURE_COL_NAME_BASIC], expected_higher, check_names=False
+    )
+    with pytest.raises(ValueError, match="must be >= 1"):
+        add_feature_closed_lower_n_days_in_a_row(df=spy_df_daily, n=0)
+
+
+@pytest.mark.unit
+def test_closed_n_days_in_a_row_columns(spy_df_daily: pd.DataFrame) -> None:
+    res = add_feature_closed_lower_4_days_in_a_row(df=spy_df_daily)
+    assert list(res.columns) == list(spy_df_daily.columns) + [FEATURE_COL_NAME_BASIC]
+    # NOTE The existing streak columns are used, not recalculated
+    df_with_streaks = add_consecutive_closes_cols(df=spy_df_daily)
+    df_with_streaks[LOWER_CLOSES_STREAK_COL] = 0
+    df_with_streaks[HIGHER_CLOSES_STREAK_COL] = 5
+    res_lower = add_feature_closed_lower_n_days_in_a_row(df=df_with_streaks, n=1)
+    res_higher = add_feature_closed_higher_n_days_in_a_row(df=df_with_streaks, n=5)
+    assert not res_lower[FEATURE_COL_NAME_BASIC].any()
+    assert res_higher[FEATURE_COL_NAME_BASIC].all()
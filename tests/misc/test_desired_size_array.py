@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from constants import DPS_ARRAY
+from customizable import StrategyParams
+from derivative_columns.atr import add_tr_delta_col_to_ohlc
+from features.f_v1_basic import add_features_v1_basic
+from strategy import ExecutionProfile, run_backtest_for_ticker
+from strategy.execution_profile import get_desired_size_array
+from utils.strategy_exec import reconcile_desired_size
+
+
+def _strategy(shares_count: int, bar_count: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        position=SimpleNamespace(size=shares_count),
+        equity=1000.0,
+        _data=SimpleNamespace(Open=np.full(bar_count, 10.0)),
+        data=np.zeros(bar_count),
+    )
+
+
+@pytest.mark.unit
+def test_reconcile_desired_size() -> None:
+    desired_sizes = np.array([np.nan, 1.0, -0.5, 0.0])
+    res = reconcile_desired_size(
+        strategy=_strategy(shares_count=0, bar_count=1), desired_sizes=desired_sizes
+    )
+    assert res == (None, 0, DPS_ARRAY)
+    res = reconcile_desired_size(
+        strategy=_strategy(shares_count=0, bar_count=2), desired_sizes=desired_sizes
+    )
+    assert res == (1.0, 0, DPS_ARRAY)
+
+    # NOTE 50 shares at 10.0 with equity 1000.0 is 0.5 long
+    strategy = _strategy(shares_count=50, bar_count=2)
+    res = reconcile_desired_size(strategy=strategy, desired_sizes=desired_sizes)
+    assert res == (0.5, 0.5, DPS_ARRAY)
+    res = reconcile_desired_size(
+        strategy=strategy, desired_sizes=desired_sizes, rebalance_same_side=True
+    )
+    assert res == (1.0, 0.5, DPS_ARRAY)
+    strategy = _strategy(shares_count=50, bar_count=3)
+    res = reconcile_desired_size(strategy=strategy, desired_sizes=desired_sizes)
+    assert res == (-0.5, 0.5, DPS_ARRAY)
+    strategy = _strategy(shares_count=50, bar_count=4)
+    res = reconcile_desired_size(strategy=strategy, desired_sizes=desired_sizes)
+    assert res == (0.0, 0.5, DPS_ARRAY)
+
+
+@pytest.mark.unit
+def test_desired_size_array_same_results(spy_df_daily: pd.DataFrame) -> None:
+    data = add_tr_delta_col_to_ohlc(
+        ohlc_df=add_features_v1_basic(
+            df=spy_df_daily.loc["2021-01-01":], atr_multiplier_threshold=3
+        )
+    )
+    params = StrategyParams(max_trade_duration_long=8, profit_target_long_pct=5.5)
+    _, trades, _ = run_backtest_for_ticker(
+        ticker="SPY",
+        data=data,
+        strategy_params=params,
+        execution_profile=ExecutionProfile.BATCH,
+    )
+    params.use_desired_size_array = True
+    _, array_trades, last_day_result = run_backtest_for_ticker(
+        ticker="SPY",
+        data=data,
+        strategy_params=params,
+        execution_profile=ExecutionProfile.BATCH,
+    )
+    assert len(trades) > 0
+    pd.testing.assert_frame_equal(array_trades, trades)
+    assert last_day_result["desired_size_msg"] == DPS_ARRAY
+
+
+@pytest.mark.unit
+def test_desired_size_array_checks(mocker) -> None:
+    data = pd.DataFrame({"Close": [1.0, 2.0, 3.0]})
+    params = StrategyParams()
+    assert get_desired_size_array(data=data, strategy_params=params) is None
+    params.use_desired_size_array = True
+    mocker.patch(
+        "strategy.execution_profile.get_desired_position_size_array",
+        return_value=np.array([np.nan, 1.0]),
+    )
+    with pytest.raises(ValueError, match="expected"):
+        get_desired_size_array(data=data, strategy_params=params)
+    mocker.patch(
+        "strategy.execution_profile.get_desired_position_size_array",
+        return_value=np.array([np.nan, 1.0, 1.5]),
+    )
+    with pytest.raises(ValueError, match=r"\[-1.0; 1.0\]"):
+        get_desired_size_array(data=data, strategy_params=params)
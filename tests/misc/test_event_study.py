@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from constants import FEATURE_COL_NAME_BASIC
+from features.f_v1_basic import add_feature_closed_lower_n_days_in_a_row
+from utils.bootstrap import get_bootstrapped_mean_ci
+from utils.event_study import get_event_paths, get_event_study_summary
+from utils.get_df_with_fwd_ret import add_fwd_ret
+
+
+@pytest.fixture
+def spy_with_feature(spy_df_daily: pd.DataFrame) -> pd.DataFrame:
+    return add_feature_closed_lower_n_days_in_a_row(df=spy_df_daily, n=3)
+
+
+@pytest.mark.unit
+def test_get_event_paths_same_as_fwd_ret(spy_with_feature: pd.DataFrame) -> None:
+    paths = get_event_paths(df=spy_with_feature, bars_after=10, bars_before=3)
+    is_event = spy_with_feature[FEATURE_COL_NAME_BASIC]
+    assert paths.index.equals(spy_with_feature.index[is_event])
+    assert paths.columns.tolist() == list(range(-3, 11))
+    assert (paths[0] == 0).all()
+    for num_days in [1, 5, 10]:
+        expected = add_fwd_ret(ohlc_df=spy_with_feature, num_days=num_days)
+        pd.testing.assert_series_equal(
+            paths[num_days],
+            expected.loc[is_event, f"fwd_ret_{num_days}"],
+            check_names=False,
+        )
+    # the bars outside the data
+    assert paths[10].isna().sum() == is_event.iloc[-10:].sum()
+
+
+@pytest.mark.unit
+def test_get_event_paths_before() -> None:
+    df = pd.DataFrame(
+        {"Close": [100.0, 110.0, 121.0], FEATURE_COL_NAME_BASIC: [True, False, True]}
+    )
+    paths = get_event_paths(df=df, bars_after=1, bars_before=1)
+    np.testing.assert_array_equal(
+        paths.to_numpy(), [[np.nan, 0.0, 10.0], [-9.09, 0.0, np.nan]]
+    )
+    with pytest.raises(ValueError, match="must be >= 0"):
+        get_event_paths(df=df, bars_after=-1)
+
+
+@pytest.mark.unit
+def test_get_event_study_summary(spy_with_feature: pd.DataFrame) -> None:
+    paths = get_event_paths(df=spy_with_feature, bars_after=10)
+    res = get_event_study_summary(paths=paths)
+    assert res.index.tolist() == list(range(0, 11))
+    for num_days in [5, 10]:
+        expected = get_bootstrapped_mean_ci(data=paths[num_days].to_numpy())
+        row = res.loc[num_days]
+        assert row["count"] == expected["count"]
+        assert row["mean_val"] == pytest.approx(expected["mean_val"], abs=1e-3)
+        assert row["positive_pct"] == pytest.approx(expected["positive_pct"], abs=1e-3)
+        assert row["median_val"] == round(paths[num_days].median(), 3)
+        # NOTE The resamples differ from those of get_bootstrapped_mean_ci
+        ci_width = expected["ci_right_0.95"] - expected["ci_left_0.95"]
+        for side in ["ci_left_0.95", "ci_right_0.95"]:
+            assert row[side] == pytest.approx(expected[side], abs=0.2 * ci_width)
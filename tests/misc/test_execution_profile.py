@@ -0,0 +1,106 @@
+import backtesting.backtesting
+import pandas as pd
+import pytest
+
+from customizable import StrategyParams
+from derivative_columns.atr import add_tr_delta_col_to_ohlc
+from features.f_v1_basic import add_features_v1_basic
+from strategy import ExecutionProfile, run_backtest_for_ticker
+from strategy.execution_profile import (
+    get_attention_mask,
+    get_default_execution_profile,
+)
+
+
+@pytest.fixture
+def spy_with_features(spy_df_daily: pd.DataFrame) -> pd.DataFrame:
+    return add_tr_delta_col_to_ohlc(
+        ohlc_df=add_features_v1_basic(
+            df=spy_df_daily.loc["2021-01-01":], atr_multiplier_threshold=3
+        )
+    )
+
+
+@pytest.mark.unit
+def test_default_execution_profile(monkeypatch) -> None:
+    monkeypatch.setenv("environment", "dev")
+    assert get_default_execution_profile() == ExecutionProfile.INTERACTIVE
+    monkeypatch.setenv("environment", "prod")
+    assert get_default_execution_profile() == ExecutionProfile.BATCH
+
+
+@pytest.mark.unit
+def test_optimize_profile_same_results(spy_with_features: pd.DataFrame, mocker) -> None:
+    params = StrategyParams(max_trade_duration_long=8, profit_target_long_pct=5.5)
+    stat, trades, last_day_result = run_backtest_for_ticker(
+        ticker="SPY",
+        data=spy_with_features,
+        strategy_params=params,
+        execution_profile=ExecutionProfile.BATCH,
+    )
+    plot = mocker.patch("strategy.run_backtest_for_ticker.Backtest.plot")
+    compute_stats = backtesting.backtesting.compute_stats
+    light_stat, light_trades, light_last_day_result = run_backtest_for_ticker(
+        ticker="SPY",
+        data=spy_with_features,
+        strategy_params=params,
+        execution_profile=ExecutionProfile.OPTIMIZE,
+    )
+    plot.assert_not_called()
+    assert backtesting.backtesting.compute_stats is compute_stats
+
+    assert stat["# Trades"] > 0
+    assert len(light_stat) < len(stat)
+    for key in ["Start", "End", "# Trades"]:
+        assert light_stat[key] == stat[key]
+    for key in ["SQN", "Equity Final [$]", "Return [%]", "Win Rate [%]"]:
+        assert light_stat[key] == pytest.approx(stat[key])
+    assert light_stat["_equity_curve"] is None
+    pd.testing.assert_frame_equal(light_trades, trades[light_trades.columns])
+    assert light_last_day_result == last_day_result
+
+    light_stat, _, _ = run_backtest_for_ticker(
+        ticker="SPY",
+        data=spy_with_features,
+        strategy_params=params,
+        execution_profile=ExecutionProfile.OPTIMIZE,
+        keep_equity_curve=True,
+    )
+    pd.testing.assert_series_equal(
+        light_stat["_equity_curve"]["Equity"], stat["_equity_curve"]["Equity"]
+    )
+
+
+@pytest.mark.unit
+def test_interactive_profile_plots(spy_with_features: pd.DataFrame, mocker) -> None:
+    plot = mocker.patch("strategy.run_backtest_for_ticker.Backtest.plot")
+    run_backtest_for_ticker(
+        ticker="SPY",
+        data=spy_with_features,
+        strategy_params=StrategyParams(),
+        execution_profile=ExecutionProfile.INTERACTIVE,
+    )
+    plot.assert_called_once_with(filename="res_plot_SPY.html", plot_volume=False)
+
+
+@pytest.mark.unit
+def test_skip_idle_bars_same_results(spy_with_features: pd.DataFrame) -> None:
+    params = StrategyParams(max_trade_duration_long=8, profit_target_long_pct=5.5)
+    stat, trades, last_day_result = run_backtest_for_ticker(
+        ticker="SPY",
+        data=spy_with_features,
+        strategy_params=params,
+        execution_profile=ExecutionProfile.BATCH,
+    )
+    params.skip_idle_bars = True
+    skip_stat, skip_trades, skip_last_day_result = run_backtest_for_ticker(
+        ticker="SPY",
+        data=spy_with_features,
+        strategy_params=params,
+        execution_profile=ExecutionProfile.BATCH,
+    )
+    assert stat["# Trades"] > 0
+    pd.testing.assert_frame_equal(skip_trades, trades)
+    assert skip_stat["Equity Final [$]"] == stat["Equity Final [$]"]
+    assert skip_last_day_result == last_day_result
+    assert get_attention_mask(data=spy_with_features, strategy_params=params)[-1]
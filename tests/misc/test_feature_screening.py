@@ -0,0 +1,104 @@
+import functools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features.f_v1_basic import (
+    add_feature_closed_higher_n_days_in_a_row,
+    add_feature_closed_lower_n_days_in_a_row,
+)
+from utils.bootstrap import get_bootstrapped_mean_ci
+from utils.feature_screening import (
+    get_chunk_size,
+    get_feature_matrix,
+    get_fwd_ret_matrix,
+    screen_features,
+)
+from utils.get_df_with_fwd_ret import add_fwd_ret
+
+FEATURE_FUNCS = {
+    "closed_lower_2x": functools.partial(add_feature_closed_lower_n_days_in_a_row, n=2),
+    "closed_higher_3x": functools.partial(
+        add_feature_closed_higher_n_days_in_a_row, n=3
+    ),
+}
+
+
+@pytest.mark.unit
+def test_get_fwd_ret_matrix_same_as_add_fwd_ret(spy_df_daily: pd.DataFrame) -> None:
+    res = get_fwd_ret_matrix(df=spy_df_daily, horizons=[2, 5])
+    for num_days in [2, 5]:
+        pd.testing.assert_series_equal(
+            res[f"fwd_ret_{num_days}"],
+            add_fwd_ret(ohlc_df=spy_df_daily, num_days=num_days)[f"fwd_ret_{num_days}"],
+        )
+
+
+@pytest.mark.unit
+def test_screen_features_same_as_get_bootstrapped_mean_ci(
+    spy_df_daily: pd.DataFrame,
+) -> None:
+    features = get_feature_matrix(df=spy_df_daily, feature_funcs=FEATURE_FUNCS)
+    fwd_returns = get_fwd_ret_matrix(df=spy_df_daily, horizons=[2, 5, 10])
+    res = screen_features(features=features, fwd_returns=fwd_returns)
+    assert len(res) == 6
+    assert res["rank"].tolist() == list(range(1, 7))
+    assert res["diff_z"].abs().is_monotonic_decreasing
+    for _, row in res.iterrows():
+        for value, suffix in ((True, "true"), (False, "false")):
+            expected = get_bootstrapped_mean_ci(
+                data=fwd_returns.loc[
+                    features[row["feature"]] == value, row["fwd_ret_col"]
+                ].values
+            )
+            assert row[f"count_{suffix}"] == expected["count"]
+            assert row[f"mean_val_{suffix}"] == expected["mean_val"]
+            assert row[f"positive_pct_{suffix}"] == expected["positive_pct"]
+            # NOTE The Poisson bootstrap gives close but not the same intervals
+            ci_width = expected["ci_right_0.95"] - expected["ci_left_0.95"]
+            for side in ["ci_left_0.95", "ci_right_0.95"]:
+                assert row[f"{side}_{suffix}"] == pytest.approx(
+                    expected[side], abs=0.2 * ci_width
+                )
+        assert row["ci_left_0.95_diff"] < row["mean_diff"] < row["ci_right_0.95_diff"]
+
+
+@pytest.mark.unit
+def test_screen_features_chunk_size(spy_df_daily: pd.DataFrame) -> None:
+    features = get_feature_matrix(df=spy_df_daily, feature_funcs=FEATURE_FUNCS)
+    fwd_returns = get_fwd_ret_matrix(df=spy_df_daily, horizons=[2, 5])
+    res = screen_features(features=features, fwd_returns=fwd_returns, n_resamples=30)
+    for chunk_size in [1, 7, 100]:
+        pd.testing.assert_frame_equal(
+            screen_features(
+                features=features,
+                fwd_returns=fwd_returns,
+                n_resamples=30,
+                chunk_size=chunk_size,
+            ),
+            res,
+        )
+    assert get_chunk_size(row_count=150_000, horizon_count=15) == 7
+    assert get_chunk_size(row_count=10**9, horizon_count=15) == 1
+
+
+@pytest.mark.unit
+def test_screen_features_small_groups() -> None:
+    index = pd.date_range("2024-01-01", periods=8)
+    features = pd.DataFrame(
+        {"rare": [True, False, False, False, False, False, False, np.nan]},
+        index=index,
+    )
+    fwd_returns = pd.DataFrame(
+        {"fwd_ret_1": [1.0, -1.0, 2.0, 0.5, -0.5, 1.5, np.nan, 3.0]}, index=index
+    )
+    res = screen_features(features=features, fwd_returns=fwd_returns, n_resamples=20)
+    row = res.iloc[0]
+    assert row["count_true"] == 1
+    assert np.isnan(row["mean_val_true"])
+    assert np.isnan(row["diff_z"])
+    assert row["count_false"] == 5
+    assert row["mean_val_false"] == 0.5
+    with pytest.raises(ValueError, match="index differ"):
+        screen_features(features=features, fwd_returns=fwd_returns.iloc[1:])
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.filter_df import (
+    FilterParams,
+    RemainingPart,
+    filter_df_by_date,
+    slice_df_by_dates,
+)
+
+
+@pytest.mark.unit
+def test_filter_df_by_date(spy_df_daily: pd.DataFrame) -> None:
+    threshold = "2020-03-16"
+    after = filter_df_by_date(
+        df=spy_df_daily,
+        filter_params=FilterParams(date_threshold=threshold),
+    )
+    before = filter_df_by_date(
+        df=spy_df_daily,
+        filter_params=FilterParams(
+            date_threshold=threshold, remaining_part=RemainingPart.BEFORE
+        ),
+    )
+    pd.testing.assert_frame_equal(after, spy_df_daily[spy_df_daily.index >= threshold])
+    pd.testing.assert_frame_equal(before, spy_df_daily[spy_df_daily.index < threshold])
+
+    between = filter_df_by_date(
+        df=spy_df_daily,
+        filter_params=FilterParams(
+            date_threshold="2020-01-01",
+            date_threshold_end="2021-01-01",
+            remaining_part=RemainingPart.BETWEEN,
+        ),
+    )
+    assert between.index.min() >= pd.Timestamp("2020-01-01")
+    assert between.index.max() < pd.Timestamp("2021-01-01")
+    assert len(between) > 200
+
+    with pytest.raises(ValueError):
+        filter_df_by_date(
+            df=spy_df_daily,
+            filter_params=FilterParams(
+                date_threshold="2020-01-01", remaining_part=RemainingPart.BETWEEN
+            ),
+        )
+
+
+@pytest.mark.unit
+def test_slice_df_by_dates_is_view(spy_df_daily: pd.DataFrame) -> None:
+    res = slice_df_by_dates(df=spy_df_daily, start="2020-01-01", end="2021-01-01")
+    assert np.shares_memory(
+        res["Close"].to_numpy(), spy_df_daily["Close"].to_numpy()
+    )
+
+
+@pytest.mark.unit
+def test_slice_df_by_dates_unsorted(spy_df_daily: pd.DataFrame) -> None:
+    shuffled = spy_df_daily.sample(frac=1, random_state=1)
+    res = slice_df_by_dates(df=shuffled, start="2020-01-01", end="2021-01-01")
+    expected = slice_df_by_dates(df=spy_df_daily, start="2020-01-01", end="2021-01-01")
+    pd.testing.assert_frame_equal(res.sort_index(), expected)
@@ -0,0 +1,69 @@
+from typing import Iterator
+
+import pytest
+
+from utils.instrumentation import (
+    disable_instrumentation,
+    enable_instrumentation,
+    get_instrumentation_summary,
+    get_span_records,
+    instrumented,
+    reset_instrumentation,
+    span,
+)
+
+
+@pytest.fixture
+def instrumentation_on() -> Iterator[None]:
+    reset_instrumentation()
+    enable_instrumentation(trace_memory=True)
+    yield
+    disable_instrumentation()
+    reset_instrumentation()
+
+
+@pytest.mark.unit
+def test_span_does_nothing_when_disabled() -> None:
+    reset_instrumentation()
+    with span(stage="some_stage", ticker="SPY"):
+        pass
+    assert get_span_records().empty
+
+
+@pytest.mark.unit
+def test_nested_spans_memory(instrumentation_on: None) -> None:
+    with span(stage="outer", ticker="SPY"):
+        with span(stage="inner", ticker="SPY"):
+            big_list = list(range(200_000))
+        del big_list
+        with span(stage="small", ticker="SPY"):
+            small_list = list(range(10))
+        del small_list
+
+    records = get_span_records().set_index("stage")
+    assert list(records.index) == ["inner", "small", "outer"]
+    assert records.loc["inner", "peak_memory_mb"] > 1
+    assert records.loc["small", "peak_memory_mb"] < 0.1
+
+    # The peak of the inner span is also the peak of the outer one
+    assert records.loc["outer", "peak_memory_mb"] >= records.loc["inner", "peak_memory_mb"]
+    assert (records["wall_seconds"] >= 0).all()
+
+
+@pytest.mark.unit
+def test_instrumented_decorator_and_summary(instrumentation_on: None) -> None:
+    @instrumented(stage="add_one")
+    def add_one(value: int, ticker: str) -> int:
+        return value + 1
+
+    assert add_one(1, ticker="SPY") == 2
+    assert add_one(2, ticker="QQQ") == 3
+    assert add_one(3, ticker="QQQ") == 4
+
+    summary = get_instrumentation_summary()
+    assert summary.loc[0, "stage"] == "add_one"
+    assert summary.loc[0, "calls"] == 3
+
+    by_ticker = get_instrumentation_summary(by_ticker=True).set_index("ticker")
+    assert by_ticker.loc["QQQ", "calls"] == 2
+    assert by_ticker.loc["SPY", "calls"] == 1
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from customizable import StrategyParams
+from derivative_columns.atr import add_tr_delta_col_to_ohlc
+from derivative_columns.initial_balance import (
+    add_col_ib_high_low,
+    check_initial_balance_breach,
+    get_day_codes,
+)
+from derivative_columns.min_max import add_is_min_max_dates_values
+from features.f_v1_basic import add_features_v1_basic
+from strategy import ExecutionProfile, run_backtest_for_ticker
+from utils.kernels import (
+    KERNELS,
+    KernelBackend,
+    first_breach_per_day_vectorized,
+    get_default_kernel_backend,
+    get_kernel,
+)
+from utils.strategy_exec.trade_tags import TradeTag
+from utils.trade_exits import simulate_trade_exits
+
+STRATEGY_PARAMS = StrategyParams(max_trade_duration_long=8, profit_target_long_pct=5.5)
+
+
+@pytest.fixture
+def spy_with_features(spy_df_daily: pd.DataFrame) -> pd.DataFrame:
+    return add_tr_delta_col_to_ohlc(
+        ohlc_df=add_features_v1_basic(
+            df=spy_df_daily.loc["2015-01-01":], atr_multiplier_threshold=3
+        )
+    )
+
+
+@pytest.mark.unit
+def test_get_kernel(monkeypatch) -> None:
+    assert set(KERNELS) == {
+        "swing_extrema",
+        "first_breach_per_day",
+        "trailing_stop_exits",
+    }
+    assert get_kernel("swing_extrema", backend=KernelBackend.PYTHON) is KERNELS[
+        "swing_extrema"
+    ]
+    monkeypatch.setenv("kernel_backend", "python")
+    assert get_default_kernel_backend() == KernelBackend.PYTHON
+    with pytest.raises(ValueError, match="unknown kernel"):
+        get_kernel("no_such_kernel")
+    # NOTE The vectorized version is faster than the loop in pure Python
+    assert (
+        get_kernel("first_breach_per_day", backend=KernelBackend.PYTHON)
+        is first_breach_per_day_vectorized
+    )
+
+
+@pytest.mark.unit
+def test_first_breach_per_day_vectorized_same_as_loop(
+    spy_df_5_min: pd.DataFrame,
+) -> None:
+    df = add_col_ib_high_low(df=spy_df_5_min)
+    day_codes = get_day_codes(index=df.index)
+    args = (
+        day_codes,
+        df["Close"].to_numpy(dtype=float),
+        df["ib_low"].to_numpy(dtype=float),
+        df["ib_high"].to_numpy(dtype=float),
+        df.groupby(day_codes).cumcount().to_numpy() >= 6,
+    )
+    expected = KERNELS["first_breach_per_day"](*args)
+    res = first_breach_per_day_vectorized(*args)
+    for res_col, expected_col in zip(res, expected):
+        assert expected_col.any()
+        np.testing.assert_array_equal(res_col, expected_col)
+
+
+@pytest.mark.unit
+def test_swing_extrema_kernel() -> None:
+    values = np.array([10.0, 12.0, 15.0, 11.0, 9.0, 13.0, 14.0])
+    is_min, is_max = get_kernel("swing_extrema", backend=KernelBackend.PYTHON)(
+        values, np.full(len(values), 3.0), 0, True
+    )
+    np.testing.assert_array_equal(np.flatnonzero(is_max), [2])
+    np.testing.assert_array_equal(np.flatnonzero(is_min), [4])
+
+
+@pytest.mark.unit
+def test_trade_exits_same_as_backtest(spy_with_features: pd.DataFrame) -> None:
+    _, trades, _ = run_backtest_for_ticker(
+        ticker="SPY",
+        data=spy_with_features,
+        strategy_params=STRATEGY_PARAMS,
+        execution_profile=ExecutionProfile.BATCH,
+    )
+    res = simulate_trade_exits(
+        df=spy_with_features,
+        entry_bars=trades["EntryBar"].to_numpy(),
+        is_long=(trades["Size"] > 0).to_numpy(),
+        strategy_params=STRATEGY_PARAMS,
+    )
+    # NOTE simulate_trade_exits doesn't process the special situations
+    # except the max duration
+    special = int(TradeTag.PARTIALLY_CLOSED | TradeTag.CLOSED_VOLATILITY_SPIKE)
+    is_comparable = (trades["Tag"].fillna(0).astype(int) & special == 0).to_numpy()
+    assert is_comparable.sum() > 30
+    np.testing.assert_array_equal(
+        res["ExitBar"].to_numpy()[is_comparable],
+        trades["ExitBar"].to_numpy()[is_comparable],
+    )
+    np.testing.assert_allclose(
+        res["ExitPrice"].to_numpy()[is_comparable],
+        trades["ExitPrice"].to_numpy()[is_comparable],
+    )
+
+
+@pytest.mark.unit
+def test_numba_kernels_same_as_python(
+    spy_with_features: pd.DataFrame, spy_df_5_min: pd.DataFrame, monkeypatch
+) -> None:
+    pytest.importorskip("numba")
+    results = dict()
+    for backend in KernelBackend:
+        monkeypatch.setenv("kernel_backend", backend.value)
+        min_max = add_is_min_max_dates_values(df=spy_with_features)
+        ib = check_initial_balance_breach(df=add_col_ib_high_low(df=spy_df_5_min))
+        exits = simulate_trade_exits(
+            df=spy_with_features,
+            entry_bars=np.flatnonzero(spy_with_features["feature_advanced"]),
+            is_long=np.ones(spy_with_features["feature_advanced"].sum(), dtype=bool),
+            strategy_params=STRATEGY_PARAMS,
+        )
+        results[backend] = (min_max, ib, exits)
+    for python_res, numba_res in zip(
+        results[KernelBackend.PYTHON], results[KernelBackend.NUMBA]
+    ):
+        pd.testing.assert_frame_equal(numba_res, python_res)
@@ -0,0 +1,135 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils.results_writer import (
+    ResultsFormat,
+    ResultsWriter,
+    read_results,
+    render_results_to_excel,
+    write_results,
+)
+
+
+def _get_parts() -> list:
+    index = pd.date_range("2024-01-01", periods=6, freq="D", name="Datetime")
+    df = pd.DataFrame(
+        {
+            "Close": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+            "Count": [1, 2, 3, 4, 5, 6],
+            "Ticker": ["A", "A", "A", "B", "B", "B"],
+        },
+        index=index,
+    )
+    return [df.iloc[:3], df.iloc[3:]]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("results_format", list(ResultsFormat))
+def test_results_writer_round_trip(tmp_path, results_format: ResultsFormat) -> None:
+    parts = _get_parts()
+    expected = pd.concat(parts)
+    file_path = str(tmp_path / f"res.{results_format.value}")
+    with ResultsWriter(file_path=file_path) as writer:
+        for part in parts:
+            writer.append(df=part)
+    assert writer.rows_written == len(expected)
+
+    res = read_results(file_path=file_path)
+    if results_format in [ResultsFormat.CSV, ResultsFormat.EXCEL]:
+        res.index = pd.to_datetime(res.index)
+    # NOTE Excel doesn't keep the float type of whole numbers
+    pd.testing.assert_frame_equal(
+        res,
+        expected,
+        check_freq=False,
+        check_dtype=results_format != ResultsFormat.EXCEL,
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "results_format", [ResultsFormat.PARQUET, ResultsFormat.FEATHER, ResultsFormat.CSV]
+)
+def test_results_writer_without_index(tmp_path, results_format: ResultsFormat) -> None:
+    parts = _get_parts()
+    file_path = str(tmp_path / f"res.{results_format.value}")
+    with ResultsWriter(file_path=file_path, write_index=False) as writer:
+        for part in parts:
+            # NOTE the second part has int Close, it is cast to the first schema
+            writer.append(df=part.astype({"Close": int}) if writer.rows_written else part)
+    res = read_results(file_path=file_path, write_index=False)
+    expected = pd.concat(parts).reset_index(drop=True)
+    pd.testing.assert_frame_equal(res, expected)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "results_format", [ResultsFormat.PARQUET, ResultsFormat.FEATHER, ResultsFormat.CSV]
+)
+def test_results_writer_leading_empty_df(
+    tmp_path, results_format: ResultsFormat
+) -> None:
+    parts = _get_parts()
+    expected = pd.concat(parts)
+    # NOTE Like the trades of a ticker without trades
+    empty = pd.DataFrame(columns=expected.columns, dtype=object)
+    file_path = str(tmp_path / f"res.{results_format.value}")
+    with ResultsWriter(file_path=file_path, write_index=False) as writer:
+        for part in [empty, parts[0], empty, parts[1]]:
+            writer.append(df=part.reset_index(drop=True))
+    res = read_results(file_path=file_path, write_index=False)
+    pd.testing.assert_frame_equal(res, expected.reset_index(drop=True))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "results_format", [ResultsFormat.PARQUET, ResultsFormat.FEATHER, ResultsFormat.CSV]
+)
+def test_results_writer_only_empty_dfs(tmp_path, results_format: ResultsFormat) -> None:
+    empty = pd.DataFrame({"a": pd.Series(dtype=float), "b": pd.Series(dtype=str)})
+    file_path = str(tmp_path / f"res.{results_format.value}")
+    with ResultsWriter(file_path=file_path, write_index=False) as writer:
+        writer.append(df=empty)
+        writer.append(df=empty)
+    res = read_results(file_path=file_path, write_index=False)
+    assert res.empty
+    assert res.columns.tolist() == ["a", "b"]
+
+
+@pytest.mark.unit
+def test_results_writer_render_excel(tmp_path) -> None:
+    file_path = str(tmp_path / "res.parquet")
+    with ResultsWriter(file_path=file_path, write_index=False, render_excel=True) as w:
+        for part in _get_parts():
+            w.append(df=part)
+    excel_file_path = str(tmp_path / "res.xlsx")
+    assert os.path.exists(excel_file_path)
+    pd.testing.assert_frame_equal(
+        pd.read_excel(excel_file_path),
+        read_results(file_path=file_path, write_index=False),
+        check_dtype=False,
+    )
+
+    other_path = render_results_to_excel(
+        file_path=file_path,
+        write_index=False,
+        excel_file_path=str(tmp_path / "other.xlsx"),
+    )
+    assert os.path.exists(other_path)
+
+
+@pytest.mark.unit
+def test_write_results_overwrites(tmp_path) -> None:
+    file_path = str(tmp_path / "res.csv")
+    parts = _get_parts()
+    write_results(df=parts[0], file_path=file_path)
+    write_results(df=parts[1], file_path=file_path)
+    assert len(read_results(file_path=file_path)) == len(parts[1])
+
+
+@pytest.mark.unit
+def test_results_writer_bad_extension(tmp_path) -> None:
+    with pytest.raises(ValueError, match="unsupported extension"):
+        ResultsWriter(file_path=str(tmp_path / "res.txt"))
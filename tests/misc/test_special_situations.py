@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from constants import SS_NO_TODAY
+from customizable import StrategyParams
+from utils.strategy_exec.special_situations import (
+    SpecialSituation,
+    get_special_situation_masks,
+    process_special_situations,
+    volatility_spike_precondition,
+)
+
+
+@pytest.mark.unit
+def test_special_situation_preconditions() -> None:
+    data = pd.DataFrame({"tr_delta": [1.0, np.nan, 2.5, 3.0]})
+    np.testing.assert_array_equal(
+        volatility_spike_precondition(data=data, strategy_params=StrategyParams()),
+        [False, True, True, True],
+    )
+
+
+@pytest.mark.unit
+def test_process_special_situations_masks() -> None:
+    calls = list()
+
+    def first(strategy) -> bool:
+        calls.append("first")
+        return True
+
+    def second(strategy) -> bool:
+        calls.append("second")
+        return True
+
+    handlers = [
+        SpecialSituation(
+            handler=first,
+            msg="first",
+            precondition=lambda data, params: data["flag"].to_numpy(),
+        ),
+        SpecialSituation(handler=second, msg="second"),
+    ]
+    data = pd.DataFrame({"flag": [True, False]})
+    masks = get_special_situation_masks(
+        data=data, strategy_params=StrategyParams(), handlers=handlers
+    )
+    assert masks[1] is None
+    # NOTE the length of strategy.data is the number of bars seen so far
+    strategy = SimpleNamespace(data=np.zeros(1), trades=list())
+    res = process_special_situations(strategy=strategy, handlers=handlers, masks=masks)
+    assert res == (True, "first")
+    strategy.data = np.zeros(2)
+    res = process_special_situations(strategy=strategy, handlers=handlers, masks=masks)
+    assert res == (True, "second")
+    assert calls == ["first", "second"]
+
+    handlers[1] = SpecialSituation(handler=lambda strategy: False, msg="never")
+    res = process_special_situations(strategy=strategy, handlers=handlers, masks=masks)
+    assert res == (False, SS_NO_TODAY)
+
+
+@pytest.mark.unit
+def test_special_situation_masks_bad_shape() -> None:
+    handlers = [
+        SpecialSituation(
+            handler=lambda strategy: False,
+            msg="bad",
+            precondition=lambda data, params: np.ones(1),
+        )
+    ]
+    with pytest.raises(ValueError, match="get_special_situation_masks"):
+        get_special_situation_masks(
+            data=pd.DataFrame({"a": [1, 2]}),
+            strategy_params=StrategyParams(),
+            handlers=handlers,
+        )
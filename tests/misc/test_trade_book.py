@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from utils.strategy_exec.trade_book import get_trade_book
+
+
+def _trade(size: int, entry_time: str, sl=None, tp=None) -> SimpleNamespace:
+    return SimpleNamespace(
+        size=size,
+        is_long=size > 0,
+        entry_time=pd.Timestamp(entry_time),
+        sl=sl,
+        tp=tp,
+    )
+
+
+def _strategy(trades: list) -> SimpleNamespace:
+    broker = SimpleNamespace(trades=trades, closed_trades=list())
+    return SimpleNamespace(_broker=broker)
+
+
+@pytest.mark.unit
+def test_trade_book_aggregates() -> None:
+    trades = [
+        _trade(size=10, entry_time="2024-01-05", sl=90.0, tp=120.0),
+        _trade(size=30, entry_time="2024-01-02", sl=94.0),
+    ]
+    strategy = _strategy(trades=trades)
+    book = get_trade_book(strategy=strategy)
+    assert get_trade_book(strategy=strategy) is book
+    assert book.position_size == 40
+    assert book.earliest_entry_time == pd.Timestamp("2024-01-02")
+    assert book.avg_sl == pytest.approx(0.25 * 90 + 0.75 * 94)
+    assert book.min_tp_long == 120.0
+    assert book.long_trades_without_tp == (trades[1],)
+    assert book.short_trades == tuple()
+
+    # SL and TP changes are picked up only after the refresh
+    trades[1].sl = None
+    trades[1].tp = 110.0
+    assert book.avg_sl is not None
+    book.refresh_stops()
+    book.refresh_targets()
+    assert book.avg_sl is None
+    assert book.min_tp_long == 110.0
+    assert book.long_trades_without_tp == tuple()
+
+
+@pytest.mark.unit
+def test_trade_book_syncs_on_fills() -> None:
+    first = _trade(size=-5, entry_time="2024-01-02", sl=105.0, tp=90.0)
+    strategy = _strategy(trades=[first])
+    book = get_trade_book(strategy=strategy)
+    assert book.max_tp_short == 90.0
+    assert book.long_trades == tuple()
+
+    # a new trade
+    second = _trade(size=-5, entry_time="2024-01-03", sl=103.0)
+    strategy._broker.trades.append(second)
+    book = get_trade_book(strategy=strategy)
+    assert book.trades == (first, second)
+    assert book.avg_sl == pytest.approx(104.0)
+
+    # the first trade closed and another one opened on the same bar,
+    # the number of open trades is the same
+    strategy._broker.trades.remove(first)
+    strategy._broker.closed_trades.append(first)
+    third = _trade(size=-5, entry_time="2024-01-04", sl=101.0)
+    strategy._broker.trades.append(third)
+    book = get_trade_book(strategy=strategy)
+    assert book.trades == (second, third)
+    assert book.earliest_entry_time == pd.Timestamp("2024-01-03")
+    assert book.max_tp_short is None
+    assert book.short_trades_without_tp == (second, third)
+
+    strategy._broker.trades.clear()
+    strategy._broker.closed_trades.extend([second, third])
+    book = get_trade_book(strategy=strategy)
+    assert book.earliest_entry_time is None
+    assert book.avg_sl is None
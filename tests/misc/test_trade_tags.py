@@ -0,0 +1,32 @@
+import pytest
+from backtesting.backtesting import Trade
+
+from constants import CLOSED_VOLATILITY_SPIKE, SL_TIGHTENED
+from utils.strategy_exec.trade_tags import (
+    TradeTag,
+    add_trade_tag,
+    has_trade_tag,
+    trade_tag_to_text,
+)
+
+
+@pytest.mark.unit
+def test_add_and_check_trade_tags() -> None:
+    trade = Trade(broker=None, size=10, entry_price=100.0, entry_bar=0, tag=None)
+    assert not has_trade_tag(trade=trade, tag=TradeTag.SL_TIGHTENED)
+
+    add_trade_tag(trade=trade, tag=TradeTag.CLOSED_VOLATILITY_SPIKE)
+    add_trade_tag(trade=trade, tag=TradeTag.SL_TIGHTENED)
+    add_trade_tag(trade=trade, tag=TradeTag.SL_TIGHTENED)
+
+    assert isinstance(trade.tag, int)
+    assert trade.tag == TradeTag.SL_TIGHTENED | TradeTag.CLOSED_VOLATILITY_SPIKE
+    assert has_trade_tag(trade=trade, tag=TradeTag.SL_TIGHTENED)
+    assert not has_trade_tag(trade=trade, tag=TradeTag.PARTIALLY_CLOSED)
+    assert trade_tag_to_text(trade.tag) == SL_TIGHTENED + CLOSED_VOLATILITY_SPIKE
+
+
+@pytest.mark.unit
+def test_trade_tag_to_text_empty() -> None:
+    assert trade_tag_to_text(None) == ""
+    assert trade_tag_to_text(0) == ""
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_series_equal
+
+from derivative_columns.atr import add_atr_col_to_df
+from derivative_columns.ma import add_moving_average
+from derivative_columns.multi_period import (
+    add_atr_columns,
+    add_moving_averages,
+    add_rsi_columns,
+)
+from derivative_columns.rsi import add_rsi_column
+
+
+@pytest.mark.parametrize("ma_type", ["simple", "exponential"])
+@pytest.mark.unit
+def test_add_rsi_columns_same_as_add_rsi_column(
+    spy_df_daily: pd.DataFrame, ma_type: str
+) -> None:
+    """Test that the batch RSI equals add_rsi_column for every period."""
+    periods = [2, 5, 14, 30]
+    res = add_rsi_columns(
+        df=spy_df_daily, col_name="Close", periods=periods, ma_type=ma_type
+    )
+    for period in periods:
+        expected = add_rsi_column(
+            df=spy_df_daily, col_name="Close", ma_type=ma_type, period=period
+        )
+        assert_series_equal(
+            res[f"RSI_{period}"], expected[f"RSI_{period}"], atol=1e-8
+        )
+
+
+@pytest.mark.unit
+def test_add_rsi_columns_bad_period(spy_df_daily: pd.DataFrame) -> None:
+    """Test validation of the periods."""
+    with pytest.raises(ValueError, match="period=1, must be >= 2"):
+        add_rsi_columns(df=spy_df_daily, col_name="Close", periods=[14, 1])
+
+
+@pytest.mark.parametrize("exponential", [False, True])
+@pytest.mark.unit
+def test_add_atr_columns_same_as_add_atr_col_to_df(
+    spy_df_daily: pd.DataFrame, exponential: bool
+) -> None:
+    """Test that the batch ATR equals add_atr_col_to_df for every period."""
+    periods = [3, 14, 50]
+    res = add_atr_columns(df=spy_df_daily, periods=periods, exponential=exponential)
+    for period in periods:
+        expected = add_atr_col_to_df(df=spy_df_daily, n=period, exponential=exponential)
+        assert_series_equal(res["tr"], expected["tr"])
+        assert_series_equal(res[f"atr_{period}"], expected[f"atr_{period}"])
+
+
+@pytest.mark.unit
+def test_add_moving_averages_same_as_add_moving_average(
+    spy_df_daily: pd.DataFrame,
+) -> None:
+    """Test that the batch moving averages equal add_moving_average."""
+    periods = [10, 50, 200]
+    res = add_moving_averages(df=spy_df_daily, periods=periods)
+    for period in periods:
+        expected = add_moving_average(df=spy_df_daily, n=period)
+        assert_series_equal(res[f"ma_{period}"], expected[f"ma_{period}"])
@@ -0,0 +1,96 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from customizable import StrategyParams
+from derivative_columns.atr import add_tr_delta_col_to_ohlc
+from features.f_v1_basic import add_features_v1_basic
+from optimization.branching_simulator import (
+    run_branching_grid_search,
+    simulate_param_sets,
+)
+from optimization.search import GridSearch, ParamRange, run_search
+from optimization.walk_forward import get_sqn_modified_mean
+from strategy import ExecutionProfile, run_backtest_for_ticker
+
+
+@pytest.fixture
+def spy_with_features(spy_df_daily: pd.DataFrame) -> pd.DataFrame:
+    return add_tr_delta_col_to_ohlc(
+        ohlc_df=add_features_v1_basic(
+            df=spy_df_daily.loc["2019-01-01":], atr_multiplier_threshold=3
+        )
+    )
+
+
+@pytest.mark.unit
+def test_simulate_param_sets_same_as_backtests(spy_with_features: pd.DataFrame) -> None:
+    params_list = [
+        StrategyParams(
+            max_trade_duration_long=duration,
+            profit_target_long_pct=profit_target,
+            stop_loss_default_atr_multiplier=n_atr,
+        )
+        for duration, profit_target, n_atr in itertools.product(
+            [5, 8, 20], [3.0, 5.5], [2.0, 3.0]
+        )
+    ]
+    res = simulate_param_sets(data=spy_with_features, params_list=params_list)
+    assert res.step_count < len(params_list) * (len(spy_with_features) - 1)
+    assert res.max_branch_count > 1
+    for params, stat in zip(params_list, res.stats):
+        ref, _, _ = run_backtest_for_ticker(
+            ticker="SPY",
+            data=spy_with_features,
+            strategy_params=params,
+            execution_profile=ExecutionProfile.OPTIMIZE,
+            keep_equity_curve=True,
+        )
+        assert stat["# Trades"] == ref["# Trades"] > 0
+        assert stat["SQN"] == pytest.approx(ref["SQN"])
+        np.testing.assert_allclose(
+            stat["_equity_curve"]["Equity"], ref["_equity_curve"]["Equity"]
+        )
+        cols = ["Size", "EntryTime", "ExitTime", "EntryPrice", "ExitPrice"]
+        pd.testing.assert_frame_equal(
+            stat["_trades"][cols], ref["_trades"][cols], check_dtype=False
+        )
+
+
+@pytest.mark.unit
+def test_run_branching_grid_search(spy_with_features: pd.DataFrame) -> None:
+    tickers_data = {"SPY": spy_with_features, "SPY_2": spy_with_features.iloc[200:]}
+    param_ranges = [
+        ParamRange(name="max_trade_duration_long", low=5, high=15, step=5),
+        ParamRange(name="profit_target_long_pct", low=3.0, high=6.0, step=3.0),
+    ]
+    res = run_branching_grid_search(tickers_data=tickers_data, param_ranges=param_ranges)
+
+    def evaluate(params: dict) -> float:
+        return get_sqn_modified_mean(
+            tickers_data=tickers_data,
+            strategy_params=StrategyParams(**params),
+            start=spy_with_features.index[0],
+            end=spy_with_features.index[-1] + pd.Timedelta(days=1),
+        )
+
+    expected = run_search(
+        search_strategy=GridSearch(param_ranges=param_ranges),
+        evaluate_func=evaluate,
+        n_trials=100,
+    )
+    pd.testing.assert_frame_equal(res, expected, check_exact=False)
+
+
+@pytest.mark.unit
+def test_simulate_param_sets_bad_params(spy_with_features: pd.DataFrame) -> None:
+    params_list = [StrategyParams(), StrategyParams(skip_idle_bars=True)]
+    with pytest.raises(ValueError, match="same fields"):
+        simulate_param_sets(data=spy_with_features, params_list=params_list)
+    with pytest.raises(ValueError, match="BRANCHING_FIELDS"):
+        run_branching_grid_search(
+            tickers_data={"SPY": spy_with_features},
+            param_ranges=[ParamRange(name="param_1", low=1, high=2, step=1)],
+        )
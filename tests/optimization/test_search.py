@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from optimization.search import (
+    GridSearch,
+    ParamRange,
+    RandomSearch,
+    TPESearch,
+    get_param_ranges_from_strategy_params,
+    run_search,
+)
+
+
+def _objective(params: dict) -> float:
+    """
+    Smooth function with the maximum 0 at x=12, y=6.5
+    """
+    return -(((params["x"] - 12) / 27) ** 2) - ((params["y"] - 6.5) / 19) ** 2
+
+
+PARAM_RANGES = [
+    ParamRange(name="x", low=3, high=30, step=1),
+    ParamRange(name="y", low=1.0, high=20.0, step=0.5),
+]
+
+
+@pytest.mark.unit
+def test_param_range_values() -> None:
+    assert ParamRange(name="a", low=2, high=10, step=4).get_values().tolist() == [2, 6, 10]
+    float_range = ParamRange(name="b", low=1.0, high=2.0, step=0.25)
+    assert float_range.get_values().tolist() == [1.0, 1.25, 1.5, 1.75, 2.0]
+    assert float_range.snap(np.array([0.0, 1.3, 5.0])).tolist() == [1.0, 1.25, 2.0]
+    with pytest.raises(ValueError):
+        ParamRange(name="c", low=2, high=1, step=1)
+
+
+@pytest.mark.unit
+def test_get_param_ranges_from_strategy_params() -> None:
+    ranges = get_param_ranges_from_strategy_params(
+        names=["profit_target_long_pct", "max_trade_duration_long"]
+    )
+    assert [r.name for r in ranges] == [
+        "profit_target_long_pct",
+        "max_trade_duration_long",
+    ]
+    assert ranges[1].is_int
+    with pytest.raises(ValueError):
+        get_param_ranges_from_strategy_params(names=["save_all_trades_in_xlsx"])
+
+
+@pytest.mark.unit
+def test_grid_search_evaluates_all_combinations() -> None:
+    ranges = [
+        ParamRange(name="a", low=1, high=3, step=1),
+        ParamRange(name="b", low=0.5, high=1.5, step=0.5),
+    ]
+    res = run_search(
+        search_strategy=GridSearch(param_ranges=ranges),
+        evaluate_func=lambda p: p["a"] * p["b"],
+        n_trials=100,
+    )
+    assert len(res) == 9
+    assert res["score"].max() == 4.5
+
+
+@pytest.mark.unit
+def test_random_search_respects_ranges() -> None:
+    res = run_search(
+        search_strategy=RandomSearch(param_ranges=PARAM_RANGES, seed=3),
+        evaluate_func=_objective,
+        n_trials=20,
+    )
+    assert len(res) == 20
+    assert res["x"].between(3, 30).all()
+    assert (res["x"] == res["x"].round()).all()
+    assert ((res["y"] * 2) == (res["y"] * 2).round()).all()
+    assert not res.duplicated(subset=["x", "y"]).any()
+
+
+@pytest.mark.unit
+def test_tpe_beats_random_search() -> None:
+    tpe_best = list()
+    random_best = list()
+    for seed in range(3):
+        tpe_best.append(
+            run_search(
+                search_strategy=TPESearch(param_ranges=PARAM_RANGES, seed=seed),
+                evaluate_func=_objective,
+                n_trials=40,
+            )["score"].max()
+        )
+        random_best.append(
+            run_search(
+                search_strategy=RandomSearch(param_ranges=PARAM_RANGES, seed=seed),
+                evaluate_func=_objective,
+                n_trials=40,
+            )["score"].max()
+        )
+
+    # 40 trials of 28 * 39 = 1092 grid points
+    assert np.mean(tpe_best) > np.mean(random_best)
+    assert np.mean(tpe_best) > -0.005
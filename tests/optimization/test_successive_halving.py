@@ -0,0 +1,113 @@
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+
+from optimization.successive_halving import (
+    SuccessiveHalvingConfig,
+    run_successive_halving,
+)
+
+TICKERS = [f"T{i}" for i in range(8)]
+
+
+def _make_evaluate_func(calls: List[Tuple[int, str]], noise: float = 0.0):
+    """
+    The score of a candidate is its quality plus the ticker-dependent noise
+    """
+
+    def evaluate(candidate: dict, ticker: str) -> float:
+        calls.append((candidate["quality"], ticker))
+        ticker_num = int(ticker[1:])
+        return candidate["quality"] + noise * (-1) ** ticker_num * ticker_num
+
+    return evaluate
+
+
+@pytest.mark.unit
+def test_successive_halving_keeps_the_best() -> None:
+    calls: List[Tuple[int, str]] = list()
+    candidates = [{"quality": q} for q in range(8)]
+    res = run_successive_halving(
+        candidates=candidates,
+        tickers=TICKERS,
+        evaluate_func=_make_evaluate_func(calls=calls),
+        config=SuccessiveHalvingConfig(ticker_schedule=[2, 4], keep_fraction=0.5),
+    )
+
+    # 8 candidates * 2 tickers, then 4 * 2 more, then 2 * 4 more
+    assert len(calls) == 16 + 8 + 8
+    assert len(set(calls)) == len(calls)
+
+    full = res[res["tickers_evaluated"] == len(TICKERS)]
+    assert sorted(full["quality"]) == [6, 7]
+    assert full["dropped_at_rung"].isna().all()
+    assert res.iloc[0]["quality"] == 7
+    dropped_at_0 = res[res["dropped_at_rung"] == 0]
+    assert sorted(dropped_at_0["quality"]) == [0, 1, 2, 3]
+
+
+@pytest.mark.unit
+def test_successive_halving_confidence_and_min_score() -> None:
+    calls: List[Tuple[int, str]] = list()
+    candidates = [{"quality": q} for q in range(4)]
+
+    # With the noisy scores, no candidate is worse with confidence,
+    # so only min_score drops candidates
+    res = run_successive_halving(
+        candidates=candidates,
+        tickers=TICKERS,
+        evaluate_func=_make_evaluate_func(calls=calls, noise=5.0),
+        config=SuccessiveHalvingConfig(
+            ticker_schedule=[4], keep_fraction=0.25, confidence_z=2.0, min_score=-2.0
+        ),
+    )
+    full = res[res["tickers_evaluated"] == len(TICKERS)]
+    assert sorted(full["quality"]) == [1, 2, 3]
+    assert res.loc[res["quality"] == 0, "dropped_at_rung"].item() == 0
+    assert np.isclose(
+        res.loc[res["quality"] == 3, "score_mean"].item(),
+        3 + 5.0 * np.mean([(-1) ** i * i for i in range(8)]),
+    )
+
+
+@pytest.mark.unit
+def test_successive_halving_min_candidates_over_min_score() -> None:
+    """
+    If too few candidates reach min_score,
+    the best of the others survive up to min_candidates.
+    """
+    calls: List[Tuple[int, str]] = list()
+    candidates = [{"quality": q} for q in range(6)]
+    res = run_successive_halving(
+        candidates=candidates,
+        tickers=TICKERS,
+        evaluate_func=_make_evaluate_func(calls=calls),
+        config=SuccessiveHalvingConfig(
+            ticker_schedule=[2], keep_fraction=0.5, min_candidates=2, min_score=5.0
+        ),
+    )
+    full = res[res["tickers_evaluated"] == len(TICKERS)]
+    assert sorted(full["quality"]) == [4, 5]
+
+    res = run_successive_halving(
+        candidates=candidates,
+        tickers=TICKERS,
+        evaluate_func=_make_evaluate_func(calls=calls),
+        config=SuccessiveHalvingConfig(
+            ticker_schedule=[2], keep_fraction=0.5, min_score=100.0
+        ),
+    )
+    full = res[res["tickers_evaluated"] == len(TICKERS)]
+    assert full["quality"].tolist() == [5]
+
+
+@pytest.mark.unit
+def test_successive_halving_bad_schedule() -> None:
+    with pytest.raises(ValueError):
+        run_successive_halving(
+            candidates=[{"quality": 1}],
+            tickers=TICKERS,
+            evaluate_func=_make_evaluate_func(calls=list()),
+            config=SuccessiveHalvingConfig(ticker_schedule=[4, 2]),
+        )
@@ -0,0 +1,75 @@
+import functools
+
+import pandas as pd
+import pytest
+
+from derivative_columns.atr import add_tr_delta_col_to_ohlc
+from features.f_v1_basic import add_features_v1_basic
+from optimization.search import GridSearch, ParamRange
+from optimization.walk_forward import (
+    WalkForwardConfig,
+    WindowMode,
+    generate_walk_forward_windows,
+    run_walk_forward,
+)
+
+
+@pytest.mark.unit
+def test_generate_walk_forward_windows() -> None:
+    index = pd.bdate_range(start="2020-01-01", end="2023-12-31")
+    rolling = generate_walk_forward_windows(
+        index=index,
+        train_period=pd.DateOffset(years=2),
+        test_period=pd.DateOffset(months=6),
+    )
+    anchored = generate_walk_forward_windows(
+        index=index,
+        train_period=pd.DateOffset(years=2),
+        test_period=pd.DateOffset(months=6),
+        mode=WindowMode.ANCHORED,
+    )
+    assert len(rolling) == len(anchored) == 4
+    assert rolling[0].train_end == pd.Timestamp("2022-01-01")
+    assert rolling[1].train_start == pd.Timestamp("2020-07-01")
+    assert anchored[1].train_start == pd.Timestamp("2020-01-01")
+    for prev, window in zip(rolling, rolling[1:]):
+        assert window.test_start == prev.test_end
+    for window in rolling:
+        assert window.test_start == window.train_end
+
+
+@pytest.mark.unit
+def test_run_walk_forward_parallel_same_as_sequential(
+    spy_df_daily: pd.DataFrame,
+) -> None:
+    df = add_tr_delta_col_to_ohlc(
+        ohlc_df=add_features_v1_basic(
+            df=spy_df_daily.loc["2018-01-01":], atr_multiplier_threshold=3
+        )
+    )
+    tickers_data = {"SPY": df}
+    windows = generate_walk_forward_windows(
+        index=df.index,
+        train_period=pd.DateOffset(years=3),
+        test_period=pd.DateOffset(years=1),
+    )
+    config = WalkForwardConfig(
+        make_search_strategy=functools.partial(
+            GridSearch,
+            param_ranges=[
+                ParamRange(name="max_trade_duration_long", low=5, high=10, step=5)
+            ],
+        ),
+        n_trials=2,
+        fixed_params={"profit_target_long_pct": 5.5},
+    )
+    sequential = run_walk_forward(
+        tickers_data=tickers_data, windows=windows, config=config
+    )
+    parallel = run_walk_forward(
+        tickers_data=tickers_data, windows=windows, config=config, max_workers=2
+    )
+    assert len(sequential) == len(windows)
+    assert sequential["max_trade_duration_long"].isin([5, 10]).all()
+    assert sequential["test_score"].notna().any()
+    pd.testing.assert_frame_equal(sequential, parallel)
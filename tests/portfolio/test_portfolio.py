@@ -0,0 +1,129 @@
+import dataclasses
+
+import pandas as pd
+import pytest
+
+from constants import FEATURE_COL_NAME_ADVANCED
+from customizable import StrategyParams
+from derivative_columns.atr import add_tr_delta_col_to_ohlc
+from features.f_v1_basic import add_features_v1_basic
+from strategy import PortfolioConfig, run_backtest_for_ticker, run_portfolio_backtest
+
+
+@pytest.fixture
+def spy_with_features(spy_df_daily: pd.DataFrame) -> pd.DataFrame:
+    return add_tr_delta_col_to_ohlc(
+        ohlc_df=add_features_v1_basic(
+            df=spy_df_daily.loc["2019-01-01":], atr_multiplier_threshold=3
+        )
+    )
+
+
+STRATEGY_PARAMS = StrategyParams(max_trade_duration_long=8, profit_target_long_pct=5.5)
+
+
+@pytest.mark.unit
+def test_one_ticker_same_as_backtest(spy_with_features: pd.DataFrame) -> None:
+    stat, trades, _ = run_backtest_for_ticker(
+        ticker="SPY", data=spy_with_features, strategy_params=STRATEGY_PARAMS
+    )
+    res = run_portfolio_backtest(
+        tickers_data={"SPY": spy_with_features},
+        strategy_params=STRATEGY_PARAMS,
+        config=PortfolioConfig(cash=10000),
+    )
+    assert stat["# Trades"] > 10
+    cols = [col for col in res.trades.columns if col != "Ticker"]
+    pd.testing.assert_frame_equal(
+        res.trades[cols], trades[cols].reset_index(drop=True), check_dtype=False
+    )
+    assert res.stats["SQN"] == pytest.approx(stat["SQN"])
+    assert res.stats["Equity Final [$]"] == pytest.approx(stat["Equity Final [$]"])
+    assert res.ticker_summary.loc["SPY", "# Trades"] == stat["# Trades"]
+
+
+@pytest.mark.unit
+def test_shared_account_and_calendar(spy_with_features: pd.DataFrame) -> None:
+    # NOTE The second ticker has the same prices without every fifth date
+    other = spy_with_features.drop(spy_with_features.index[::5])
+    res = run_portfolio_backtest(
+        tickers_data={"SPY": spy_with_features, "OTHER": other},
+        strategy_params=STRATEGY_PARAMS,
+        config=PortfolioConfig(cash=20000),
+    )
+    assert res.equity_curve.index.equals(spy_with_features.index)
+    assert res.equity_curve.iloc[0] == 20000
+    assert set(res.trades["Ticker"]) == {"SPY", "OTHER"}
+    other_trades = res.trades[res.trades["Ticker"] == "OTHER"]
+    assert other_trades["EntryTime"].isin(other.index).all()
+    assert (
+        other.index[other_trades["EntryBar"].to_numpy()] == other_trades["EntryTime"]
+    ).all()
+    assert res.stats["# Trades"] == len(res.trades)
+    assert res.ticker_summary["weight"].tolist() == [0.5, 0.5]
+
+    # Equal weights of the same prices give the same trades
+    # as the single ticker backtest with half of the cash
+    same = run_portfolio_backtest(
+        tickers_data={"A": spy_with_features, "B": spy_with_features},
+        strategy_params=STRATEGY_PARAMS,
+        config=PortfolioConfig(cash=20000),
+    )
+    _, trades, _ = run_backtest_for_ticker(
+        ticker="SPY", data=spy_with_features, strategy_params=STRATEGY_PARAMS
+    )
+    for ticker in ["A", "B"]:
+        ticker_trades = same.trades[same.trades["Ticker"] == ticker]
+        assert ticker_trades["Size"].tolist() == trades["Size"].tolist()
+        assert ticker_trades["PnL"].sum() == pytest.approx(trades["PnL"].sum())
+
+
+@pytest.mark.unit
+def test_portfolio_weights(spy_with_features: pd.DataFrame) -> None:
+    with pytest.raises(ValueError, match="no weights"):
+        run_portfolio_backtest(
+            tickers_data={"A": spy_with_features, "B": spy_with_features},
+            strategy_params=STRATEGY_PARAMS,
+            config=PortfolioConfig(weights={"A": 1.0}),
+        )
+    res = run_portfolio_backtest(
+        tickers_data={"A": spy_with_features, "B": spy_with_features},
+        strategy_params=STRATEGY_PARAMS,
+        config=PortfolioConfig(weights={"A": 0.75, "B": 0.25}),
+    )
+    sizes = res.trades.groupby("Ticker")["Size"].first()
+    assert sizes["A"] > 2 * sizes["B"]
+
+
+@pytest.mark.unit
+def test_skip_idle_bars_same_results(spy_with_features: pd.DataFrame) -> None:
+    tickers_data = {"SPY": spy_with_features, "OTHER": spy_with_features.iloc[::2]}
+    res = run_portfolio_backtest(
+        tickers_data=tickers_data, strategy_params=STRATEGY_PARAMS
+    )
+    skip_res = run_portfolio_backtest(
+        tickers_data=tickers_data,
+        strategy_params=dataclasses.replace(STRATEGY_PARAMS, skip_idle_bars=True),
+    )
+    pd.testing.assert_frame_equal(skip_res.trades, res.trades)
+    pd.testing.assert_series_equal(skip_res.equity_curve, res.equity_curve)
+
+
+@pytest.mark.unit
+@pytest.mark.filterwarnings("error::FutureWarning")
+def test_tickers_without_trades(spy_with_features: pd.DataFrame) -> None:
+    flat = spy_with_features.copy()
+    flat[FEATURE_COL_NAME_ADVANCED] = False
+    res = run_portfolio_backtest(
+        tickers_data={"SPY": spy_with_features, "FLAT": flat},
+        strategy_params=STRATEGY_PARAMS,
+    )
+    assert len(res.trades) > 0
+    assert set(res.trades["Ticker"]) == {"SPY"}
+
+    res = run_portfolio_backtest(
+        tickers_data={"FLAT": flat}, strategy_params=STRATEGY_PARAMS
+    )
+    assert res.trades.empty
+    assert "Ticker" in res.trades.columns
+    assert res.stats["# Trades"] == 0
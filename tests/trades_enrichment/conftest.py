@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from utils.strategy_exec.trade_tags import TradeTag
+
+
+@pytest.fixture
+def trades_df(basic_ohlc_df_daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Two trades on basic_ohlc_df_daily, like in stats._trades:
+    a long trade from bar 0 to bar 2 and a short trade from bar 2 to bar 4.
+    """
+    index = basic_ohlc_df_daily.index
+    return pd.DataFrame(
+        {
+            "Size": [10, -5],
+            "EntryBar": [0, 2],
+            "ExitBar": [2, 4],
+            "EntryPrice": [100.0, 102.0],
+            "ExitPrice": [101.0, 103.0],
+            "EntryTime": [index[0], index[2]],
+            "ExitTime": [index[2], index[4]],
+            "Tag": [
+                int(TradeTag.SL_TIGHTENED | TradeTag.PARTIALLY_CLOSED),
+                int(TradeTag.CLOSED_MAX_DURATION),
+            ],
+        }
+    )
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from constants import CLOSED_MAX_DURATION, SL_TIGHTENED, TRADE_ALREADY_HALF_CLOSED
+from strategy.trades_enrichment import (
+    TAG_FLAG_COLUMNS,
+    add_excursions_to_trades,
+    add_feature_values_to_trades,
+    enrich_trades,
+)
+
+
+@pytest.mark.unit
+def test_add_feature_values_to_trades(
+    basic_ohlc_df_daily: pd.DataFrame, trades_df: pd.DataFrame
+) -> None:
+    ohlc = basic_ohlc_df_daily.copy()
+    ohlc["feature"] = [1.0, 2.0, 3.0, 4.0, 5.0]
+    res = add_feature_values_to_trades(
+        trades=trades_df, ticker_data=ohlc, feature_cols=["feature", "Close"]
+    )
+    assert res["feature_entry"].tolist() == [1.0, 3.0]
+    assert res["feature_exit"].tolist() == [3.0, 5.0]
+    assert res["Close_entry"].tolist() == [100, 101]
+    assert "feature" not in trades_df.columns  # input not modified
+
+
+@pytest.mark.unit
+def test_add_feature_values_to_trades_missing_column(
+    basic_ohlc_df_daily: pd.DataFrame, trades_df: pd.DataFrame
+) -> None:
+    with pytest.raises(ValueError) as exc_info:
+        add_feature_values_to_trades(
+            trades=trades_df, ticker_data=basic_ohlc_df_daily, feature_cols=["absent"]
+        )
+    assert "no absent column" in str(exc_info.value)
+
+
+@pytest.mark.unit
+def test_add_excursions_to_trades(
+    basic_ohlc_df_daily: pd.DataFrame, trades_df: pd.DataFrame
+) -> None:
+    """
+    Long trade: bars 0-2, lowest Low 99, highest High 107, entry 100.
+    Short trade: bars 2-4, lowest Low 101, highest High 109, entry 102.
+    """
+    res = add_excursions_to_trades(trades=trades_df, ticker_data=basic_ohlc_df_daily)
+    np.testing.assert_allclose(res["MAE_pct"], [-1.0, (1 - 109 / 102) * 100])
+    np.testing.assert_allclose(res["MFE_pct"], [7.0, (1 - 101 / 102) * 100])
+
+
+@pytest.mark.unit
+def test_enrich_trades(
+    basic_ohlc_df_daily: pd.DataFrame, trades_df: pd.DataFrame
+) -> None:
+    res = enrich_trades(trades=trades_df, ticker_data=basic_ohlc_df_daily)
+    assert res["HoldingDays"].tolist() == [2, 2]
+    for col in TAG_FLAG_COLUMNS:
+        assert res[col].dtype == bool
+    assert res["tag_sl_tightened"].tolist() == [True, False]
+    assert res["tag_partially_closed"].tolist() == [True, False]
+    assert res["tag_closed_max_duration"].tolist() == [False, True]
+    assert not res["tag_closed_volatility_spike"].any()
+    assert res["Tag"].tolist() == [
+        SL_TIGHTENED + TRADE_ALREADY_HALF_CLOSED,
+        CLOSED_MAX_DURATION,
+    ]
+
+
+@pytest.mark.unit
+def test_enrich_trades_no_trades(
+    basic_ohlc_df_daily: pd.DataFrame, trades_df: pd.DataFrame
+) -> None:
+    # NOTE Like stats._trades of a backtest without trades
+    no_trades = pd.DataFrame(columns=trades_df.columns, dtype=object)
+    res = enrich_trades(
+        trades=no_trades, ticker_data=basic_ohlc_df_daily, feature_cols=["Close"]
+    )
+    assert res.empty
+    assert {"HoldingDays", "MAE_pct", "MFE_pct", "Close_entry"}.issubset(res.columns)
+    assert set(TAG_FLAG_COLUMNS).issubset(res.columns)
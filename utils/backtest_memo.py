@@ -0,0 +1,227 @@
+"""
+On-disk memo store of run_backtest_for_ticker results.
+
+Inspect and prune it from the repository root:
+    python -m utils.backtest_memo stats
+    python -m utils.backtest_memo list
+    python -m utils.backtest_memo prune --max-size-mb 200
+    python -m utils.backtest_memo clear
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import pickle
+import sys
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import backtesting
+import pandas as pd
+
+from customizable import StrategyParams
+
+DEFAULT_MEMO_DIR = "cache/backtest_memo"
+DEFAULT_MAX_SIZE_MB = 500
+
+# NOTE These StrategyParams fields don't change the backtest results,
+# so they are not a part of the key
+NON_STRATEGY_FIELDS = {
+    "save_all_trades_in_xlsx",
+    "trades_feature_cols",
+    "profile_next_calls",
+    "skip_idle_bars",
+}
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Changes in these files may change the backtest results.
+# NOTE When the strategy code starts importing another module of the repo,
+# add it here, see tests/misc/test_backtest_memo.py
+STRATEGY_CODE_PATHS = [
+    REPO_ROOT / "constants.py",
+    REPO_ROOT / "customizable",
+    REPO_ROOT / "utils" / "strategy_exec",
+    REPO_ROOT / "strategy" / "run_backtest_for_ticker.py",
+    REPO_ROOT / "strategy" / "execution_profile.py",
+]
+
+BacktestResult = Tuple[pd.Series, pd.DataFrame, dict]
+
+
+@functools.lru_cache(maxsize=1)
+def get_strategy_code_hash() -> str:
+    """
+    Hash of the source code of the strategy,
+    calculated once per process
+    """
+    sha = hashlib.sha256()
+    for path in STRATEGY_CODE_PATHS:
+        files = sorted(path.rglob("*.py")) if path.is_dir() else [path]
+        for file in files:
+            sha.update(str(file.relative_to(REPO_ROOT)).encode())
+            sha.update(file.read_bytes())
+    sha.update(backtesting.__version__.encode())
+    return sha.hexdigest()
+
+
+def get_data_fingerprint(data: pd.DataFrame) -> str:
+    """
+    Hash of the values, index, column names, and dtypes of data
+    """
+    sha = hashlib.sha256()
+    sha.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    sha.update(json.dumps([[str(c), str(t)] for c, t in data.dtypes.items()]).encode())
+    return sha.hexdigest()
+
+
+def get_memo_key(
+    ticker: str,
+    data: pd.DataFrame,
+    strategy_params: StrategyParams,
+    light_stats: bool = False,
+) -> str:
+    """
+    light_stats is True for the results of the OPTIMIZE execution profile,
+    they have fewer stats than the others and are stored separately
+    """
+    params = {
+        name: value
+        for name, value in asdict(strategy_params).items()
+        if name not in NON_STRATEGY_FIELDS
+    }
+    sha = hashlib.sha256()
+    sha.update(ticker.encode())
+    sha.update(get_data_fingerprint(data=data).encode())
+    sha.update(json.dumps(params, sort_keys=True, default=str).encode())
+    sha.update(get_strategy_code_hash().encode())
+    if light_stats:
+        sha.update(b"light_stats")
+    return sha.hexdigest()
+
+
+class BacktestMemo:
+    """
+    Every result is a pickle file named by its key.
+    The modification time of a file is updated when it is read,
+    so the least recently used files are evicted first
+    when the total size exceeds max_size_mb.
+    """
+
+    def __init__(
+        self, memo_dir: str = DEFAULT_MEMO_DIR, max_size_mb: float = DEFAULT_MAX_SIZE_MB
+    ):
+        self.memo_dir = Path(memo_dir)
+        self.max_size_mb = max_size_mb
+        self.hits = 0
+        self.misses = 0
+
+    def _get_path(self, key: str) -> Path:
+        return self.memo_dir / f"{key}.pkl"
+
+    def _get_files(self) -> List[Path]:
+        if not self.memo_dir.exists():
+            return list()
+        return list(self.memo_dir.glob("*.pkl"))
+
+    def load(self, key: str) -> Optional[BacktestResult]:
+        path = self._get_path(key=key)
+        try:
+            with open(path, "rb") as f:
+                res = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses = self.misses + 1
+            return None
+        os.utime(path)
+        self.hits = self.hits + 1
+        return res
+
+    def save(self, key: str, result: BacktestResult) -> None:
+        stats, trades, last_day_result = result
+
+        # NOTE The strategy instance can't be pickled,
+        # its class is defined inside run_backtest_for_ticker
+        stats = stats.copy()
+        stats["_strategy"] = None
+
+        self.memo_dir.mkdir(parents=True, exist_ok=True)
+        path = self._get_path(key=key)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "wb") as f:
+            pickle.dump((stats, trades, last_day_result), f)
+        os.replace(temp_path, path)
+        self.prune()
+
+    def prune(self, max_size_mb: Optional[float] = None) -> int:
+        """
+        Delete the least recently used files
+        until the total size is within max_size_mb.
+        Return the number of deleted files.
+        """
+        if max_size_mb is None:
+            max_size_mb = self.max_size_mb
+        files = [(path, path.stat()) for path in self._get_files()]
+        total_size = sum(stat.st_size for _, stat in files)
+        max_size = max_size_mb * 2**20
+        deleted = 0
+        for path, stat in sorted(files, key=lambda x: x[1].st_mtime):
+            if total_size <= max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size = total_size - stat.st_size
+            deleted = deleted + 1
+        return deleted
+
+    def clear(self) -> int:
+        return self.prune(max_size_mb=0)
+
+    def get_stats(self) -> dict:
+        files = self._get_files()
+        return {
+            "memo_dir": str(self.memo_dir),
+            "entries": len(files),
+            "size_mb": round(sum(path.stat().st_size for path in files) / 2**20, 3),
+            "max_size_mb": self.max_size_mb,
+        }
+
+    def list_entries(self) -> pd.DataFrame:
+        rows = list()
+        for path in self._get_files():
+            stat = path.stat()
+            rows.append(
+                {
+                    "key": path.stem,
+                    "size_kb": round(stat.st_size / 1024, 1),
+                    "last_used": pd.Timestamp(stat.st_mtime, unit="s"),
+                }
+            )
+        if not rows:
+            return pd.DataFrame(columns=["key", "size_kb", "last_used"])
+        return (
+            pd.DataFrame(rows)
+            .sort_values("last_used", ascending=False)
+            .reset_index(drop=True)
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("command", choices=["stats", "list", "prune", "clear"])
+    parser.add_argument("--memo-dir", default=DEFAULT_MEMO_DIR)
+    parser.add_argument("--max-size-mb", type=float, default=DEFAULT_MAX_SIZE_MB)
+    args = parser.parse_args()
+
+    backtest_memo = BacktestMemo(memo_dir=args.memo_dir, max_size_mb=args.max_size_mb)
+    if args.command == "stats":
+        print(json.dumps(backtest_memo.get_stats(), indent=2))
+    elif args.command == "list":
+        print(backtest_memo.list_entries().to_string(index=False))
+    elif args.command == "prune":
+        print(f"Deleted {backtest_memo.prune()} entries", file=sys.stderr)
+    else:
+        print(f"Deleted {backtest_memo.clear()} entries", file=sys.stderr)
@@ -0,0 +1,146 @@
+import functools
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# NOTE The profiler measures the functions called
+# in every next() call of the strategy, see run_backtest_for_ticker.
+# It is switched on by StrategyParams(profile_next_calls=True).
+# If it is off, the strategy calls the original functions,
+# so there is no overhead at all.
+
+NEXT_TOTAL = "next_total"
+
+
+class BarProfiler:
+    """
+    Collect the duration of every call of the wrapped functions
+    across all bars and tickers, then aggregate the durations
+    into summary statistics and histograms.
+    """
+
+    def __init__(self):
+        self.durations_ns: Dict[str, List[int]] = dict()
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        durations = self.durations_ns.setdefault(name, list())
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                durations.append(time.perf_counter_ns() - start)
+
+        return wrapper
+
+    def reset(self) -> None:
+        # NOTE clear the lists instead of replacing them,
+        # the wrappers created before keep references to them
+        for durations in self.durations_ns.values():
+            durations.clear()
+
+    def get_summary(self) -> pd.DataFrame:
+        """
+        Per-function statistics in microseconds.
+        share_of_next_pct is the share of the total time of next() calls
+        spent in the function.
+        """
+        next_total_ns = sum(self.durations_ns.get(NEXT_TOTAL, []))
+        rows = list()
+        for name, durations in self.durations_ns.items():
+            if not durations:
+                continue
+            values_us = np.asarray(durations, dtype=np.int64) / 1000
+            p50, p90, p99 = np.percentile(values_us, [50, 90, 99])
+            total_ms = values_us.sum() / 1000
+            rows.append(
+                {
+                    "function": name,
+                    "calls": values_us.size,
+                    "total_ms": round(total_ms, 3),
+                    "mean_us": round(values_us.mean(), 2),
+                    "p50_us": round(p50, 2),
+                    "p90_us": round(p90, 2),
+                    "p99_us": round(p99, 2),
+                    "max_us": round(values_us.max(), 2),
+                    "share_of_next_pct": (
+                        round(total_ms * 1e8 / next_total_ns, 2)
+                        if next_total_ns
+                        else np.nan
+                    ),
+                }
+            )
+        if not rows:
+            return pd.DataFrame()
+        return (
+            pd.DataFrame(rows)
+            .sort_values("total_ms", ascending=False)
+            .reset_index(drop=True)
+        )
+
+    def get_histograms(
+        self, bins_per_decade: int = 4
+    ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        For every function, return (counts, bin_edges_us) of its call durations.
+        The bins are log-spaced, because the durations differ
+        by orders of magnitude between calls.
+        All functions share the same bins, so the histograms are comparable.
+        """
+        non_empty = {
+            name: np.asarray(durations, dtype=np.int64) / 1000
+            for name, durations in self.durations_ns.items()
+            if durations
+        }
+        if not non_empty:
+            return dict()
+        all_values = np.concatenate(list(non_empty.values()))
+        low = np.floor(np.log10(max(all_values.min(), 0.01)))
+        high = np.ceil(np.log10(all_values.max())) + 1e-9
+        bin_edges = np.logspace(
+            low, high, num=int(np.ceil((high - low) * bins_per_decade)) + 1
+        )
+        return {
+            name: np.histogram(values, bins=bin_edges)
+            for name, values in non_empty.items()
+        }
+
+    def report(self, file_name_prefix: str = "bar_profile") -> None:
+        """
+        Print the summary table,
+        save it to {file_name_prefix}_summary.csv
+        and the histograms to {file_name_prefix}_histograms.csv.
+        """
+        summary = self.get_summary()
+        if summary.empty:
+            print("BarProfiler.report: no calls recorded", file=sys.stderr)
+            return
+        print(summary.to_string(index=False), file=sys.stderr)
+        summary.to_csv(f"{file_name_prefix}_summary.csv", index=False)
+        histogram_rows = list()
+        for name, (counts, bin_edges) in self.get_histograms().items():
+            for i, count in enumerate(counts):
+                histogram_rows.append(
+                    {
+                        "function": name,
+                        "bin_left_us": bin_edges[i],
+                        "bin_right_us": bin_edges[i + 1],
+                        "count": count,
+                    }
+                )
+        pd.DataFrame(histogram_rows).to_csv(
+            f"{file_name_prefix}_histograms.csv", index=False
+        )
+        print(
+            f"Saved {file_name_prefix}_summary.csv and {file_name_prefix}_histograms.csv",
+            file=sys.stderr,
+        )
+
+
+# Collects the calls of all backtests in the process
+BAR_PROFILER = BarProfiler()
@@ -0,0 +1,135 @@
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from constants import DEFAULT_BOOTSTRAP_CONFIDENCE_LEVEL, FEATURE_COL_NAME_BASIC
+from utils.local_data import TickersData
+
+# NOTE The forward returns analysis checks one horizon fwd_ret_{N} per run.
+# An event study takes the whole path of returns
+# around every bar where the feature is True, the event.
+# The column k of the paths is the return from the Close of the event bar
+# to the Close k bars later, the same value as fwd_ret_{k} of add_fwd_ret.
+# Negative k are the bars before the event.
+# The windows around all bars are a strided view of the Close prices,
+# only the rows of the events are copied.
+
+
+def get_event_paths(
+    df: pd.DataFrame,
+    bars_after: int,
+    bars_before: int = 0,
+    feature_col_name: str = FEATURE_COL_NAME_BASIC,
+    feature_value: bool = True,
+) -> pd.DataFrame:
+    """
+    Return the DataFrame with a row for every bar
+    where df[feature_col_name] == feature_value
+    and the columns from -bars_before to bars_after,
+    the cumulative returns in percent from the Close of the event bar.
+    The bars outside df give NaN.
+    """
+    if bars_after < 0 or bars_before < 0:
+        raise ValueError(
+            f"get_event_paths: {bars_after=}, {bars_before=}, must be >= 0"
+        )
+    if feature_col_name not in df.columns:
+        raise ValueError(f"get_event_paths: no {feature_col_name} column in df")
+    close = df["Close"].to_numpy(dtype=float)
+    padded = np.concatenate(
+        [np.full(bars_before, np.nan), close, np.full(bars_after, np.nan)]
+    )
+    # NOTE The row i of windows is a view of the bars
+    # from i - bars_before to i + bars_after
+    windows = sliding_window_view(padded, window_shape=bars_before + bars_after + 1)
+    is_event = (df[feature_col_name] == feature_value).to_numpy()
+    event_windows = windows[is_event]
+    event_close = close[is_event][:, None]
+    paths = ((event_windows - event_close) / event_close) * 100
+    return pd.DataFrame(
+        np.round(paths, 2),
+        index=df.index[is_event],
+        columns=range(-bars_before, bars_after + 1),
+    )
+
+
+def get_event_paths_for_tickers(
+    tickers_data: TickersData,
+    bars_after: int,
+    bars_before: int = 0,
+    feature_value: bool = True,
+) -> pd.DataFrame:
+    """
+    Return the event paths of all tickers, see get_event_paths.
+    The index levels are ticker and date.
+    The paths never cross the border between the tickers.
+    """
+    paths = dict()
+    for ticker, df in tickers_data.tickers_data_with_features.items():
+        print(f"get_event_paths_for_tickers: {ticker}...", file=sys.stderr)
+        paths[ticker] = get_event_paths(
+            df=df,
+            bars_after=bars_after,
+            bars_before=bars_before,
+            feature_value=feature_value,
+        )
+    return pd.concat(paths, names=["ticker", None])
+
+
+def get_event_study_summary(
+    paths: pd.DataFrame,
+    conf_level: float = DEFAULT_BOOTSTRAP_CONFIDENCE_LEVEL,
+    n_resamples: int = 1000,
+    random_state: int = 1,
+    chunk_size: int = 100,
+) -> pd.DataFrame:
+    """
+    For every column of paths, return the mean with its
+    bootstrapped confidence interval, the median,
+    the share of positive returns, and the count of non-NaN values.
+    The bootstrap resamples whole paths, i.e. rows,
+    so the bands of all columns come from the same resamples.
+    The resamples are processed in chunks of chunk_size.
+    """
+    if paths.empty:
+        raise ValueError("get_event_study_summary: empty paths")
+    values = paths.to_numpy(dtype=float)
+    is_valid = ~np.isnan(values)
+    filled = np.where(is_valid, values, 0.0)
+    event_count = len(values)
+    count = is_valid.sum(axis=0)
+
+    rng = np.random.default_rng(random_state)
+    means = np.empty((n_resamples, values.shape[1]))
+    for start in range(0, n_resamples, chunk_size):
+        size = min(chunk_size, n_resamples - start)
+        # NOTE The times every path is drawn in every resample,
+        # so the resampled sums are matrix products
+        weights = rng.multinomial(
+            event_count, np.full(event_count, 1 / event_count), size=size
+        ).astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means[start : start + size] = (weights @ filled) / (weights @ is_valid)
+
+    percentiles = [(1 - conf_level) / 2 * 100, (1 + conf_level) / 2 * 100]
+    with warnings.catch_warnings():
+        # NOTE All-NaN columns, e.g. the bars after the end of data, give NaN
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        ci_left, ci_right = np.nanpercentile(means, percentiles, axis=0)
+        mean_val = np.nanmean(values, axis=0)
+        median_val = np.nanmedian(values, axis=0)
+        positive_pct = (values > 0).sum(axis=0) / count
+    return pd.DataFrame(
+        {
+            f"ci_left_{conf_level}": ci_left,
+            "mean_val": mean_val,
+            f"ci_right_{conf_level}": ci_right,
+            "median_val": median_val,
+            "positive_pct": positive_pct,
+            "count": count,
+        },
+        index=pd.Index(paths.columns, name="bars_from_event"),
+    ).round(3)
@@ -0,0 +1,240 @@
+import sys
+import warnings
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from constants import DEFAULT_BOOTSTRAP_CONFIDENCE_LEVEL, FEATURE_COL_NAME_BASIC
+from utils.local_data import TickersData
+
+# NOTE run_fwd_return_analysis_binary.py tests one feature per run
+# and calls get_bootstrapped_mean_ci for every horizon and feature value.
+# screen_features tests all features and horizons at once.
+# The counts, sums and bootstrap resamples of all
+# (feature, horizon) cells are matrix products
+# of the feature indicator matrix and the forward returns matrix.
+# The bootstrap is Poisson: every resample gives each row
+# a Poisson(1) weight instead of drawing rows with replacement.
+# The resamples of the rows are independent, so the resamples
+# of every feature subset are valid bootstrap resamples.
+# The confidence intervals are close to, but not the same as,
+# those of get_bootstrapped_mean_ci, the other statistics are the same.
+
+# NOTE get_bootstrapped_mean_ci returns NaN statistics
+# for samples of this size or less
+MIN_SAMPLE_SIZE = 3
+
+# NOTE Every bootstrap resample of a chunk needs the weights
+# and the weighted returns and counts, about (2 * H + 1) * rows float64 values,
+# e.g. 37 MB for 150,000 rows and 15 horizons.
+# By default, the chunk size is the number of resamples that fit this budget.
+DEFAULT_CHUNK_MEMORY_MB = 256
+
+
+def get_chunk_size(
+    row_count: int, horizon_count: int, memory_mb: float = DEFAULT_CHUNK_MEMORY_MB
+) -> int:
+    """
+    The number of bootstrap resamples per chunk that fit memory_mb, at least 1
+    """
+    bytes_per_resample = (2 * horizon_count + 1) * row_count * 8
+    return max(1, int(memory_mb * 2**20 // bytes_per_resample))
+
+
+def get_feature_matrix(
+    df: pd.DataFrame, feature_funcs: Dict[str, Callable]
+) -> pd.DataFrame:
+    """
+    Return the DataFrame with the same index as df
+    and a column for every item of feature_funcs.
+    Every function is an add_feature_cols_func,
+    its FEATURE_COL_NAME_BASIC column is taken.
+    For the parameterized feature families, use functools.partial.
+    """
+    res = dict()
+    for name, func in feature_funcs.items():
+        res[name] = func(df=df)[FEATURE_COL_NAME_BASIC]
+    return pd.DataFrame(res, index=df.index)
+
+
+def get_fwd_ret_matrix(df: pd.DataFrame, horizons: Sequence[int]) -> pd.DataFrame:
+    """
+    Return the DataFrame with the columns fwd_ret_{num_days},
+    the same values as add_fwd_ret adds, for every horizon
+    """
+    close = df["Close"]
+    res = dict()
+    for num_days in horizons:
+        res[f"fwd_ret_{num_days}"] = round(
+            (close.shift(-num_days) - close) / close * 100, 2
+        )
+    return pd.DataFrame(res, index=df.index)
+
+
+def get_screening_matrices(
+    tickers_data: TickersData,
+    feature_funcs: Dict[str, Callable],
+    horizons: Sequence[int],
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Return the feature matrix and the forward returns matrix
+    of all tickers, concatenated, like get_combined_df_with_fwd_ret does.
+    The forward returns never cross the border between the tickers.
+    """
+    features = list()
+    fwd_returns = list()
+    for ticker, df in tickers_data.tickers_data_with_features.items():
+        print(f"get_screening_matrices: {ticker}...", file=sys.stderr)
+        features.append(get_feature_matrix(df=df, feature_funcs=feature_funcs))
+        fwd_returns.append(get_fwd_ret_matrix(df=df, horizons=horizons))
+    return pd.concat(features), pd.concat(fwd_returns)
+
+
+def _get_group_stats(
+    is_member: np.ndarray, returns: np.ndarray, is_valid: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Return count, mean_val and positive_pct
+    of every (feature, horizon) cell, the arrays of the shape K x H
+    """
+    count = is_member.T @ is_valid
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_val = (is_member.T @ returns) / count
+        positive_pct = (is_member.T @ (returns > 0).astype(float)) / count
+    return {"count": count, "mean_val": mean_val, "positive_pct": positive_pct}
+
+
+def _get_bootstrapped_means(
+    is_true: np.ndarray,
+    is_false: np.ndarray,
+    returns: np.ndarray,
+    is_valid: np.ndarray,
+    n_resamples: int,
+    random_state: int,
+    chunk_size: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the arrays of the shape n_resamples x K x H,
+    the bootstrapped means of the feature True and False groups.
+    The resamples are processed in chunks of chunk_size
+    to limit the memory of the weighted returns matrix.
+    """
+    rng = np.random.default_rng(random_state)
+    row_count, horizon_count = returns.shape
+    means_true = np.empty((n_resamples, is_true.shape[1], horizon_count))
+    means_false = np.empty_like(means_true)
+    for start in range(0, n_resamples, chunk_size):
+        size = min(chunk_size, n_resamples - start)
+        # NOTE Drawn resample by resample, so the results don't depend on chunk_size
+        weights = rng.poisson(lam=1.0, size=(size, row_count)).T[:, :, None]
+        weights = weights.astype(float)
+        # NOTE The column b * H + h is the horizon h of the resample b
+        weighted_returns = (weights * returns[:, None, :]).reshape(row_count, -1)
+        weighted_counts = (weights * is_valid[:, None, :]).reshape(row_count, -1)
+        for is_member, means in ((is_true, means_true), (is_false, means_false)):
+            sums = (is_member.T @ weighted_returns).reshape(-1, size, horizon_count)
+            counts = (is_member.T @ weighted_counts).reshape(-1, size, horizon_count)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                means[start : start + size] = (sums / counts).transpose(1, 0, 2)
+    return means_true, means_false
+
+
+def screen_features(
+    features: pd.DataFrame,
+    fwd_returns: pd.DataFrame,
+    conf_level: float = DEFAULT_BOOTSTRAP_CONFIDENCE_LEVEL,
+    n_resamples: int = 1000,
+    random_state: int = 1,
+    chunk_size: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    For every feature and forward returns column, calculate
+    the statistics of get_bootstrapped_mean_ci for the rows
+    where the feature is True and where it is False,
+    and the difference of the means with its confidence interval.
+    Return the table with a row for every (feature, horizon) cell,
+    ranked by abs(diff_z), the difference of the means
+    divided by its bootstrapped standard deviation.
+    NaN feature values and NaN returns are skipped.
+    chunk_size - the number of bootstrap resamples processed at once,
+    by default see get_chunk_size.
+    """
+    if not features.index.equals(fwd_returns.index):
+        raise ValueError("screen_features: features and fwd_returns index differ")
+    if features.empty or fwd_returns.empty:
+        raise ValueError("screen_features: empty features or fwd_returns")
+    is_true = (features == True).to_numpy(dtype=float)  # pylint: disable=C0121
+    is_false = (features == False).to_numpy(dtype=float)  # pylint: disable=C0121
+    raw_returns = fwd_returns.to_numpy(dtype=float)
+    is_valid = (~np.isnan(raw_returns)).astype(float)
+    returns = np.nan_to_num(raw_returns, nan=0.0)
+    if chunk_size is None:
+        chunk_size = get_chunk_size(
+            row_count=returns.shape[0], horizon_count=returns.shape[1]
+        )
+
+    means_true, means_false = _get_bootstrapped_means(
+        is_true=is_true,
+        is_false=is_false,
+        returns=returns,
+        is_valid=is_valid,
+        n_resamples=n_resamples,
+        random_state=random_state,
+        chunk_size=chunk_size,
+    )
+    percentiles = [(1 - conf_level) / 2 * 100, (1 + conf_level) / 2 * 100]
+    with warnings.catch_warnings():
+        # NOTE All-NaN slices of the empty groups give NaN
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        means_diff = means_true - means_false
+        ci_true = np.nanpercentile(means_true, percentiles, axis=0)
+        ci_false = np.nanpercentile(means_false, percentiles, axis=0)
+        ci_diff = np.nanpercentile(means_diff, percentiles, axis=0)
+        std_diff = np.nanstd(means_diff, axis=0)
+
+    columns = dict()
+    for suffix, is_member, ci in (
+        ("true", is_true, ci_true),
+        ("false", is_false, ci_false),
+    ):
+        stats = _get_group_stats(
+            is_member=is_member, returns=returns, is_valid=is_valid
+        )
+        is_small = stats["count"] <= MIN_SAMPLE_SIZE
+        columns[f"ci_left_{conf_level}_{suffix}"] = np.where(is_small, np.nan, ci[0])
+        columns[f"mean_val_{suffix}"] = np.where(is_small, np.nan, stats["mean_val"])
+        columns[f"ci_right_{conf_level}_{suffix}"] = np.where(is_small, np.nan, ci[1])
+        columns[f"count_{suffix}"] = stats["count"]
+        columns[f"positive_pct_{suffix}"] = np.where(
+            is_small, np.nan, stats["positive_pct"]
+        )
+    columns["mean_diff"] = columns["mean_val_true"] - columns["mean_val_false"]
+    is_diff_valid = ~np.isnan(columns["mean_diff"])
+    columns[f"ci_left_{conf_level}_diff"] = np.where(is_diff_valid, ci_diff[0], np.nan)
+    columns[f"ci_right_{conf_level}_diff"] = np.where(
+        is_diff_valid, ci_diff[1], np.nan
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns["diff_z"] = np.where(
+            is_diff_valid & (std_diff > 0), columns["mean_diff"] / std_diff, np.nan
+        )
+
+    feature_count, horizon_count = is_true.shape[1], returns.shape[1]
+    res = pd.DataFrame(
+        {
+            "feature": np.repeat(features.columns.to_numpy(), horizon_count),
+            "fwd_ret_col": np.tile(fwd_returns.columns.to_numpy(), feature_count),
+        }
+    )
+    for name, values in columns.items():
+        res[name] = values.reshape(-1)
+    # NOTE The built-in round, like in get_bootstrapped_mean_ci,
+    # numpy rounds some halves differently
+    for name in res.columns.drop(["feature", "fwd_ret_col"]):
+        res[name] = [round(value, 3) for value in res[name].astype(float)]
+    res = res.sort_values(
+        "diff_z", key=np.abs, ascending=False, na_position="last", kind="stable"
+    )
+    res.insert(0, "rank", np.arange(1, len(res) + 1))
+    return res.reset_index(drop=True)
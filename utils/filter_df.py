@@ -1,7 +1,8 @@
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
+from typing import Optional, Union
 
+import numpy as np
 import pandas as pd
 
 
@@ -12,22 +13,55 @@ class RemainingPart(Enum):
 
     BEFORE = "before"
     AFTER = "after"
+    BETWEEN = "between"
 
 
 @dataclass
 class FilterParams:
     """
-    DataFrame filtering parameters for the function filter_df_by_date
+    DataFrame filtering parameters for the function filter_df_by_date.
+    If remaining_part is BETWEEN, the rows from date_threshold inclusive
+    to date_threshold_end exclusive remain.
     """
 
     do_filtering: bool = True
     date_threshold: Optional[str] = None
     remaining_part: RemainingPart = RemainingPart.AFTER
+    date_threshold_end: Optional[str] = None
+
+
+DateLike = Union[str, pd.Timestamp]
+
+
+def slice_df_by_dates(
+    df: pd.DataFrame, start: Optional[DateLike] = None, end: Optional[DateLike] = None
+) -> pd.DataFrame:
+    """
+    Return the rows from start inclusive to end exclusive,
+    None means no limit on that side.
+
+    If the index is sorted, the bounds are found by binary search
+    and the result is a positional slice,
+    which is a view of df and doesn't copy the data.
+    Otherwise, the rows are selected with a Boolean mask.
+    """
+    index = df.index
+    if index.is_monotonic_increasing:
+        start_pos = 0 if start is None else index.searchsorted(start, side="left")
+        end_pos = len(index) if end is None else index.searchsorted(end, side="left")
+        return df.iloc[start_pos:end_pos]
+    mask = np.ones(len(index), dtype=bool)
+    if start is not None:
+        mask = mask & (index >= start)
+    if end is not None:
+        mask = mask & (index < end)
+    return df.loc[mask]
 
 
 def filter_df_by_date(df: pd.DataFrame, filter_params: FilterParams) -> pd.DataFrame:
     """
-    Filter the portion of a dataframe that is before or after a specified date_threshold.
+    Filter the portion of a dataframe that is before or after a specified date_threshold,
+    or between date_threshold and date_threshold_end.
     """
     if filter_params.do_filtering is False:
         return df
@@ -35,6 +69,16 @@ def filter_df_by_date(df: pd.DataFrame, filter_params: FilterParams) -> pd.DataF
         raise ValueError(
             f"filter_df_by_date: do_filtering is {filter_params.do_filtering}, so date_threshold can't be None"
         )
-    if filter_params.remaining_part.value == "after":
-        return df.loc[df.index >= filter_params.date_threshold]
-    return df.loc[df.index < filter_params.date_threshold]
+    if filter_params.remaining_part == RemainingPart.AFTER:
+        return slice_df_by_dates(df=df, start=filter_params.date_threshold)
+    if filter_params.remaining_part == RemainingPart.BEFORE:
+        return slice_df_by_dates(df=df, end=filter_params.date_threshold)
+    if filter_params.date_threshold_end is None:
+        raise ValueError(
+            f"filter_df_by_date: remaining_part is {filter_params.remaining_part}, so date_threshold_end can't be None"
+        )
+    return slice_df_by_dates(
+        df=df,
+        start=filter_params.date_threshold,
+        end=filter_params.date_threshold_end,
+    )
@@ -3,6 +3,7 @@ from typing import Callable
 import pandas as pd
 
 from features.f_v1_basic import add_features_v1_basic
+from utils.misc import get_df_copy
 
 
 def get_df_with_fwd_ret(
@@ -17,8 +18,9 @@ def get_df_with_fwd_ret(
     1. Call add_features_forecasts_func.
     2. Add new column containing forward Close-Close return - ret_{str(num_days)}.
     """
-    res = ohlc_df.copy()
-    res = add_features_forecasts_func(df=res)
+    # add_features_forecasts_func returns a new DataFrame,
+    # so there is no need to copy ohlc_df here
+    res = add_features_forecasts_func(df=ohlc_df)
     res[f"Close_fwd_{str(num_days)}"] = res["Close"].shift(-num_days)
     res[f"ret_{str(num_days)}"] = (
         (res[f"Close_fwd_{str(num_days)}"] - res["Close"]) / res["Close"]
@@ -29,7 +31,7 @@ def get_df_with_fwd_ret(
 
 
 def add_fwd_ret(ohlc_df: pd.DataFrame, num_days: int = 24) -> pd.DataFrame:
-    res = ohlc_df.copy()
+    res = get_df_copy(ohlc_df)
     res[f"Close_fwd_{str(num_days)}"] = res["Close"].shift(-num_days)
     res[f"fwd_ret_{num_days}"] = (
         (res[f"Close_fwd_{str(num_days)}"] - res["Close"]) / res["Close"]
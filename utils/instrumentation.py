@@ -0,0 +1,191 @@
+import contextlib
+import functools
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterator, List, Optional
+
+import pandas as pd
+
+# NOTE Instrumentation is off by default.
+# When it's off, span() and instrumented() cost one boolean check,
+# so the stages may stay wrapped in production code.
+# Switch it on with enable_instrumentation() at the start of a runner script.
+
+
+@dataclass
+class SpanRecord:
+    stage: str
+    ticker: Optional[str]
+    wall_seconds: float
+    cpu_seconds: float
+
+    # Peak of memory allocated by Python during the span
+    # above the memory allocated at its start, None if memory is not traced
+    peak_memory_mb: Optional[float]
+
+
+@dataclass
+class _OpenSpan:
+    start_memory: int
+    peak_memory: int
+
+
+_enabled = False
+_trace_memory = False
+_records: List[SpanRecord] = list()
+_open_spans: List[_OpenSpan] = list()
+
+
+def enable_instrumentation(trace_memory: bool = True) -> None:
+    """
+    Start recording spans.
+    Tracing memory with tracemalloc makes Python code noticeably slower,
+    so wall time and CPU time are more accurate with trace_memory=False.
+    """
+    global _enabled, _trace_memory  # pylint: disable=W0603
+    _enabled = True
+    _trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable_instrumentation() -> None:
+    global _enabled, _trace_memory  # pylint: disable=W0603
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _enabled = False
+    _trace_memory = False
+
+
+def is_instrumentation_enabled() -> bool:
+    return _enabled
+
+
+def reset_instrumentation() -> None:
+    _records.clear()
+    _open_spans.clear()
+
+
+def _enter_memory_span() -> None:
+    current, peak = tracemalloc.get_traced_memory()
+
+    # NOTE tracemalloc has a single peak counter.
+    # Before resetting it for the new span,
+    # pass the peak reached so far to the enclosing span.
+    if _open_spans:
+        _open_spans[-1].peak_memory = max(_open_spans[-1].peak_memory, peak)
+    tracemalloc.reset_peak()
+    _open_spans.append(_OpenSpan(start_memory=current, peak_memory=current))
+
+
+def _exit_memory_span() -> float:
+    _, peak = tracemalloc.get_traced_memory()
+    open_span = _open_spans.pop()
+    peak = max(open_span.peak_memory, peak)
+    if _open_spans:
+        _open_spans[-1].peak_memory = max(_open_spans[-1].peak_memory, peak)
+    return round((peak - open_span.start_memory) / 2**20, 3)
+
+
+@contextlib.contextmanager
+def span(stage: str, ticker: Optional[str] = None) -> Iterator[None]:
+    """
+    Record wall time, CPU time, and peak memory of the code block
+    as a span of the given stage, e.g.
+        with span(stage="backtest_run", ticker=ticker):
+            stats = bt.run()
+    Spans may be nested.
+    """
+    if not _enabled:
+        yield
+        return
+
+    trace_memory = _trace_memory and tracemalloc.is_tracing()
+    if trace_memory:
+        _enter_memory_span()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = time.process_time() - cpu_start
+        peak_memory_mb = _exit_memory_span() if trace_memory else None
+        _records.append(
+            SpanRecord(
+                stage=stage,
+                ticker=ticker,
+                wall_seconds=round(wall_seconds, 6),
+                cpu_seconds=round(cpu_seconds, 6),
+                peak_memory_mb=peak_memory_mb,
+            )
+        )
+
+
+def instrumented(stage: str) -> Callable:
+    """
+    Decorator that records every call of the function as a span.
+    If the function is called with the ticker keyword argument,
+    it is saved in the span.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(stage=stage, ticker=kwargs.get("ticker")):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_span_records() -> pd.DataFrame:
+    return pd.DataFrame(
+        [asdict(record) for record in _records],
+        columns=list(SpanRecord.__dataclass_fields__),
+    )
+
+
+def get_instrumentation_summary(by_ticker: bool = False) -> pd.DataFrame:
+    """
+    Aggregate the recorded spans by stage,
+    or by stage and ticker if by_ticker is True.
+    The stages are sorted by total wall time, the slowest first.
+    """
+    group_cols = ["stage", "ticker"] if by_ticker else ["stage"]
+    records = get_span_records()
+    summary = records.groupby(group_cols, dropna=False).agg(
+        calls=("wall_seconds", "size"),
+        wall_seconds_total=("wall_seconds", "sum"),
+        wall_seconds_max=("wall_seconds", "max"),
+        cpu_seconds_total=("cpu_seconds", "sum"),
+        peak_memory_mb_max=("peak_memory_mb", "max"),
+    )
+    return summary.sort_values("wall_seconds_total", ascending=False).reset_index()
+
+
+def report_instrumentation(file_name_prefix: str = "instrumentation") -> None:
+    """
+    1. Print the summary table by stage.
+    2. Save the summary by stage and ticker to {file_name_prefix}_summary.csv.
+    3. Save all spans to {file_name_prefix}_spans.json.
+    """
+    if not _records:
+        print("report_instrumentation: no spans recorded", file=sys.stderr)
+        return
+    print(get_instrumentation_summary().to_string(index=False), file=sys.stderr)
+    get_instrumentation_summary(by_ticker=True).to_csv(
+        f"{file_name_prefix}_summary.csv", index=False
+    )
+    with open(f"{file_name_prefix}_spans.json", "w", encoding="UTF-8") as f:
+        json.dump([asdict(record) for record in _records], f, indent=2)
+    print(
+        f"Saved {file_name_prefix}_summary.csv and {file_name_prefix}_spans.json",
+        file=sys.stderr,
+    )
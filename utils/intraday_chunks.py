@@ -0,0 +1,104 @@
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from derivative_columns.initial_balance import (
+    add_col_ib_high_low,
+    check_initial_balance_breach,
+    get_day_codes,
+)
+
+from .results_writer import ResultsWriter
+
+# NOTE These functions process intraday data
+# that is too large to fit in memory at once,
+# e.g. 5-minute bars for many years.
+# The raw data file is read in pieces of rows_per_read rows.
+# The pieces are regrouped into chunks of whole trading days,
+# because the Initial Balance columns are calculated day by day
+# and a day split between two chunks would give wrong values.
+# Peak memory is bounded by the chunk size, not by the history length.
+
+# The Initial Balance is calculated by the calendar days of the exchange
+EXCHANGE_TZ = "America/New_York"
+
+
+def iter_whole_day_chunks(
+    file_path: str,
+    days_per_chunk: int = 20,
+    rows_per_read: int = 50_000,
+    tz: Optional[str] = EXCHANGE_TZ,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read the CSV file with intraday OHLC data piece by piece
+    and yield DataFrames containing days_per_chunk whole trading days each.
+    The last chunk may contain fewer days.
+    The file must be sorted by time, the first column is the DateTime index.
+    The timestamps must have UTC offsets, like the Yahoo Finance data,
+    they are converted to the timezone tz.
+    If the timestamps are naive local times, pass tz=None.
+    """
+    if days_per_chunk < 1:
+        raise ValueError(
+            f"iter_whole_day_chunks: {days_per_chunk=}, should be at least 1"
+        )
+    buffer: Optional[pd.DataFrame] = None
+    reader = pd.read_csv(file_path, index_col=0, chunksize=rows_per_read)
+    for piece in reader:
+        # NOTE If the file spans a DST change, the UTC offsets differ
+        # and parse_dates would give an Index of objects, not a DatetimeIndex
+        if tz is None:
+            piece.index = pd.to_datetime(piece.index)
+        else:
+            piece.index = pd.to_datetime(piece.index, utc=True).tz_convert(tz)
+        buffer = piece if buffer is None else pd.concat([buffer, piece])
+        day_codes = get_day_codes(index=buffer.index)  # type: ignore
+
+        # NOTE The last day of the buffer may continue in the next piece,
+        # so only the days before it are complete.
+        day_starts = (day_codes[1:] != day_codes[:-1]).nonzero()[0] + 1
+        complete_days_count = len(day_starts)
+        while complete_days_count >= days_per_chunk:
+            chunk_end = day_starts[days_per_chunk - 1]
+            yield buffer.iloc[:chunk_end]
+            buffer = buffer.iloc[chunk_end:]
+            day_starts = day_starts[days_per_chunk:] - chunk_end
+            complete_days_count = complete_days_count - days_per_chunk
+
+    if buffer is not None and not buffer.empty:
+        yield buffer
+
+
+def add_ib_columns_to_intraday_file(
+    src_csv_path: str,
+    dst_parquet_path: str,
+    initial_balance_minutes: int = 30,
+    days_per_chunk: int = 20,
+    rows_per_read: int = 50_000,
+    tz: Optional[str] = EXCHANGE_TZ,
+) -> int:
+    """
+    1. Stream the raw intraday CSV file in chunks of whole trading days.
+    2. For every chunk, add the columns ib_high, ib_low, ib_low_bd, and ib_high_bt.
+    3. Append the chunk to the Parquet file dst_parquet_path.
+    4. Return the total number of rows written.
+
+    The result is the same as calling add_col_ib_high_low
+    and check_initial_balance_breach for the whole file at once.
+    For tz, see iter_whole_day_chunks.
+    """
+    with ResultsWriter(file_path=dst_parquet_path) as writer:
+        for chunk in iter_whole_day_chunks(
+            file_path=src_csv_path,
+            days_per_chunk=days_per_chunk,
+            rows_per_read=rows_per_read,
+            tz=tz,
+        ):
+            res = add_col_ib_high_low(
+                df=chunk, initial_balance_minutes=initial_balance_minutes
+            )
+            res = check_initial_balance_breach(
+                df=res, initial_balance_minutes=initial_balance_minutes
+            )
+            writer.append(df=res)
+    return writer.rows_written
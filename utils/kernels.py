@@ -0,0 +1,286 @@
+import os
+from enum import Enum
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# NOTE Some calculations are loops where every step depends on the previous one,
+# e.g., swing detection or a trailing stop-loss, so they can't be vectorized.
+# They are written here as plain Python loops over numpy arrays
+# in the subset of Python that numba compiles.
+# If numba is installed, get_kernel returns the compiled version,
+# otherwise the Python one. Both must return the same results,
+# see tests/misc/test_kernels.py.
+# The environment variable kernel_backend set to python or numba
+# overrides the automatic choice.
+# If a loop can also be vectorized with numpy, the vectorized version
+# is registered as the Python implementation of the kernel,
+# because a pure Python loop would be slower than the code it replaced.
+
+try:
+    import numba  # pylint: disable=E0401
+except ImportError:
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+
+
+class KernelBackend(Enum):
+    PYTHON = "python"
+    NUMBA = "numba"
+
+
+KERNELS: Dict[str, Callable] = dict()
+_python_implementations: Dict[str, Callable] = dict()
+_compiled_kernels: Dict[str, Callable] = dict()
+
+
+def register_kernel(func: Callable) -> Callable:
+    """
+    Decorator, add the function to KERNELS under its name
+    """
+    KERNELS[func.__name__] = func
+    return func
+
+
+def register_python_implementation(name: str) -> Callable:
+    """
+    Decorator, get_kernel returns the function instead of the kernel name
+    when numba is not used. It must return the same results as the kernel.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        _python_implementations[name] = func
+        return func
+
+    return decorator
+
+
+def get_default_kernel_backend() -> KernelBackend:
+    backend = os.environ.get("kernel_backend")
+    if backend is not None:
+        return KernelBackend(backend)
+    return KernelBackend.NUMBA if NUMBA_AVAILABLE else KernelBackend.PYTHON
+
+
+def get_kernel(name: str, backend: Optional[KernelBackend] = None) -> Callable:
+    """
+    Return the kernel compiled by numba or its Python version,
+    by default see get_default_kernel_backend
+    """
+    if name not in KERNELS:
+        raise ValueError(f"get_kernel: unknown kernel {name}, see KERNELS")
+    if backend is None:
+        backend = get_default_kernel_backend()
+    if backend == KernelBackend.PYTHON:
+        return _python_implementations.get(name, KERNELS[name])
+    if not NUMBA_AVAILABLE:
+        raise ImportError("get_kernel: numba is not installed, run pip install numba")
+    if name not in _compiled_kernels:
+        _compiled_kernels[name] = numba.njit(cache=True)(KERNELS[name])
+    return _compiled_kernels[name]
+
+
+@register_kernel
+def swing_extrema(
+    values: np.ndarray,
+    thresholds: np.ndarray,
+    start: int,
+    detect_max: bool,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return Boolean arrays is_min and is_max of the extremums found from start.
+    A maximum is found when the value has moved downwards from it
+    by more than the threshold, a minimum - upwards.
+    detect_max - whether the first extremum to detect is a maximum.
+    NaN thresholds never confirm an extremum.
+    """
+    count = len(values)
+    is_min = np.zeros(count, dtype=np.bool_)
+    is_max = np.zeros(count, dtype=np.bool_)
+    if start >= count:
+        return is_min, is_max
+    candidate = start
+    candidate_val = values[start]
+    for i in range(start, count):
+        value = values[i]
+        if detect_max:
+            if value >= candidate_val:
+                candidate_val = value
+                candidate = i
+            elif (candidate_val - value) > thresholds[i]:
+                is_max[candidate] = True
+                detect_max = False
+                candidate = i
+                candidate_val = value
+        else:
+            if value <= candidate_val:
+                candidate_val = value
+                candidate = i
+            elif (value - candidate_val) > thresholds[i]:
+                is_min[candidate] = True
+                detect_max = True
+                candidate = i
+                candidate_val = value
+    return is_min, is_max
+
+
+@register_kernel
+def first_breach_per_day(
+    day_codes: np.ndarray,
+    close: np.ndarray,
+    ib_low: np.ndarray,
+    ib_high: np.ndarray,
+    post_ib: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return Boolean arrays of the first bar of every day
+    with Close below ib_low and of the first bar with Close above ib_high,
+    only the bars where post_ib is True are considered.
+    The bars of every day must be consecutive.
+    """
+    count = len(close)
+    breakdown = np.zeros(count, dtype=np.bool_)
+    breakout = np.zeros(count, dtype=np.bool_)
+    breakdown_found = False
+    breakout_found = False
+    for i in range(count):
+        if i == 0 or day_codes[i] != day_codes[i - 1]:
+            breakdown_found = False
+            breakout_found = False
+        if not post_ib[i]:
+            continue
+        if not breakdown_found and close[i] < ib_low[i]:
+            breakdown[i] = True
+            breakdown_found = True
+        if not breakout_found and close[i] > ib_high[i]:
+            breakout[i] = True
+            breakout_found = True
+    return breakdown, breakout
+
+
+def _first_true_per_day(is_true: np.ndarray, day_starts: np.ndarray) -> np.ndarray:
+    counts = np.cumsum(is_true)
+    positions = np.arange(len(is_true))
+    start_of_day = np.maximum.accumulate(np.where(day_starts, positions, 0))
+    # NOTE The running count of True values within the day
+    counts_in_day = counts - counts[start_of_day] + is_true[start_of_day]
+    return is_true & (counts_in_day == 1)
+
+
+@register_python_implementation("first_breach_per_day")
+def first_breach_per_day_vectorized(
+    day_codes: np.ndarray,
+    close: np.ndarray,
+    ib_low: np.ndarray,
+    ib_high: np.ndarray,
+    post_ib: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The same as first_breach_per_day, with running counts
+    of the breaches within every day instead of the loop
+    """
+    day_starts = np.ones(len(close), dtype=bool)
+    day_starts[1:] = day_codes[1:] != day_codes[:-1]
+    breakdown = _first_true_per_day(
+        is_true=(close < ib_low) & post_ib, day_starts=day_starts
+    )
+    breakout = _first_true_per_day(
+        is_true=(close > ib_high) & post_ib, day_starts=day_starts
+    )
+    return breakdown, breakout
+
+
+# NOTE trailing_stop_exits backs the standalone analysis tool
+# simulate_trade_exits, the backtests don't use it, see utils/trade_exits.py
+
+
+@register_kernel
+def trailing_stop_exits(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    atr: np.ndarray,
+    tr_delta: np.ndarray,
+    day_numbers: np.ndarray,
+    entry_bars: np.ndarray,
+    is_long: np.ndarray,
+    profit_target_pcts: np.ndarray,
+    max_durations: np.ndarray,
+    n_atr: float,
+    spike_tr_delta: float,
+    spike_n_atr: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For every trade entered at the Open of its entry bar,
+    return the exit bar and the exit price under the rules
+    of update_stop_losses, the profit targets, and process_max_duration.
+    At the end of every bar, the stop-loss trails at n_atr ATR from the Open,
+    spike_n_atr ATR after a volatility spike (tr_delta > spike_tr_delta)
+    if the trade is profitable.
+    The profit target is set at the end of the entry bar.
+    If the trade lasts more than its max duration in days,
+    it is closed at the next Open.
+    NaN profit target or max duration - no such rule for the trade.
+    Exit bar -1 - the trade is still open at the last bar.
+    """
+    count = len(open_)
+    exit_bars = np.full(len(entry_bars), -1, dtype=np.int64)
+    exit_prices = np.full(len(entry_bars), np.nan)
+    for k in range(len(entry_bars)):
+        entry = entry_bars[k]
+        long = is_long[k]
+        entry_price = open_[entry]
+        profit_target_pct = profit_target_pcts[k]
+        max_duration = max_durations[k]
+        sl = np.nan
+        tp = np.nan
+        close_at_open = False
+        for i in range(entry, count):
+            # fills during the bar, with the stops set at the end of the previous one
+            if close_at_open:
+                exit_bars[k] = i
+                exit_prices[k] = open_[i]
+                break
+            if long:
+                if low[i] <= sl:
+                    exit_bars[k] = i
+                    exit_prices[k] = min(open_[i], sl)
+                    break
+                if high[i] >= tp:
+                    exit_bars[k] = i
+                    exit_prices[k] = max(open_[i], tp)
+                    break
+            else:
+                if high[i] >= sl:
+                    exit_bars[k] = i
+                    exit_prices[k] = max(open_[i], sl)
+                    break
+                if low[i] <= tp:
+                    exit_bars[k] = i
+                    exit_prices[k] = min(open_[i], tp)
+                    break
+
+            # the end of the bar
+            is_profitable = close[i] > entry_price if long else close[i] < entry_price
+            trade_n_atr = n_atr
+            if tr_delta[i] > spike_tr_delta and is_profitable:
+                trade_n_atr = spike_n_atr
+            if long:
+                new_sl = open_[i] - atr[i] * trade_n_atr
+                if np.isnan(sl) or new_sl > sl:
+                    if new_sl > 0:
+                        sl = new_sl
+            else:
+                new_sl = open_[i] + atr[i] * trade_n_atr
+                if np.isnan(sl) or new_sl < sl:
+                    sl = new_sl
+            if i == entry and not np.isnan(profit_target_pct):
+                if long:
+                    tp = (100 + profit_target_pct) / 100 * open_[i]
+                else:
+                    tp = (100 - profit_target_pct) / 100 * open_[i]
+            if not np.isnan(max_duration) and day_numbers[i] - day_numbers[entry] > max_duration:
+                close_at_open = True
+    return exit_bars, exit_prices
@@ -7,6 +7,7 @@ import pandas as pd
 from derivative_columns.atr import add_tr_delta_col_to_ohlc
 
 from .import_data import get_local_ticker_data_file_name, import_alpha_vantage_daily
+from .instrumentation import span
 
 MUST_HAVE_DERIVATIVE_COLUMNS: Set[str] = {"tr", "tr_delta"}
 
@@ -60,15 +61,18 @@ class TickersData:
 
             self.tickers_data_with_features[ticker] = df
 
-    def _read_raw_data_from_xlsx(self) -> Optional[pd.DataFrame]:
+    def _read_raw_data_from_xlsx(self, ticker: str) -> Optional[pd.DataFrame]:
         if os.path.exists(self.filename_raw) and os.path.getsize(self.filename_raw) > 0:
-            df = pd.read_excel(self.filename_raw, index_col=0)
+            with span(stage="read_xlsx", ticker=ticker):
+                df = pd.read_excel(self.filename_raw, index_col=0)
             df = df[["Open", "High", "Low", "Close", "Volume"]]
-            df = self.add_feature_cols_func(df=df)
+            with span(stage="add_features", ticker=ticker):
+                df = self.add_feature_cols_func(df=df)
 
             # save cache files only if they will be used later
             if not self.recreate_columns_every_time:
-                df.to_excel(self.filename_with_features)
+                with span(stage="write_xlsx", ticker=ticker):
+                    df.to_excel(self.filename_with_features)
                 print(f"Saved {self.filename_with_features} - OK")
 
             print(f"Reading {self.filename_raw} - OK")
@@ -86,15 +90,19 @@ class TickersData:
             f"Running {self.import_ohlc_func.__name__} for {ticker=}...",
             file=sys.stderr,
         )
-        df = self.import_ohlc_func(ticker=ticker)
+        with span(stage="import_ohlc", ticker=ticker):
+            df = self.import_ohlc_func(ticker=ticker)
         if df is None or not isinstance(df, pd.DataFrame) or df.empty:
             error_msg = f"get_df_with_features: failed call of {self.import_ohlc_func} for {ticker=}, returned {df=}"  # pylint: disable=C0301
             raise RuntimeError(error_msg)
-        df.to_excel(self.filename_raw)
+        with span(stage="write_xlsx", ticker=ticker):
+            df.to_excel(self.filename_raw)
         print(f"Saved {self.filename_raw} - OK")
-        df = self.add_feature_cols_func(df=df)
+        with span(stage="add_features", ticker=ticker):
+            df = self.add_feature_cols_func(df=df)
         if not self.recreate_columns_every_time:
-            df.to_excel(self.filename_with_features)
+            with span(stage="write_xlsx", ticker=ticker):
+                df.to_excel(self.filename_with_features)
             print(f"Saved {self.filename_with_features} - OK")
         return df
 
@@ -132,7 +140,8 @@ class TickersData:
                 os.path.exists(self.filename_with_features)
                 and os.path.getsize(self.filename_with_features) > 0
             ):
-                df = pd.read_excel(self.filename_with_features, index_col=0)
+                with span(stage="read_xlsx", ticker=ticker):
+                    df = pd.read_excel(self.filename_with_features, index_col=0)
                 print(f"Reading {self.filename_with_features} - OK")
                 return df
 
@@ -142,7 +151,7 @@ class TickersData:
         self.filename_raw = get_local_ticker_data_file_name(
             ticker=ticker, data_type="raw"
         )
-        res = self._read_raw_data_from_xlsx()
+        res = self._read_raw_data_from_xlsx(ticker=ticker)
         if res is not None:
             return res
 
@@ -1,8 +1,45 @@
 import inspect
 from typing import Callable
 
+import numpy as np
 import pandas as pd
 
+# NOTE Since pandas 3.0, Copy-on-Write is the only available mode
+PANDAS_COW_ALWAYS_ON = int(pd.__version__.split(".", maxsplit=1)[0]) >= 3
+
+
+def set_copy_on_write_mode(enabled: bool = True) -> None:
+    """
+    Switch pandas Copy-on-Write (CoW) mode on or off for the whole process.
+
+    In CoW mode, the get_df_copy function returns lazy shallow copies,
+    so the functions that add derived columns and features
+    no longer copy the full DataFrame every time they are called.
+    See also benchmarks/memory_copy_on_write.py.
+    """
+    if PANDAS_COW_ALWAYS_ON:
+        return
+    pd.set_option("mode.copy_on_write", enabled)
+
+
+def is_copy_on_write_enabled() -> bool:
+    if PANDAS_COW_ALWAYS_ON:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+
+def get_df_copy(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a copy of df that the caller may modify
+    without changing the input DataFrame.
+
+    If Copy-on-Write mode is on, it is a shallow copy.
+    pandas copies the data of a column only if the caller modifies it,
+    and adding new columns doesn't copy anything.
+    Otherwise, it is a deep copy, as before.
+    """
+    return df.copy(deep=not is_copy_on_write_enabled())
+
 
 def ensure_df_has_all_required_columns(
     df: pd.DataFrame, volume_col_required: bool = False
@@ -23,7 +60,7 @@ def ensure_df_has_all_required_columns(
 def add_z_score_col_to_df(
     df: pd.DataFrame, col_name: str, window: int = 100
 ) -> pd.DataFrame:
-    df_internal = df.copy(deep=True)
+    df_internal = get_df_copy(df)
     col_mean = df[col_name].rolling(window=window, min_periods=window).mean()
     col_std = df[col_name].rolling(window=window, min_periods=window).std()
     df_internal[f"{col_name}_z_sc"] = (df[col_name] - col_mean) / col_std
@@ -48,7 +85,7 @@ def add_feature_group_col_to_df(
     # NOTE get_label_for_group example - see functions
     # get_group_label_forecast_bb and get_group_label_tr_delta
 
-    res = df.copy()
+    res = get_df_copy(df)
     res[new_col_name] = res[continuous_feature_col_name].apply(get_label_for_group)
     return res
 
@@ -60,7 +97,8 @@ def get_forecast_bb(df: pd.DataFrame) -> pd.Series:
 def check_df_format(df: pd.DataFrame) -> dict:
     """
     Checks if a Pandas DataFrame has a DatetimeIndex
-    and determines the bar interval in minutes.
+    and determines the bar interval in minutes
+    as the most frequent difference between consecutive timestamps.
 
     Args:
         df: The input Pandas DataFrame.
@@ -79,9 +117,19 @@ def check_df_format(df: pd.DataFrame) -> dict:
 
     # 2. Check the bar interval (frequency)
     if is_dt_index and len(df) >= 2:
-        # Calculate the difference between the first two timestamps
-        inferred_diff_minutes = (df.index[1] - df.index[0]).total_seconds() / 60.0
-        inferred_diff_minutes = int(inferred_diff_minutes)
-        results["inferred_interval_minutes"] = inferred_diff_minutes
+        # NOTE The difference between the first two timestamps is not enough:
+        # a missing bar, a session gap, or a chunk that starts at the end of a day
+        # would give a wrong interval. So take the most frequent difference
+        # between consecutive timestamps.
+        # NOTE The index resolution may be s, ms, us or ns,
+        # so the diffs are cast to timedelta64[s] before they are compared
+        diffs_seconds = (
+            np.diff(df.index.values).astype("timedelta64[s]").astype(np.int64)
+        )
+        diffs_seconds = diffs_seconds[diffs_seconds > 0]
+        if diffs_seconds.size > 0:
+            values, counts = np.unique(diffs_seconds, return_counts=True)
+            inferred_diff_minutes = int(values[np.argmax(counts)] / 60.0)
+            results["inferred_interval_minutes"] = inferred_diff_minutes
 
     return results
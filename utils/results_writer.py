@@ -0,0 +1,191 @@
+import os
+from enum import Enum
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+# NOTE Excel files are slow to write, and pandas can't append to them,
+# so every update rewrites the whole file.
+# ResultsWriter appends DataFrames to Parquet, Feather, or CSV files instead.
+# An Excel copy of the results can be rendered once, when writing is finished.
+
+
+class ResultsFormat(Enum):
+    """
+    The value is the file extension
+    """
+
+    EXCEL = "xlsx"
+    PARQUET = "parquet"
+    FEATHER = "feather"
+    CSV = "csv"
+
+
+def _import_pyarrow(file_path: str):
+    try:
+        import pyarrow as pa  # pylint: disable=C0415
+    except ImportError as e:
+        raise ImportError(
+            f"ResultsWriter: pyarrow is required to write {file_path}, run pip install pyarrow"
+        ) from e
+    return pa
+
+
+class ResultsWriter:
+    """
+    Append DataFrames with the same columns to one results file.
+    The format is determined by the file extension,
+    see ResultsFormat.
+
+    CSV files are complete after every append,
+    so they survive interrupted runs.
+    Parquet and Feather files are complete after close().
+    Excel files are written once, in close().
+
+    If render_excel is True, close() also saves the results
+    to an Excel file with the same name and the .xlsx extension.
+
+    Empty DataFrames are skipped, their column types may differ
+    from those of the real data. If all DataFrames are empty,
+    close() writes the first of them, so the file has the columns.
+
+    Usage:
+        with ResultsWriter(file_path="all_trades.parquet") as writer:
+            for ticker in tickers:
+                writer.append(df=trades_df)
+    """
+
+    def __init__(
+        self, file_path: str, write_index: bool = True, render_excel: bool = False
+    ):
+        suffix = Path(file_path).suffix.lstrip(".")
+        try:
+            self.results_format = ResultsFormat(suffix)
+        except ValueError as e:
+            raise ValueError(
+                f"ResultsWriter: unsupported extension of {file_path=}, should be one of {[f.value for f in ResultsFormat]}"
+            ) from e
+        self.file_path = file_path
+        self.write_index = write_index
+        self.render_excel = render_excel
+        self.rows_written = 0
+        self._first_empty_df: Optional[pd.DataFrame] = None
+        self._arrow_writer = None
+        self._arrow_schema = None
+        self._excel_parts: List[pd.DataFrame] = list()
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def append(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            if self._first_empty_df is None:
+                self._first_empty_df = df
+            return
+        self._write(df=df)
+
+    def _write(self, df: pd.DataFrame) -> None:
+        if self.results_format == ResultsFormat.EXCEL:
+            self._excel_parts.append(df)
+        elif self.results_format == ResultsFormat.CSV:
+            df.to_csv(
+                self.file_path,
+                mode="a",
+                header=self.rows_written == 0,
+                index=self.write_index,
+            )
+        else:
+            self._append_arrow(df=df)
+        self.rows_written = self.rows_written + len(df)
+
+    def _append_arrow(self, df: pd.DataFrame) -> None:
+        pa = _import_pyarrow(file_path=self.file_path)
+        if self.results_format == ResultsFormat.FEATHER and self.write_index:
+            # NOTE Feather doesn't store the index, so store it as a column
+            df = df.reset_index()
+        table = pa.Table.from_pandas(
+            df,
+            preserve_index=(
+                self.write_index and self.results_format == ResultsFormat.PARQUET
+            ),
+        )
+        if self._arrow_writer is None:
+            self._arrow_schema = table.schema
+            if self.results_format == ResultsFormat.PARQUET:
+                import pyarrow.parquet as pq  # pylint: disable=C0415
+
+                self._arrow_writer = pq.ParquetWriter(
+                    self.file_path, schema=self._arrow_schema
+                )
+            else:
+                self._arrow_writer = pa.ipc.new_file(
+                    self.file_path, schema=self._arrow_schema
+                )
+        # NOTE the later DataFrames may get slightly different inferred types,
+        # e.g., int64 instead of double if a column has no NaN
+        self._arrow_writer.write_table(table.cast(self._arrow_schema))
+
+    def close(self) -> None:
+        if self.rows_written == 0 and self._first_empty_df is not None:
+            self._write(df=self._first_empty_df)
+            self._first_empty_df = None
+        if self._arrow_writer is not None:
+            self._arrow_writer.close()
+            self._arrow_writer = None
+        if self.results_format == ResultsFormat.EXCEL and self._excel_parts:
+            pd.concat(self._excel_parts).to_excel(
+                self.file_path, index=self.write_index
+            )
+            self._excel_parts = list()
+        if (
+            self.render_excel
+            and self.results_format != ResultsFormat.EXCEL
+            and self.rows_written > 0
+        ):
+            render_results_to_excel(
+                file_path=self.file_path, write_index=self.write_index
+            )
+
+
+def read_results(file_path: str, write_index: bool = True) -> pd.DataFrame:
+    """
+    Read the file written by ResultsWriter
+    """
+    results_format = ResultsFormat(Path(file_path).suffix.lstrip("."))
+    if results_format == ResultsFormat.PARQUET:
+        return pd.read_parquet(file_path)
+    if results_format == ResultsFormat.FEATHER:
+        df = pd.read_feather(file_path)
+        return df.set_index(df.columns[0]) if write_index else df
+    if results_format == ResultsFormat.CSV:
+        return pd.read_csv(file_path, index_col=0 if write_index else None)
+    return pd.read_excel(file_path, index_col=0 if write_index else None)
+
+
+def render_results_to_excel(
+    file_path: str, write_index: bool = True, excel_file_path: Optional[str] = None
+) -> str:
+    """
+    Save the results file to Excel, by default next to it with the .xlsx extension.
+    Return the Excel file path.
+    """
+    if excel_file_path is None:
+        excel_file_path = str(Path(file_path).with_suffix(".xlsx"))
+    read_results(file_path=file_path, write_index=write_index).to_excel(
+        excel_file_path, index=write_index
+    )
+    return excel_file_path
+
+
+def write_results(df: pd.DataFrame, file_path: str, write_index: bool = True) -> None:
+    """
+    Write the whole DataFrame at once
+    """
+    with ResultsWriter(file_path=file_path, write_index=write_index) as writer:
+        writer.append(df=df)
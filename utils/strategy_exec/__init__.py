@@ -1,4 +1,5 @@
 from .adjust_position import adjust_position
+from .desired_size_array import reconcile_desired_size
 from .last_day import create_last_day_results, process_last_day_res
 from .misc import all_current_trades_info, log_initial_data_for_today
 from .sl_pt import (
@@ -6,4 +7,10 @@ from .sl_pt import (
     check_set_profit_targets_short_trades,
     update_stop_losses,
 )
-from .special_situations import process_special_situations
+from .special_situations import (
+    SPECIAL_SITUATION_HANDLERS,
+    SpecialSituation,
+    get_special_situation_masks,
+    process_special_situations,
+)
+from .trade_book import TradeBook, get_trade_book
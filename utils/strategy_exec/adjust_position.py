@@ -7,10 +7,10 @@ from constants import (
     ACTION_DO_NOTHING,
     ACTION_SELL,
     ACTION_SHARE_COUNT_0,
-    CLOSED_SIDE_CHANGE,
 )
 
 from .misc import get_shares_count, log_all_trades
+from .trade_tags import TradeTag, add_trade_tag
 
 
 def adjust_position(
@@ -41,8 +41,7 @@ def adjust_position(
     # Log it in their tags.
     if (desired_size * current_position_size) < 0:
         for trade in strategy.trades:
-            attr = f"_{trade.__class__.__qualname__}__tag"
-            setattr(trade, attr, (trade.tag or "") + CLOSED_SIDE_CHANGE)
+            add_trade_tag(trade=trade, tag=TradeTag.CLOSED_SIDE_CHANGE)
 
     # NOTE better don't try to simplify it
     # because it may lead to errors and wrong results
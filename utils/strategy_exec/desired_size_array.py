@@ -0,0 +1,36 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from backtesting import Strategy
+
+from constants import DPS_ARRAY
+
+from .misc import get_current_position_size
+
+
+def reconcile_desired_size(
+    strategy: Strategy, desired_sizes: np.ndarray, rebalance_same_side: bool = False
+) -> Tuple[Optional[float], float, str]:
+    """
+    The per-bar counterpart of get_desired_position_size_array,
+    returns the same as get_desired_current_position_size.
+    desired_sizes[i] is the desired position size at the bar i, NaN - do nothing.
+    If rebalance_same_side is False and the current position
+    is on the same side as the desired one, keep the current position,
+    e.g., don't buy more shares after the price went down.
+    """
+    current_position_size = (
+        get_current_position_size(
+            shares_count=strategy.position.size,
+            equity=strategy.equity,
+            last_price=strategy._data.Open[-1],  # pylint: disable=W0212
+        )
+        if strategy.position.size != 0
+        else 0
+    )
+    desired_size = desired_sizes[len(strategy.data) - 1]
+    if np.isnan(desired_size):
+        return None, current_position_size, DPS_ARRAY
+    if not rebalance_same_side and desired_size * current_position_size > 0:
+        return current_position_size, current_position_size, DPS_ARRAY
+    return float(desired_size), current_position_size, DPS_ARRAY
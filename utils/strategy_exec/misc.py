@@ -6,13 +6,15 @@ from typing import List, Optional
 from backtesting import Strategy
 from backtesting.backtesting import Trade
 
+from .trade_book import get_trade_book
+from .trade_tags import TradeTag, add_trade_tag, trade_tag_to_text
+
 
 def add_tag_to_trades_and_close_position(
-    strategy: Strategy, text_to_add: str, portion_to_close: float = 1.0
+    strategy: Strategy, tag_to_add: TradeTag, portion_to_close: float = 1.0
 ):
     for trade in strategy.trades:
-        attr = f"_{trade.__class__.__qualname__}__tag"
-        setattr(trade, attr, (trade.tag or "") + text_to_add)
+        add_trade_tag(trade=trade, tag=tag_to_add)
     strategy.position.close(portion=portion_to_close)
 
 
@@ -22,7 +24,7 @@ def trade_custom_repr(strategy: Strategy, trade: Trade):
     pl = round(trade.pl, 2)
     sl = round(trade.sl, 2) if trade.sl is not None else None
     tp = round(trade.tp, 2) if trade.tp is not None else None
-    tag = trade.tag if trade.tag is not None else ""
+    tag = trade_tag_to_text(trade.tag)
     return f"<Trade size={trade.size}, price={price}, pl={pl}, sl={sl}, tp={tp}, duration={duration} days, tag={tag}>"
 
 
@@ -47,16 +49,17 @@ def get_current_position_size(
 
 
 def all_current_trades_info(strategy: Strategy) -> Optional[List[dict]]:
-    if not strategy.trades:
+    book = get_trade_book(strategy=strategy)
+    if not book.trades:
         return None
     all_current_trades = list()
-    for trade in strategy.trades:
+    for trade in book.trades:
         all_current_trades.append(
             {
                 "size": trade.size,
                 "entry_time": trade.entry_time,
                 "entry_price": round(trade.entry_price, 2),
-                "tag": trade.tag,
+                "tag": trade_tag_to_text(trade.tag),
                 "pl": round(trade.pl, 2),
             }
         )
@@ -92,6 +95,9 @@ def get_shares_count(equity: float, position_size_delta: float, last_price: floa
 
 
 def log_initial_data_for_today(strategy: Strategy, ticker: str):
+    # NOTE the f-strings below are formatted even if they are not logged
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
     logging.debug(f"{ticker=}, today's date {strategy._data.index[-1]}")
     logging.debug(f"shares_count {strategy.position.size}")
     logging.debug(f"today's open price {strategy._data.Open[-1]}")
@@ -3,37 +3,20 @@ import math
 from typing import Optional
 
 from backtesting import Strategy
-from constants import TRADE_ALREADY_HALF_CLOSED
 
 from .misc import add_tag_to_trades_and_close_position
+from .trade_book import get_trade_book
+from .trade_tags import TradeTag, has_trade_tag
 
 
 def get_avg_sl_for_all_open_trades(strategy: Strategy) -> Optional[float]:
     """
-    Get average stop-loss for all open trades
+    Get average stop-loss for all open trades,
+    see TradeBook.refresh_stops
     """
-    res = 0.0
-    for trade in strategy.trades:
-
-        if not trade.sl or trade.sl <= 0:
-            logging.debug(
-                f"get_avg_stop_loss: {trade} - no trade.sl or trade.sl <= 0, return None"
-            )
-            return None
-
-        # check for abnormal situations
-        # if trade.is_long and trade.sl >= strategy._broker.last_price:
-        #     print(
-        #         f"get_avg_stop_loss: {trade} - trade.is_long and trade.sl >= self._broker.last_price, return None"
-        #     )
-        #     return None
-        # if trade.is_short and trade.sl <= strategy._broker.last_price:
-        #     print(
-        #         f"get_avg_stop_loss: {trade} - trade.is_short and trade.sl <= self._broker.last_price, return None"
-        #     )
-        #     return None
-
-        res += (abs(trade.size) / abs(strategy.position.size)) * trade.sl
+    res = get_trade_book(strategy=strategy).avg_sl
+    if res is None:
+        logging.debug("get_avg_stop_loss: no trade.sl or trade.sl <= 0, return None")
     return res
 
 
@@ -62,7 +45,7 @@ def process_partial_close(strategy: Strategy) -> bool:
     if strategy.position.pl < 0:
         return False
 
-    if strategy.trades[-1].tag and TRADE_ALREADY_HALF_CLOSED in strategy.trades[-1].tag:
+    if has_trade_tag(trade=strategy.trades[-1], tag=TradeTag.PARTIALLY_CLOSED):
         logging.debug("Trades already partially closed, do nothing else today...")
         return True
 
@@ -76,7 +59,7 @@ def process_partial_close(strategy: Strategy) -> bool:
         logging.debug("Here self.position.close partially")
         add_tag_to_trades_and_close_position(
             strategy=strategy,
-            text_to_add=TRADE_ALREADY_HALF_CLOSED,
+            tag_to_add=TradeTag.PARTIALLY_CLOSED,
             portion_to_close=0.5,
         )
         return True
@@ -2,27 +2,62 @@ from typing import Optional
 
 import numpy as np
 from backtesting import Strategy
+from backtesting.backtesting import Trade
 
-from constants import SL_TIGHTENED
+from .trade_book import TradeBook, get_trade_book
+from .trade_tags import TradeTag, add_trade_tag, has_trade_tag
 
 # sl_pt -> stop-losses and profit targets
 
+# If tr_delta is above SL_TIGHTEN_TR_DELTA and the trade is profitable,
+# the stop-loss is tightened to TIGHT_STOP_LOSS_ATR_MULTIPLIER ATR.
+# simulate_trade_exits uses the same values.
+# NOTE Not the same as VOLATILITY_SPIKE_TR_DELTA of special_situations.py,
+# above that threshold the trades are closed.
+SL_TIGHTEN_TR_DELTA = 1.98
+TIGHT_STOP_LOSS_ATR_MULTIPLIER = 1.1
 
-def _get_n_atr(strategy: Strategy) -> float:
+
+def get_n_atr(
+    strategy: Strategy, book: TradeBook, stop_loss_default_atr_multiplier: float
+) -> float:
     """
     Get ATR multiplier for stop-loss calculation.
     If volatility is high (tr_delta high)
     and current trade is profitable, tighten the stop-loss,
-    i.e lower ATR multiplier to 1.1.
+    i.e lower ATR multiplier to TIGHT_STOP_LOSS_ATR_MULTIPLIER.
     """
     index = len(strategy.data) - 1
     if (
-        strategy.data.tr_delta[index] > 1.98
-        and strategy.trades
-        and strategy.trades[-1].pl > 0
+        strategy.data.tr_delta[index] > SL_TIGHTEN_TR_DELTA
+        and book.trades
+        and book.trades[-1].pl > 0
     ):
-        return 1.1
-    return strategy.parameters.stop_loss_default_atr_multiplier
+        return TIGHT_STOP_LOSS_ATR_MULTIPLIER
+    return stop_loss_default_atr_multiplier
+
+
+def get_new_stop_loss(
+    strategy: Strategy, trade: Trade, n_atr: float
+) -> Optional[float]:
+    """
+    Trailing stop-loss of the trade for today,
+    it never moves against the trade
+    """
+    index = len(strategy.data) - 1
+    if trade.is_long:
+        sl_price = max(
+            trade.sl or -np.inf,
+            strategy.data.Open[index] - strategy.atr[index] * n_atr,
+        )
+    else:
+        sl_price = min(
+            trade.sl or np.inf,
+            strategy.data.Open[index] + strategy.atr[index] * n_atr,
+        )
+    if sl_price < 0:
+        return None
+    return sl_price
 
 
 def update_stop_losses(strategy: Strategy):
@@ -32,32 +67,30 @@ def update_stop_losses(strategy: Strategy):
     In normal situations, trailing stop-loss is equal 
     to Average True Range 50 multiplied by 2.5 
     (strategy.parameters.stop_loss_default_atr_multiplier). 
-    If volatility spike is detected (tr_delta > 1.98), 
+    If volatility spike is detected (tr_delta > SL_TIGHTEN_TR_DELTA), 
     the stop-loss is tightened, 
-    i.e. the multiplier is reduced from 2.5 to 1.1.
+    i.e. the multiplier is reduced from 2.5 to TIGHT_STOP_LOSS_ATR_MULTIPLIER.
     """
-    if strategy.trades is None:
+    book = get_trade_book(strategy=strategy)
+    if not book.trades:
         return
-    n_atr = _get_n_atr(strategy=strategy)
-    index = len(strategy.data) - 1
-    for trade in strategy.trades:
-        if trade.is_long:
-            sl_price = max(
-                trade.sl or -np.inf,
-                strategy.data.Open[index] - strategy.atr[index] * n_atr,
-            )
-        else:
-            sl_price = min(
-                trade.sl or np.inf,
-                strategy.data.Open[index] + strategy.atr[index] * n_atr,
-            )
-        if sl_price < 0:
-            sl_price = None
+    n_atr = get_n_atr(
+        strategy=strategy,
+        book=book,
+        stop_loss_default_atr_multiplier=strategy.parameters.stop_loss_default_atr_multiplier,
+    )
+    sl_changed = False
+    for trade in book.trades:
+        sl_price = get_new_stop_loss(strategy=strategy, trade=trade, n_atr=n_atr)
         if sl_price and (trade.sl != sl_price):
             trade.sl = sl_price
-            if n_atr == 1.1 and SL_TIGHTENED not in (trade.tag or ""):
-                attr = f"_{trade.__class__.__qualname__}__tag"
-                setattr(trade, attr, (trade.tag or "") + SL_TIGHTENED)
+            sl_changed = True
+            if n_atr == TIGHT_STOP_LOSS_ATR_MULTIPLIER and not has_trade_tag(
+                trade=trade, tag=TradeTag.SL_TIGHTENED
+            ):
+                add_trade_tag(trade=trade, tag=TradeTag.SL_TIGHTENED)
+    if sl_changed:
+        book.refresh_stops()
 
 
 def check_set_profit_targets_long_trades(strategy: Strategy):
@@ -72,25 +105,17 @@ def check_set_profit_targets_long_trades(strategy: Strategy):
     # See in the run_backtest_for_ticker.py file 
     # how it is done inside the next() function of the strategy.
 
-    last_price = strategy._data.Open[-1]
-    min_profit_target_long: Optional[float] = None
-    trades_long = [trade for trade in strategy.trades if trade.is_long]
-
-    for trade in trades_long:
-        if trade.tp is not None:
-            if min_profit_target_long is None:
-                min_profit_target_long = trade.tp
-            else:
-                min_profit_target_long = min(min_profit_target_long, trade.tp)
-
-    if trades_long:
-        if min_profit_target_long is None:
-            min_profit_target_long = (
-                float(strategy.parameters.profit_target_long_pct + 100) / 100
-            ) * last_price
-        for trade in trades_long:
-            if trade.tp is None:
-                trade.tp = min_profit_target_long
+    book = get_trade_book(strategy=strategy)
+    if not book.long_trades_without_tp:
+        return
+    min_profit_target_long: Optional[float] = book.min_tp_long
+    if min_profit_target_long is None:
+        min_profit_target_long = (
+            float(strategy.parameters.profit_target_long_pct + 100) / 100
+        ) * strategy._data.Open[-1]
+    for trade in book.long_trades_without_tp:
+        trade.tp = min_profit_target_long
+    book.refresh_targets()
 
 
 def check_set_profit_targets_short_trades(strategy: Strategy):
@@ -105,22 +130,14 @@ def check_set_profit_targets_short_trades(strategy: Strategy):
     # See in the run_backtest_for_ticker.py file 
     # how it is done inside the next() function of the strategy.
 
-    last_price = strategy._data.Open[-1]
-    max_profit_target_short: Optional[float] = None
-    trades_short = [trade for trade in strategy.trades if not trade.is_long]
-
-    for trade in trades_short:
-        if trade.tp is not None:
-            if max_profit_target_short is None:
-                max_profit_target_short = trade.tp
-            else:
-                max_profit_target_short = max(max_profit_target_short, trade.tp)
-
-    if trades_short:
-        if max_profit_target_short is None:
-            max_profit_target_short = (
-                float(100 - strategy.parameters.profit_target_short_pct) / 100
-            ) * last_price
-        for trade in trades_short:
-            if trade.tp is None:
-                trade.tp = max_profit_target_short
+    book = get_trade_book(strategy=strategy)
+    if not book.short_trades_without_tp:
+        return
+    max_profit_target_short: Optional[float] = book.max_tp_short
+    if max_profit_target_short is None:
+        max_profit_target_short = (
+            float(100 - strategy.parameters.profit_target_short_pct) / 100
+        ) * strategy._data.Open[-1]
+    for trade in book.short_trades_without_tp:
+        trade.tp = max_profit_target_short
+    book.refresh_targets()
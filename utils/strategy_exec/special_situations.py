@@ -1,11 +1,12 @@
 import logging
-from typing import Tuple
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
 
+import numpy as np
+import pandas as pd
 from backtesting import Strategy
 
 from constants import (
-    CLOSED_MAX_DURATION,
-    CLOSED_VOLATILITY_SPIKE,
     SS_MAX_DURATION,
     SS_NO_TODAY,
     SS_PARTIAL_CLOSE,
@@ -14,13 +15,34 @@ from constants import (
 
 from .misc import add_tag_to_trades_and_close_position, log_all_trades
 from .partial_close import process_partial_close
+from .trade_book import get_trade_book
+from .trade_tags import TradeTag
+
+
+VOLATILITY_SPIKE_TR_DELTA = 2.5
+
+
+@dataclass
+class SpecialSituation:
+    """
+    handler returns True if it detected its special situation and processed it.
+    precondition, if provided, receives the DataFrame of the backtest
+    and StrategyParams and returns a Boolean array, one value per row.
+    It is calculated once, before the backtest.
+    On the bars where it is False, the handler is not called,
+    so it must be False only where the handler would return False.
+    """
+
+    handler: Callable[[Strategy], bool]
+    msg: str
+    precondition: Optional[Callable[[pd.DataFrame, object], np.ndarray]] = None
 
 
 def process_volatility_spike(strategy: Strategy) -> bool:
-    if strategy.data.tr_delta[-1] < 2.5:
+    if strategy.data.tr_delta[-1] < VOLATILITY_SPIKE_TR_DELTA:
         return False
     add_tag_to_trades_and_close_position(
-        strategy=strategy, text_to_add=CLOSED_VOLATILITY_SPIKE
+        strategy=strategy, tag_to_add=TradeTag.CLOSED_VOLATILITY_SPIKE
     )
     logging.debug(
         "Closing position because volatility is too high, probable trend change..."
@@ -28,6 +50,11 @@ def process_volatility_spike(strategy: Strategy) -> bool:
     return True
 
 
+def volatility_spike_precondition(data: pd.DataFrame, strategy_params) -> np.ndarray:
+    # NOTE not (x < 2.5) instead of x >= 2.5 to keep NaN, like the handler does
+    return ~(data["tr_delta"].to_numpy() < VOLATILITY_SPIKE_TR_DELTA)
+
+
 def process_max_duration(
     strategy: Strategy,
 ) -> bool:
@@ -37,56 +64,96 @@ def process_max_duration(
 
     if max_trade_duration_long is None and max_trade_duration_short is None:
         return False
-    all_trade_durations = [
-        (strategy.data.index[-1] - trade.entry_time).days for trade in strategy.trades
-    ]
-    max_trade_duration = max(all_trade_durations)
+    book = get_trade_book(strategy=strategy)
+    max_trade_duration = (strategy.data.index[-1] - book.earliest_entry_time).days
     # NOTE here we assume that strategy trades are either all long or all short,
     # i.e. Backtest(hedging=False)
     condition_long = (
         (max_trade_duration_long is not None)
-        and (strategy.trades[-1].is_long)
+        and (book.trades[-1].is_long)
         and (max_trade_duration > max_trade_duration_long)
     )
     condition_short = (
         (max_trade_duration_short is not None)
-        and (strategy.trades[-1].is_short)
+        and (book.trades[-1].is_short)
         and (max_trade_duration > max_trade_duration_short)
     )
     if condition_long or condition_short:
         add_tag_to_trades_and_close_position(
-            strategy=strategy, text_to_add=CLOSED_MAX_DURATION
+            strategy=strategy, tag_to_add=TradeTag.CLOSED_MAX_DURATION
         )
         logging.debug("Closing position because max duration exceeded...")
         return True
     return False
 
 
+# NOTE Recommended actions here are:
+# - Comment out special situations that you don't want to handle.
+# - Add your custom special situations.
+# - Try to change the order in which special situations are handled.
+# If your special situation depends on a column of the data,
+# e.g., a hammer candle, give it a precondition,
+# like lambda data, strategy_params: data["is_hammer"].to_numpy(dtype=bool)
+SPECIAL_SITUATION_HANDLERS: List[SpecialSituation] = [
+    # NOTE The trade durations are known only during the backtest,
+    # so process_max_duration has no precondition
+    SpecialSituation(handler=process_max_duration, msg=SS_MAX_DURATION),
+    SpecialSituation(
+        handler=process_volatility_spike,
+        msg=SS_VOLATILITY_SPIKE,
+        precondition=volatility_spike_precondition,
+    ),
+    SpecialSituation(handler=process_partial_close, msg=SS_PARTIAL_CLOSE),
+]
+
+
+def get_special_situation_masks(
+    data: pd.DataFrame,
+    strategy_params,
+    handlers: Optional[List[SpecialSituation]] = None,
+) -> List[Optional[np.ndarray]]:
+    """
+    Evaluate the preconditions of the special situations over the whole data,
+    None for the special situations without precondition
+    """
+    if handlers is None:
+        handlers = SPECIAL_SITUATION_HANDLERS
+    res: List[Optional[np.ndarray]] = list()
+    for special_situation in handlers:
+        if special_situation.precondition is None:
+            res.append(None)
+            continue
+        mask = np.asarray(
+            special_situation.precondition(data, strategy_params), dtype=bool
+        )
+        if mask.shape != (len(data),):
+            raise ValueError(
+                f"get_special_situation_masks: precondition of {special_situation.handler.__name__} returned {mask.shape=}, expected ({len(data)},)"
+            )
+        res.append(mask)
+    return res
+
+
 def process_special_situations(
     strategy: Strategy,
+    handlers: Optional[List[SpecialSituation]] = None,
+    masks: Optional[List[Optional[np.ndarray]]] = None,
 ) -> Tuple[bool, str]:
     """
     If some special situation (SS) occurred today,
     process it (usually close all trades)
-    and return True as a signal to do nothing else today
+    and return True as a signal to do nothing else today.
+    The handlers are called in order, by default SPECIAL_SITUATION_HANDLERS.
+    If masks from get_special_situation_masks are provided,
+    the handlers whose mask is False today are skipped.
     """
-    # NOTE Recommended actions here are:
-    # - Comment out special situations that you don't want to handle.
-    # - Add your custom special situations.
-    # - Try to change the order in which special situations are handled.
-
-    if process_max_duration(
-        strategy=strategy,
-    ):
-        log_all_trades(strategy=strategy)
-        return True, SS_MAX_DURATION
-
-    if process_volatility_spike(strategy=strategy):
-        log_all_trades(strategy=strategy)
-        return True, SS_VOLATILITY_SPIKE
-
-    if process_partial_close(strategy=strategy):
-        log_all_trades(strategy=strategy)
-        return True, SS_PARTIAL_CLOSE
-
+    if handlers is None:
+        handlers = SPECIAL_SITUATION_HANDLERS
+    index = len(strategy.data) - 1
+    for i, special_situation in enumerate(handlers):
+        if masks is not None and masks[i] is not None and not masks[i][index]:
+            continue
+        if special_situation.handler(strategy):
+            log_all_trades(strategy=strategy)
+            return True, special_situation.msg
     return False, SS_NO_TODAY
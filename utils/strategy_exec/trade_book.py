@@ -0,0 +1,98 @@
+from typing import Optional, Tuple
+
+import pandas as pd
+from backtesting import Strategy
+from backtesting.backtesting import Trade
+
+# NOTE The strategy helpers used to rescan strategy.trades on every bar
+# to find the oldest trade, the average stop-loss, and the profit targets.
+# TradeBook keeps these values and recalculates them only
+# when a trade is opened, closed, or reduced,
+# or when update_stop_losses or the profit target functions
+# change the stop-losses or profit targets.
+# If your code sets trade.sl or trade.tp directly,
+# call refresh_stops() or refresh_targets() of get_trade_book(strategy).
+
+
+class TradeBook:
+    def __init__(self):
+        self._key: Optional[Tuple[int, int]] = None
+        self.trades: Tuple[Trade, ...] = tuple()
+        self.long_trades: Tuple[Trade, ...] = tuple()
+        self.short_trades: Tuple[Trade, ...] = tuple()
+        self.position_size = 0
+        self.earliest_entry_time: Optional[pd.Timestamp] = None
+        self.avg_sl: Optional[float] = None
+        self.min_tp_long: Optional[float] = None
+        self.max_tp_short: Optional[float] = None
+        self.long_trades_without_tp: Tuple[Trade, ...] = tuple()
+        self.short_trades_without_tp: Tuple[Trade, ...] = tuple()
+
+    def sync(self, strategy: Strategy) -> None:
+        """
+        Rebuild the book if trades were opened or closed since the last call.
+        Every fill changes the number of open trades or closed trades,
+        a partial close adds a closed trade.
+        """
+        # NOTE strategy.trades and strategy.closed_trades copy the broker lists
+        broker = strategy._broker  # pylint: disable=W0212
+        key = (len(broker.trades), len(broker.closed_trades))
+        if key == self._key:
+            return
+        self._key = key
+        trades = tuple(broker.trades)
+        self.trades = trades
+        self.long_trades = tuple(trade for trade in trades if trade.is_long)
+        self.short_trades = tuple(trade for trade in trades if not trade.is_long)
+        self.position_size = sum(int(trade.size) for trade in trades)
+        self.earliest_entry_time = (
+            min(trade.entry_time for trade in trades) if trades else None
+        )
+        self.refresh_stops()
+        self.refresh_targets()
+
+    def refresh_stops(self) -> None:
+        """
+        Size-weighted average stop-loss of all open trades,
+        None if some trade has no stop-loss
+        """
+        res: Optional[float] = 0.0
+        for trade in self.trades:
+            if not trade.sl or trade.sl <= 0:
+                res = None
+                break
+
+            # check for abnormal situations
+            # if trade.is_long and trade.sl >= strategy._broker.last_price:
+            #     res = None
+            #     break
+            # if trade.is_short and trade.sl <= strategy._broker.last_price:
+            #     res = None
+            #     break
+
+            res += (abs(trade.size) / abs(self.position_size)) * trade.sl
+        self.avg_sl = res if self.trades else None
+
+    def refresh_targets(self) -> None:
+        long_tps = [trade.tp for trade in self.long_trades if trade.tp is not None]
+        short_tps = [trade.tp for trade in self.short_trades if trade.tp is not None]
+        self.min_tp_long = min(long_tps) if long_tps else None
+        self.max_tp_short = max(short_tps) if short_tps else None
+        self.long_trades_without_tp = tuple(
+            trade for trade in self.long_trades if trade.tp is None
+        )
+        self.short_trades_without_tp = tuple(
+            trade for trade in self.short_trades if trade.tp is None
+        )
+
+
+def get_trade_book(strategy: Strategy) -> TradeBook:
+    """
+    Return the TradeBook of the strategy, synced with its open trades
+    """
+    book = getattr(strategy, "_trade_book", None)
+    if book is None:
+        book = TradeBook()
+        strategy._trade_book = book  # pylint: disable=W0212
+    book.sync(strategy=strategy)
+    return book
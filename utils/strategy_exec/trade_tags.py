@@ -0,0 +1,81 @@
+from enum import IntFlag
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from backtesting.backtesting import Trade
+
+from constants import (
+    CLOSED_HAMMER,
+    CLOSED_MAX_DURATION,
+    CLOSED_SHOOTING_STAR,
+    CLOSED_SIDE_CHANGE,
+    CLOSED_VOLATILITY_SPIKE,
+    SL_TIGHTENED,
+    SL_TRIGGERED,
+    TP_TRIGGERED,
+    TRADE_ALREADY_HALF_CLOSED,
+)
+
+
+class TradeTag(IntFlag):
+    """
+    Flags that explain the fate of a trade.
+    Every trade holds an integer bitmask of them in its tag,
+    so checking a flag on every bar is a single bitwise AND
+    instead of a substring search.
+    """
+
+    # NOTE The order of the flags is the order
+    # in which their texts appear in the readable tag.
+    SL_TIGHTENED = 1
+    PARTIALLY_CLOSED = 2
+    CLOSED_VOLATILITY_SPIKE = 4
+    CLOSED_SIDE_CHANGE = 8
+    CLOSED_HAMMER = 16
+    CLOSED_SHOOTING_STAR = 32
+    CLOSED_MAX_DURATION = 64
+    SL_TRIGGERED = 128
+    TP_TRIGGERED = 256
+
+
+TRADE_TAG_TEXTS = {
+    TradeTag.SL_TIGHTENED: SL_TIGHTENED,
+    TradeTag.PARTIALLY_CLOSED: TRADE_ALREADY_HALF_CLOSED,
+    TradeTag.CLOSED_VOLATILITY_SPIKE: CLOSED_VOLATILITY_SPIKE,
+    TradeTag.CLOSED_SIDE_CHANGE: CLOSED_SIDE_CHANGE,
+    TradeTag.CLOSED_HAMMER: CLOSED_HAMMER,
+    TradeTag.CLOSED_SHOOTING_STAR: CLOSED_SHOOTING_STAR,
+    TradeTag.CLOSED_MAX_DURATION: CLOSED_MAX_DURATION,
+    TradeTag.SL_TRIGGERED: SL_TRIGGERED,
+    TradeTag.TP_TRIGGERED: TP_TRIGGERED,
+}
+
+
+def add_trade_tag(trade: Trade, tag: TradeTag) -> None:
+    # NOTE Trade.tag is read-only in the backtesting package,
+    # so set its private attribute
+    attr = f"_{trade.__class__.__qualname__}__tag"
+    setattr(trade, attr, (trade.tag or 0) | int(tag))
+
+
+def has_trade_tag(trade: Trade, tag: TradeTag) -> bool:
+    return bool((trade.tag or 0) & tag)
+
+
+def trade_tag_to_text(tag_mask: Optional[int]) -> str:
+    """
+    Expand the bitmask into a readable text,
+    e.g. "; stop-loss tightened during volatility spike; partially_closed"
+    """
+    if not tag_mask:
+        return ""
+    return "".join(text for tag, text in TRADE_TAG_TEXTS.items() if tag_mask & tag)
+
+
+def get_trade_tag_masks(tags: pd.Series) -> np.ndarray:
+    """
+    Convert the Tag column of the trades DataFrame to an integer array,
+    trades without tags get 0.
+    """
+    return tags.fillna(0).to_numpy(dtype=np.int64)
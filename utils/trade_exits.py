@@ -0,0 +1,101 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from customizable import StrategyParams
+
+from .kernels import KernelBackend, get_kernel
+from .strategy_exec.sl_pt import (
+    SL_TIGHTEN_TR_DELTA,
+    TIGHT_STOP_LOSS_ATR_MULTIPLIER,
+)
+
+# NOTE simulate_trade_exits is a standalone analysis tool,
+# e.g., to compare the exit rules for many entries quickly.
+# The backtests don't call it, they apply the same rules
+# bar by bar in update_stop_losses, process_max_duration
+# and the profit targets of utils/strategy_exec.
+# It repeats those rules in the trailing_stop_exits kernel,
+# the thresholds are shared through the sl_pt constants.
+
+
+def _get_param_array(
+    is_long: np.ndarray, value_long: Optional[float], value_short: Optional[float]
+) -> np.ndarray:
+    return np.where(
+        is_long,
+        np.nan if value_long is None else value_long,
+        np.nan if value_short is None else value_short,
+    ).astype(float)
+
+
+def simulate_trade_exits(
+    df: pd.DataFrame,
+    entry_bars: np.ndarray,
+    is_long: np.ndarray,
+    strategy_params: StrategyParams,
+    backend: Optional[KernelBackend] = None,
+) -> pd.DataFrame:
+    """
+    Find where every trade would exit under the stop-loss, profit target,
+    and max duration rules of strategy_params, see trailing_stop_exits.
+    The trades are independent, without position sizing,
+    special situations, and commissions.
+    entry_bars are the row numbers of df, the trades are entered at their Open.
+    df must have the tr and tr_delta columns, see add_tr_delta_col_to_ohlc.
+
+    Return a DataFrame with EntryBar, ExitBar, EntryPrice, ExitPrice,
+    ReturnPct columns, one row per trade,
+    ExitBar -1 and NaN ExitPrice - the trade is open at the last row.
+    """
+    entry_bars = np.asarray(entry_bars, dtype=np.int64)
+    is_long = np.asarray(is_long, dtype=bool)
+    if entry_bars.shape != is_long.shape:
+        raise ValueError(
+            f"simulate_trade_exits: {entry_bars.shape=} differs from {is_long.shape=}"
+        )
+    if len(entry_bars) and (entry_bars.min() < 0 or entry_bars.max() >= len(df)):
+        raise ValueError("simulate_trade_exits: entry_bars out of the rows of df")
+
+    # NOTE The same ATR as in run_backtest_for_ticker
+    atr = pd.Series(df["tr"].to_numpy(dtype=float)).rolling(50).mean().bfill()
+    day_numbers = (
+        (df.index - pd.Timestamp("1970-01-01")).days.to_numpy(dtype=np.int64)
+        if isinstance(df.index, pd.DatetimeIndex)
+        else np.arange(len(df), dtype=np.int64)
+    )
+    exit_bars, exit_prices = get_kernel("trailing_stop_exits", backend=backend)(
+        df["Open"].to_numpy(dtype=float),
+        df["High"].to_numpy(dtype=float),
+        df["Low"].to_numpy(dtype=float),
+        df["Close"].to_numpy(dtype=float),
+        atr.to_numpy(),
+        df["tr_delta"].to_numpy(dtype=float),
+        day_numbers,
+        entry_bars,
+        is_long,
+        _get_param_array(
+            is_long=is_long,
+            value_long=strategy_params.profit_target_long_pct,
+            value_short=strategy_params.profit_target_short_pct,
+        ),
+        _get_param_array(
+            is_long=is_long,
+            value_long=strategy_params.max_trade_duration_long,
+            value_short=strategy_params.max_trade_duration_short,
+        ),
+        float(strategy_params.stop_loss_default_atr_multiplier),
+        SL_TIGHTEN_TR_DELTA,
+        TIGHT_STOP_LOSS_ATR_MULTIPLIER,
+    )
+    entry_prices = df["Open"].to_numpy(dtype=float)[entry_bars]
+    return pd.DataFrame(
+        {
+            "EntryBar": entry_bars,
+            "ExitBar": exit_bars,
+            "EntryPrice": entry_prices,
+            "ExitPrice": exit_prices,
+            "ReturnPct": np.where(is_long, 1, -1) * (exit_prices / entry_prices - 1),
+        }
+    )